@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .document_processing.cache import hash_file
+from .service import ContractAgentService, get_service
+from .utils.config import settings
+from .utils.metrics import start_exporter
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = {".pdf", ".xlsx", ".xls"}
+SPREADSHEET_SUFFIXES = {".xlsx", ".xls"}
+
+
+@dataclass
+class BatchPair:
+    name: str
+    contract: Path
+    invoice: Path
+    extra_instructions: str = ""
+
+
+# ---------------------------- discovery ----------------------------
+
+
+def discover_pairs(root: Path) -> List[BatchPair]:
+    """One pair per sub-folder of ``root``.
+
+    Files whose names contain ``contract`` and ``invoice`` are used when
+    present; otherwise a folder holding exactly one PDF and one spreadsheet is
+    read as contract PDF plus invoice spreadsheet.
+    """
+    pairs: List[BatchPair] = []
+    for folder in sorted(path for path in root.iterdir() if path.is_dir()):
+        files = sorted(path for path in folder.iterdir() if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES)
+        contracts = [path for path in files if "contract" in path.stem.lower()]
+        invoices = [path for path in files if "invoice" in path.stem.lower()]
+        if len(contracts) == 1 and len(invoices) == 1 and contracts != invoices:
+            pairs.append(BatchPair(folder.name, contracts[0], invoices[0]))
+            continue
+        pdfs = [path for path in files if path.suffix.lower() == ".pdf"]
+        sheets = [path for path in files if path.suffix.lower() in SPREADSHEET_SUFFIXES]
+        if len(files) == 2 and len(pdfs) == 1 and len(sheets) == 1:
+            pairs.append(BatchPair(folder.name, pdfs[0], sheets[0]))
+            continue
+        logger.warning("Skipping %s: cannot tell the contract from the invoice", folder)
+    return pairs
+
+
+def read_manifest(path: Path) -> List[BatchPair]:
+    """Pairs from a CSV manifest with ``name,contract,invoice[,instructions]`` columns.
+
+    Relative document paths are resolved against the manifest's folder.
+    """
+    pairs: List[BatchPair] = []
+    with path.open(newline="", encoding="utf-8") as handle:
+        for line, row in enumerate(csv.DictReader(handle), start=2):
+            contract = (row.get("contract") or "").strip()
+            invoice = (row.get("invoice") or "").strip()
+            if not contract or not invoice:
+                raise ValueError(f"{path}:{line}: both contract and invoice are required")
+            pairs.append(
+                BatchPair(
+                    name=(row.get("name") or "").strip() or f"{path.stem}-{line}",
+                    contract=path.parent / contract,
+                    invoice=path.parent / invoice,
+                    extra_instructions=(row.get("instructions") or "").strip(),
+                )
+            )
+    return pairs
+
+
+def run_id_for(pair: BatchPair, *, invoice_format: str) -> str:
+    """Deterministic run id, so re-running a batch finds the outputs of earlier attempts."""
+    material = json.dumps(
+        [pair.name, hash_file(pair.contract), hash_file(pair.invoice), pair.extra_instructions, invoice_format]
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+def is_complete(service: ContractAgentService, run_id: str) -> bool:
+    return all(
+        service.storage.read_text(run_id, name, suffix=".md")
+        for name in ("compliance_report", "contract_review")
+    )
+
+
+# ---------------------------- parse workers ----------------------------
+
+
+_worker_service: Optional[ContractAgentService] = None
+
+
+def _init_parse_worker() -> None:
+    global _worker_service
+    # Pairs are already spread over processes; nested PDF page pools would
+    # only oversubscribe the CPUs.
+    settings.pdf_parse_workers = 1
+    _worker_service = get_service()
+
+
+def _parse_pair(run_id: str, contract: str, invoice: str) -> Dict[str, str]:
+    """Store and parse one pair; only the YAML paths travel back, never the text."""
+    service = _worker_service or get_service()
+    contract_path, invoice_path = Path(contract), Path(invoice)
+    with contract_path.open("rb") as handle:
+        stored_contract = service.storage.save_raw_file(run_id, contract_path.name, handle, role="contract")
+    with invoice_path.open("rb") as handle:
+        stored_invoice = service.storage.save_raw_file(run_id, invoice_path.name, handle, role="invoice")
+    documents = service.process_documents(contract_path=stored_contract, invoice_path=stored_invoice, run_id=run_id)
+    return {key: documents[key] for key in ("contract_yaml_path", "invoice_yaml_path")}
+
+
+# ---------------------------- orchestration ----------------------------
+
+
+async def _run_pairs(
+    service: ContractAgentService,
+    pairs: List[BatchPair],
+    run_ids: List[str],
+    *,
+    parse_workers: int,
+    llm_concurrency: int,
+    invoice_format: str,
+) -> List[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=parse_workers, mp_context=context, initializer=_init_parse_worker
+    ) as parse_pool, ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="batch-llm") as llm_pool:
+
+        async def review(pair: BatchPair, run_id: str) -> Dict[str, Any]:
+            outcome: Dict[str, Any] = {"name": pair.name, "run_id": run_id, "status": "done"}
+            started = time.perf_counter()
+            try:
+                documents = await loop.run_in_executor(
+                    parse_pool, _parse_pair, run_id, str(pair.contract), str(pair.invoice)
+                )
+                outcome["parse_seconds"] = time.perf_counter() - started
+                async with llm_slots:
+                    llm_started = time.perf_counter()
+                    # The YAML is read only once the review starts, so pairs
+                    # waiting for an LLM slot hold nothing but two paths.
+                    result = await loop.run_in_executor(
+                        llm_pool,
+                        lambda: service.run_review(
+                            run_id,
+                            contract_yaml=Path(documents["contract_yaml_path"]).read_text(encoding="utf-8"),
+                            invoice_yaml=Path(documents["invoice_yaml_path"]).read_text(encoding="utf-8"),
+                            extra_instructions=pair.extra_instructions or None,
+                            invoice_format=invoice_format,
+                        ),
+                    )
+                    outcome["review_seconds"] = time.perf_counter() - llm_started
+                outcome["latency_seconds"] = result["latency_seconds"]
+            except Exception as exc:  # noqa: BLE001 - one bad pair must not stop the batch
+                logger.exception("Batch pair %s failed", pair.name)
+                outcome.update(status="error", error=str(exc) or exc.__class__.__name__)
+            outcome["total_seconds"] = time.perf_counter() - started
+            print(f"[{outcome['status']}] {pair.name} run={run_id} {outcome['total_seconds']:.1f}s", flush=True)
+            return outcome
+
+        return await asyncio.gather(*(review(pair, run_id) for pair, run_id in zip(pairs, run_ids)))
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return round(ordered[rank], 3)
+
+
+def summarise(outcomes: List[Dict[str, Any]], *, skipped: int, wall_seconds: float) -> Dict[str, Any]:
+    done = [outcome for outcome in outcomes if outcome["status"] == "done"]
+    summary: Dict[str, Any] = {
+        "pairs": len(outcomes) + skipped,
+        "completed": len(done),
+        "failed": len(outcomes) - len(done),
+        "skipped": skipped,
+        "wall_seconds": round(wall_seconds, 3),
+        "pairs_per_minute": round(60 * len(done) / wall_seconds, 2) if wall_seconds and done else 0.0,
+    }
+    series = {
+        "parse": [outcome["parse_seconds"] for outcome in done],
+        "review": [outcome["review_seconds"] for outcome in done],
+        "total": [outcome["total_seconds"] for outcome in done],
+    }
+    for step in ("compliance", "contract_review"):
+        series[step] = [outcome["latency_seconds"][step] for outcome in done if step in outcome["latency_seconds"]]
+    summary["latency_seconds"] = {
+        name: {"p50": _percentile(values, 50), "p95": _percentile(values, 95), "max": round(max(values), 3) if values else None}
+        for name, values in series.items()
+    }
+    summary["failures"] = {outcome["name"]: outcome["error"] for outcome in outcomes if outcome["status"] == "error"}
+    return summary
+
+
+def run_batch(
+    pairs: List[BatchPair],
+    *,
+    parse_workers: int,
+    llm_concurrency: int,
+    invoice_format: Optional[str] = None,
+    force: bool = False,
+    service: Optional[ContractAgentService] = None,
+) -> Dict[str, Any]:
+    """Review ``pairs`` and return a throughput/latency summary.
+
+    Documents are parsed on a spawn-based process pool while at most
+    ``llm_concurrency`` reviews talk to the LLM at once. Pairs whose run
+    already holds both reports are skipped unless ``force`` is set.
+    """
+    service = service or get_service()
+    if settings.metrics_port:
+        start_exporter(settings.metrics_port)
+    invoice_format = invoice_format or settings.invoice_prompt_format
+    pending: List[BatchPair] = []
+    run_ids: List[str] = []
+    skipped = 0
+    for pair in pairs:
+        run_id = run_id_for(pair, invoice_format=invoice_format)
+        if not force and is_complete(service, run_id):
+            skipped += 1
+            print(f"[skipped] {pair.name} run={run_id} already reviewed", flush=True)
+            continue
+        pending.append(pair)
+        run_ids.append(run_id)
+
+    started = time.perf_counter()
+    outcomes: List[Dict[str, Any]] = []
+    if pending:
+        outcomes = asyncio.run(
+            _run_pairs(
+                service,
+                pending,
+                run_ids,
+                parse_workers=max(1, parse_workers),
+                llm_concurrency=max(1, llm_concurrency),
+                invoice_format=invoice_format,
+            )
+        )
+    summary = summarise(outcomes, skipped=skipped, wall_seconds=time.perf_counter() - started)
+    summary["rate_limiter"] = service.rate_limit_stats()
+    summary["runs"] = {outcome["name"]: outcome["run_id"] for outcome in outcomes}
+    return summary
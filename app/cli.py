@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+from .document_processing.compact import INVOICE_FORMATS
+
+if TYPE_CHECKING:
+    from .utils.storage import StorageManager
+
+
+def _gc_artefacts(args: argparse.Namespace) -> int:
+    from .utils.config import settings
+    from .utils.storage import StorageManager
+
+    storage = StorageManager(settings.data_storage_path, settings.artefact_storage_path)
+    stats = storage.collect_garbage(dry_run=args.dry_run, grace_seconds=args.grace_seconds)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+def _catalog_storage() -> StorageManager:
+    from .utils.config import settings
+    from .utils.run_catalog import RunCatalog
+    from .utils.storage import StorageManager
+
+    return StorageManager(
+        settings.data_storage_path, settings.artefact_storage_path, catalog=RunCatalog(settings.run_catalog_path)
+    )
+
+
+def _catalog_rebuild(args: argparse.Namespace) -> int:
+    stats = _catalog_storage().rebuild_catalog()
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+def _catalog_list(args: argparse.Namespace) -> int:
+    catalog = _catalog_storage().catalog
+    if args.run_id:
+        run = catalog.get(args.run_id)
+        print(json.dumps(run, indent=2))
+        return 0 if run else 1
+    if args.hash:
+        runs = catalog.find_by_hash(args.hash.lower(), limit=args.limit)
+    else:
+        runs = catalog.list_runs(
+            status=args.status,
+            since=args.since.timestamp() if args.since else None,
+            until=args.until.timestamp() if args.until else None,
+            limit=args.limit,
+        )
+    print(json.dumps(runs, indent=2))
+    return 0
+
+
+def _batch(args: argparse.Namespace) -> int:
+    from .batch import discover_pairs, read_manifest, run_batch
+
+    pairs = read_manifest(args.manifest) if args.manifest else discover_pairs(args.dir)
+    if not pairs:
+        print("No contract/invoice pairs found.")
+        return 1
+    summary = run_batch(
+        pairs,
+        parse_workers=args.parse_workers,
+        llm_concurrency=args.llm_concurrency,
+        invoice_format=args.invoice_format,
+        force=args.force,
+    )
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.summary_json:
+        args.summary_json.write_text(text + "\n", encoding="utf-8")
+    return 1 if summary["failed"] else 0
+
+
+def _resume(args: argparse.Namespace) -> int:
+    from .service import get_service
+
+    try:
+        results = get_service().resume(args.run_id)
+    except ValueError as exc:
+        print(exc)
+        return 1
+    print(json.dumps({"run_id": args.run_id, "latency_seconds": results["latency_seconds"]}, indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="SAP contract agent maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gc = commands.add_parser("gc-artefacts", help="Delete uploaded blobs that no run references.")
+    gc.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting it.")
+    gc.add_argument(
+        "--grace-seconds", type=float, default=3600.0, help="Keep blobs written or reused this recently (uploads in flight)."
+    )
+    gc.set_defaults(handler=_gc_artefacts)
+
+    batch = commands.add_parser("batch", help="Review many contract/invoice pairs without the UI.")
+    source = batch.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", type=Path, help="Folder with one sub-folder per contract/invoice pair.")
+    source.add_argument("--manifest", type=Path, help="CSV with name,contract,invoice[,instructions] columns.")
+    batch.add_argument(
+        "--parse-workers", type=int, default=min(4, os.cpu_count() or 1), help="Processes used to parse documents."
+    )
+    batch.add_argument("--llm-concurrency", type=int, default=4, help="Reviews allowed to call the LLM at once.")
+    batch.add_argument(
+        "--invoice-format",
+        choices=INVOICE_FORMATS,
+        help="Invoice prompt format (defaults to INVOICE_PROMPT_FORMAT).",
+    )
+    batch.add_argument("--force", action="store_true", help="Review pairs again even if their reports exist.")
+    batch.add_argument("--summary-json", type=Path, help="Also write the throughput/latency summary here.")
+    batch.set_defaults(handler=_batch)
+
+    catalog = commands.add_parser("catalog", help="Query or rebuild the SQLite index of runs.")
+    catalog_commands = catalog.add_subparsers(dest="catalog_command", required=True)
+    rebuild = catalog_commands.add_parser("rebuild", help="Re-create the index from the data and artefact folders.")
+    rebuild.set_defaults(handler=_catalog_rebuild)
+    listing = catalog_commands.add_parser("list", help="List runs, newest first.")
+    listing.add_argument("--run-id", help="Show one run with all its files.")
+    listing.add_argument("--hash", help="Runs whose uploaded contract or invoice has this SHA-256.")
+    listing.add_argument("--status", choices=("uploaded", "parsed", "reviewed"), help="Only runs at this stage.")
+    listing.add_argument("--since", type=datetime.fromisoformat, help="Created at or after this ISO date/time.")
+    listing.add_argument("--until", type=datetime.fromisoformat, help="Created before this ISO date/time.")
+    listing.add_argument("--limit", type=int, default=50)
+    listing.set_defaults(handler=_catalog_list)
+
+    resume = commands.add_parser("resume", help="Finish a failed or interrupted run from its stage checkpoints.")
+    resume.add_argument("run_id")
+    resume.set_defaults(handler=_resume)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+# Bump when the layout of cache entries changes (2: entries omit source_file).
+CACHE_FORMAT = "2"
+
+
+def hash_stream(handle: BinaryIO, *, chunk_size: int = _CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: handle.read(chunk_size), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    with path.open("rb") as handle:
+        return hash_stream(handle)
+
+
+class ParseCache:
+    """On-disk cache of parsed document YAML keyed by content hash and parser version.
+
+    Entries are plain ``<key>.yaml`` files. Hits refresh the file mtime so the
+    directory can be trimmed least-recently-used first once it outgrows
+    ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, *, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def key_for(self, path: Path, parser_version: str) -> str:
+        return f"{hash_file(path)}-{parser_version}-v{CACHE_FORMAT}"
+
+    def _entry(self, key: str) -> Path:
+        return self.root / f"{key}.yaml"
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entry(key)
+        try:
+            text = entry.read_text(encoding="utf-8")
+            os.utime(entry)
+        except FileNotFoundError:
+            self._bump("misses")
+            return None
+        self._bump("hits")
+        logger.info("Parse cache hit %s", key)
+        return text
+
+    def put(self, key: str, yaml_text: str) -> Path:
+        entry = self._entry(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(yaml_text, encoding="utf-8")
+        os.replace(tmp, entry)
+        self._bump("stores")
+        self._evict()
+        return entry
+
+    def put_file(self, key: str, source: Path, *, offset: int = 0) -> Path:
+        """Store ``source`` from byte ``offset`` on, copied in chunks rather than read whole."""
+        entry = self._entry(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with source.open("rb") as src, tmp.open("wb") as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+        os.replace(tmp, entry)
+        self._bump("stores")
+        self._evict()
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate_pct"] = round(100 * stats["hits"] / lookups) if lookups else 0
+        return stats
+
+    def _bump(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[counter] += amount
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in self.root.glob("*.yaml"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort(key=lambda item: item[0])
+        # Always keep the newest entry, even if it alone exceeds the budget.
+        for _mtime, size, entry in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            self._bump("evictions")
+            logger.info("Parse cache evicted %s", entry.name)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+INDEX_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^\s*(?:\d+(?:\.\d+)*[.)]?|[A-Z][.)]|article|section|clause|schedule|annex)\b", re.IGNORECASE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or shall that the this to with will any all per "
+    "been being such which under other than into".split()
+)
+_PASSAGE_WORDS = 80
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS and len(token) > 1]
+
+
+def _pdf_passages(elements: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Split page text into clause-sized passages, breaking at clause headings."""
+    passages: List[Dict[str, Any]] = []
+    for element in elements:
+        page = element.get("page_number")
+        lines: List[str] = []
+        words = 0
+        for line in (element.get("text") or "").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if lines and (words >= _PASSAGE_WORDS or _HEADING_RE.match(line)):
+                passages.append({"ref": f"p.{page}", "text": " ".join(lines)})
+                lines, words = [], 0
+            lines.append(line)
+            words += len(line.split())
+        if lines:
+            passages.append({"ref": f"p.{page}", "text": " ".join(lines)})
+    return passages
+
+
+def _sheet_passages(sheets: Dict[str, Any]) -> List[Dict[str, Any]]:
+    passages: List[Dict[str, Any]] = []
+    for sheet_name, sheet in sheets.items():
+        offset = sheet.get("row_offset", 0)
+        for position, row in enumerate(sheet.get("rows") or [], start=1):
+            cells = [f"{key}: {value}" for key, value in row.items() if str(value).strip()]
+            if cells:
+                passages.append({"ref": f"{sheet_name} row {offset + position}", "text": "; ".join(cells)})
+    return passages
+
+
+def invoice_queries(payload: Dict[str, Any], *, limit: int = 300) -> List[str]:
+    """One query per distinct invoice line item (textual cells only)."""
+    queries: List[str] = []
+    seen = set()
+
+    def add(text: str) -> None:
+        key = " ".join(tokenize(text))
+        if key and not key.replace(" ", "").isdigit() and key not in seen:
+            seen.add(key)
+            queries.append(text)
+
+    for sheet in (payload.get("sheets") or {}).values():
+        for row in sheet.get("rows") or []:
+            add(" ".join(str(value) for value in row.values() if re.search(r"[A-Za-z]", str(value))))
+    for element in payload.get("elements") or []:
+        for line in (element.get("text") or "").splitlines():
+            if re.search(r"[A-Za-z]", line):
+                add(line)
+    return queries[:limit]
+
+
+class ClauseIndex:
+    """Offline BM25 index over contract passages (PDF pages or spreadsheet rows)."""
+
+    def __init__(self, passages: List[Dict[str, Any]], *, source_hash: str = "", k1: float = 1.5, b: float = 0.75) -> None:
+        self.passages = passages
+        self.source_hash = source_hash
+        self.k1 = k1
+        self.b = b
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_id, passage in enumerate(passages):
+            counts = Counter(tokenize(passage["text"]))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term].append((doc_id, tf))
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        total = len(passages)
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], *, source_hash: str = "") -> "ClauseIndex":
+        if payload.get("elements"):
+            passages = _pdf_passages(payload["elements"])
+        else:
+            passages = _sheet_passages(payload.get("sheets") or {})
+        return cls(passages, source_hash=source_hash)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"version": INDEX_VERSION, "source_hash": self.source_hash, "passages": self.passages},
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> Optional["ClauseIndex"]:
+        data = json.loads(text)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["passages"], source_hash=data.get("source_hash", ""))
+
+    def search(self, query: str, *, top_k: int) -> List[Tuple[float, int]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / (self._avg_length or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, doc_id) for doc_id, score in ranked]
+
+    def retrieve(self, queries: Iterable[str], *, top_k: int, max_chars: int) -> List[Dict[str, Any]]:
+        """Union of the top-k passages per query, best first, capped at ``max_chars``.
+
+        The selection is returned in document order so clauses read naturally.
+        """
+        best: Dict[int, float] = {}
+        for query in queries:
+            for score, doc_id in self.search(query, top_k=top_k):
+                best[doc_id] = max(score, best.get(doc_id, 0.0))
+        chosen: List[int] = []
+        used = 0
+        for doc_id, _score in sorted(best.items(), key=lambda item: item[1], reverse=True):
+            size = len(self.passages[doc_id]["text"])
+            if chosen and used + size > max_chars:
+                continue
+            chosen.append(doc_id)
+            used += size
+        return [self.passages[doc_id] for doc_id in sorted(chosen)]
+
+
+def render_clauses(passages: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"- [{passage['ref']}] {passage['text']}" for passage in passages)
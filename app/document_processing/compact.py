@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, Dict, List, Tuple
+
+from ..utils.yaml_io import dump_yaml
+
+INVOICE_FORMATS = ("records", "columnar", "csv", "markdown")
+
+_FORMAT_LABELS = {
+    "columnar": (
+        "Invoice (columnar YAML: each sheet lists `columns` once and `rows` as value lists; "
+        "empty columns are dropped and a trailing `count` column marks collapsed duplicate rows)",
+        "yaml",
+    ),
+    "csv": (
+        "Invoice (one CSV table per sheet; empty columns are dropped and a trailing `count` column marks collapsed duplicate rows)",
+        "text",
+    ),
+    "markdown": (
+        "Invoice (one markdown table per sheet; empty columns are dropped and a trailing `count` column marks collapsed duplicate rows)",
+        "markdown",
+    ),
+}
+
+
+def compact_sheet(sheet: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``columns`` once plus ``rows`` as value lists.
+
+    Columns that are blank in every row are dropped. Identical rows are
+    collapsed into one with a ``count`` column rather than silently removed,
+    so genuinely double-billed lines stay visible.
+    """
+    records: List[Dict[str, Any]] = sheet.get("rows") or []
+    columns = list(sheet.get("columns") or (records[0].keys() if records else []))
+    kept = [column for column in columns if any(str(row.get(column, "")).strip() for row in records)]
+
+    counts: Dict[Tuple[str, ...], int] = {}
+    for row in records:
+        values = tuple(str(row.get(column, "")) for column in kept)
+        if any(value.strip() for value in values):
+            counts[values] = counts.get(values, 0) + 1
+
+    duplicates = any(count > 1 for count in counts.values())
+    rows = [list(values) + ([count] if duplicates else []) for values, count in counts.items()]
+    compact: Dict[str, Any] = {
+        "row_count": sheet.get("row_count", len(records)),
+        "columns": [str(column) for column in kept] + (["count"] if duplicates else []),
+        "rows": rows,
+    }
+    if "row_offset" in sheet:
+        compact["row_offset"] = sheet["row_offset"]
+    return compact
+
+
+def _csv_table(sheet: Dict[str, Any]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(sheet["columns"])
+    writer.writerows(sheet["rows"])
+    return buffer.getvalue()
+
+
+def _markdown_cell(value: Any) -> str:
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def _markdown_table(sheet: Dict[str, Any]) -> str:
+    columns = sheet["columns"]
+    if not columns:
+        return "_(no data)_\n"
+    lines = [
+        "| " + " | ".join(_markdown_cell(column) for column in columns) + " |",
+        "|" + "---|" * len(columns),
+    ]
+    lines.extend("| " + " | ".join(_markdown_cell(value) for value in row) + " |" for row in sheet["rows"])
+    return "\n".join(lines) + "\n"
+
+
+def render_invoice(payload: Dict[str, Any], invoice_format: str, *, records_yaml: str) -> Tuple[str, str, str]:
+    """Render an invoice payload for the prompt as ``(label, text, fence)``.
+
+    ``records`` (and any payload without ``sheets``, e.g. PDF invoices) is the
+    stored ``records_yaml`` unchanged.
+    """
+    if invoice_format not in _FORMAT_LABELS or not payload.get("sheets"):
+        return "Invoice YAML", records_yaml, "yaml"
+    label, fence = _FORMAT_LABELS[invoice_format]
+    sheets = {name: compact_sheet(sheet) for name, sheet in payload["sheets"].items()}
+    meta = {key: value for key, value in payload.items() if key != "sheets"}
+    if invoice_format == "columnar":
+        return label, dump_yaml({**meta, "sheets": sheets}, default_flow_style=None, width=10_000), fence
+
+    render = _csv_table if invoice_format == "csv" else _markdown_table
+    header = ", ".join(f"{key}: {value}" for key, value in meta.items())
+    parts = [header] if header else []
+    for name, sheet in sheets.items():
+        offset = f", rows start after line {sheet['row_offset']}" if sheet.get("row_offset") else ""
+        parts.append(f"Sheet {name} ({sheet['row_count']} rows{offset})\n{render(sheet)}")
+    return label, "\n".join(parts), fence
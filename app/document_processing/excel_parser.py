@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
 
-import numpy as np
-import pandas as pd
+from ..utils.metrics import span
+from ..utils.yaml_io import dump_yaml
+
+# Bump whenever the payload shape changes so stale cached parses are ignored.
+PARSER_VERSION = "excel-1"
+STREAMING_PARSER_VERSION = "excel-stream-1"
 
 
 def _to_builtin(value):
-    if isinstance(value, np.generic):
+    # numpy scalars, matched by module so numpy is only imported with pandas.
+    if type(value).__module__ == "numpy":
         return value.item()
     if isinstance(value, dict):
         return {k: _to_builtin(v) for k, v in value.items()}
@@ -19,24 +24,30 @@ def _to_builtin(value):
     return value
 
 def parse_excel(path: Path) -> Dict[str, Any]:
-    workbook = pd.read_excel(
-        path,
-        sheet_name=None,
-        dtype=str,
-        keep_default_na=False,
-    )
+    import pandas as pd
+
+    with span("excel.read", file=path.name) as attrs:
+        workbook = pd.read_excel(
+            path,
+            sheet_name=None,
+            dtype=str,
+            keep_default_na=False,
+        )
+        attrs["sheets"] = len(workbook)
     output: Dict[str, Any] = {"source_file": path.name, "sheets": {}}
-    for sheet_name, frame in workbook.items():
-        frame = frame.fillna("")
-        columns = [_to_builtin(col) for col in frame.columns.tolist()]
-        rows = _to_builtin(frame.to_dict(orient="records"))
-        if not rows:
-            rows = [{col: "" for col in columns}]
-        output["sheets"][sheet_name] = {
-            "row_count": int(frame.index.size),
-            "columns": columns or [],
-            "rows": rows,
-        }
+    with span("excel.to_records") as attrs:
+        for sheet_name, frame in workbook.items():
+            frame = frame.fillna("")
+            columns = [_to_builtin(col) for col in frame.columns.tolist()]
+            rows = _to_builtin(frame.to_dict(orient="records"))
+            if not rows:
+                rows = [{col: "" for col in columns}]
+            output["sheets"][sheet_name] = {
+                "row_count": int(frame.index.size),
+                "columns": columns or [],
+                "rows": rows,
+            }
+        attrs["rows"] = sum(sheet["row_count"] for sheet in output["sheets"].values())
     if not output["sheets"]:
         output["sheets"]["Sheet1"] = {
             "row_count": 0,
@@ -44,3 +55,142 @@ def parse_excel(path: Path) -> Dict[str, Any]:
             "rows": [{"notice": "Workbook contained no data"}],
         }
     return _to_builtin(output)
+
+
+# ---------------------------- streaming mode ----------------------------
+#
+# parse_excel materialises every sheet as a DataFrame, a list of records and a
+# builtin copy of those records. The functions below instead walk the workbook
+# with openpyxl's read-only row iterator and write the same YAML layout row by
+# row, so peak memory stays flat regardless of workbook size.
+
+
+def _cell_to_str(value: Any) -> str:
+    """Mirror ``pd.read_excel(dtype=str, keep_default_na=False)`` cell rendering."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _header_names(header: Tuple[Any, ...], width: int) -> List[str]:
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for index in range(width):
+        value = header[index] if index < len(header) else None
+        name = f"Unnamed: {index}" if value is None or value == "" else _cell_to_str(value)
+        # pandas de-duplicates repeated headers as "name.1", "name.2", ...
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == ""
+
+
+def _is_blank(row: Tuple[Any, ...]) -> bool:
+    return all(_is_empty(value) for value in row)
+
+
+def _sheet_shape(sheet: Any) -> Tuple[int, int]:
+    """First pass: effective column width and data row count of a sheet.
+
+    Like pandas, blank rows inside the data are kept and trailing ones dropped.
+    """
+    width = 0
+    last_filled = 0
+    for position, row in enumerate(sheet.iter_rows(values_only=True)):
+        if _is_blank(row):
+            continue
+        last_filled = position
+        for index in range(len(row) - 1, -1, -1):
+            if not _is_empty(row[index]):
+                width = max(width, index + 1)
+                break
+    return width, last_filled
+
+
+def iter_excel_sheets(path: Path) -> Iterator[Tuple[str, List[str], int, Iterator[Dict[str, str]]]]:
+    """Yield ``(sheet_name, columns, row_count, rows)`` with rows produced lazily.
+
+    Each sheet is scanned twice (shape, then rows) so only one row is ever held
+    in memory. ``rows`` must be consumed before advancing to the next sheet.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            width, row_count = _sheet_shape(sheet)
+            iterator = sheet.iter_rows(values_only=True)
+            header = next(iterator, ())
+            columns = _header_names(header, width)
+
+            def rows(
+                iterator: Iterator[Tuple[Any, ...]] = iterator,
+                columns: List[str] = columns,
+                row_count: int = row_count,
+            ) -> Iterator[Dict[str, str]]:
+                for _position, row in zip(range(row_count), iterator):
+                    yield {
+                        column: _cell_to_str(row[index] if index < len(row) else None)
+                        for index, column in enumerate(columns)
+                    }
+
+            yield sheet.title, columns, row_count, rows()
+    finally:
+        workbook.close()
+
+
+def _dump_fragment(value: Any, indent: int) -> str:
+    text = dump_yaml(value, default_flow_style=False)
+    if text.endswith("\n...\n"):
+        text = text[: -len("...\n")]
+    prefix = " " * indent
+    return "".join(f"{prefix}{line}\n" for line in text.splitlines())
+
+
+def write_excel_sheets_yaml(path: Path, handle: TextIO, *, document_type: Optional[str] = None) -> Dict[str, int]:
+    """Stream everything after ``source_file`` of the ``parse_excel`` payload as YAML.
+
+    Returns a small summary (``sheets``, ``rows``) for validation.
+    """
+    handle.write("sheets:\n")
+    summary = {"sheets": 0, "rows": 0}
+    for sheet_name, columns, row_count, rows in iter_excel_sheets(path):
+        summary["sheets"] += 1
+        handle.write(_dump_fragment({sheet_name: None}, 2).replace(": null\n", ":\n"))
+        handle.write(_dump_fragment({"row_count": row_count, "columns": columns or []}, 4))
+        handle.write("    rows:\n")
+        written = 0
+        for row in rows:
+            handle.write(_dump_fragment([row], 4))
+            written += 1
+        if not written:
+            handle.write(_dump_fragment([{column: "" for column in columns}], 4))
+        summary["rows"] += written
+    if not summary["sheets"]:
+        handle.write(_dump_fragment({
+            "Sheet1": {
+                "row_count": 0,
+                "columns": [],
+                "rows": [{"notice": "Workbook contained no data"}],
+            }
+        }, 2))
+    if document_type:
+        handle.write(_dump_fragment({"document_type": document_type}, 0))
+    return summary
+
+
+def write_excel_yaml(path: Path, handle: TextIO, *, document_type: Optional[str] = None) -> Dict[str, int]:
+    """Stream the full ``parse_excel`` payload for ``path`` as YAML into ``handle``."""
+    handle.write(_dump_fragment({"source_file": path.name}, 0))
+    return write_excel_sheets_yaml(path, handle, document_type=document_type)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+VERDICTS_VERSION = 1
+VERDICT_COLUMNS = ("Sheet", "Line", "Invoice Details", "Contract Alignment", "Status", "Confidence")
+
+RowKey = Tuple[str, int]
+
+_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(?:\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_LINE_RE = re.compile(r"\D*?(\d+)\D*")
+
+
+def row_fingerprints(payload: Dict[str, Any]) -> Dict[RowKey, str]:
+    """``(sheet, line) -> fingerprint`` for every non-blank spreadsheet row.
+
+    The fingerprint hashes the sheet name and the row's cells, so it survives
+    rows being inserted or removed above it. Identical rows within a sheet are
+    told apart by their occurrence number, keeping a duplicated charge from
+    inheriting the verdict of the original.
+    """
+    fingerprints: Dict[RowKey, str] = {}
+    for sheet_name, sheet in (payload.get("sheets") or {}).items():
+        offset = sheet.get("row_offset", 0)
+        occurrences: Dict[str, int] = {}
+        for position, row in enumerate(sheet.get("rows") or [], start=1):
+            if not any(str(value).strip() for value in row.values()):
+                continue
+            digest = hashlib.sha256(
+                json.dumps([sheet_name, row], ensure_ascii=False, default=str).encode("utf-8")
+            ).hexdigest()[:32]
+            occurrence = occurrences.get(digest, 0)
+            occurrences[digest] = occurrence + 1
+            fingerprints[(sheet_name, offset + position)] = f"{digest}:{occurrence}"
+    return fingerprints
+
+
+def _split_cells(line: str) -> List[str]:
+    body = line.strip()
+    if body.startswith("|"):
+        body = body[1:]
+    if body.endswith("|") and not body.endswith("\\|"):
+        body = body[:-1]
+    return [cell.strip() for cell in re.split(r"(?<!\\)\|", body)]
+
+
+def parse_line_verdicts(markdown: str) -> List[Dict[str, str]]:
+    """Rows of every markdown table whose header has Sheet, Line and Status columns."""
+    lines = markdown.splitlines()
+    verdicts: List[Dict[str, str]] = []
+    index = 0
+    while index + 1 < len(lines):
+        header, separator = lines[index], lines[index + 1]
+        index += 1
+        if "|" not in header or not _SEPARATOR_RE.match(separator.strip()):
+            continue
+        names = [name.strip("*_ ").lower() for name in _split_cells(header)]
+        if not {"sheet", "line", "status"} <= set(names):
+            continue
+        index += 1
+        while index < len(lines) and lines[index].strip().startswith("|"):
+            cells = _split_cells(lines[index])
+            row = dict(zip(names, cells))
+            verdicts.append({column: row.get(column.lower(), "") for column in VERDICT_COLUMNS})
+            index += 1
+    return verdicts
+
+
+def verdict_key(verdict: Dict[str, str], sheet_names: List[str]) -> Optional[RowKey]:
+    """Resolve a verdict's Sheet and Line cells to an invoice row, if unambiguous."""
+    match = _LINE_RE.fullmatch(verdict.get("Line", ""))
+    if match is None:
+        return None
+    wanted = verdict.get("Sheet", "").strip("*_ `").lower()
+    for name in sheet_names:
+        if name.lower() == wanted:
+            return name, int(match.group(1))
+    return None
+
+
+def render_verdicts(verdicts: List[Dict[str, str]]) -> str:
+    lines = [
+        "| " + " | ".join(VERDICT_COLUMNS) + " |",
+        "|" + "---|" * len(VERDICT_COLUMNS),
+    ]
+    lines.extend("| " + " | ".join(verdict.get(column, "") for column in VERDICT_COLUMNS) + " |" for verdict in verdicts)
+    return "\n".join(lines) + "\n"
@@ -1,28 +1,128 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
-from pypdf import PdfReader
+from ..utils.metrics import span
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the payload shape or extraction behaviour changes so cached
+# parses produced by older code are not reused.
+PARSER_VERSION = "pdf-1"
 
-def parse_pdf(path: Path) -> Dict[str, Any]:
-    reader = PdfReader(str(path))
-    elements: List[Dict[str, Any]] = []
+_EMPTY_PAGE_TEXT = "[No selectable text on this page – likely scanned or image-based.]"
 
-    for index, page in enumerate(reader.pages, start=1):
+
+def _extract_page_text(page: Any, index: int, source_name: str) -> str:
+    try:
+        text = page.extract_text() or ""
+    except Exception as exc:  # pragma: no cover - safety net
+        logger.warning("Failed to extract text from page %s of %s: %s", index, source_name, exc)
+        text = ""
+    text = text.strip()
+    if not text:
+        text = _EMPTY_PAGE_TEXT
+    return text
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Worker entry point: extract pages ``start``..``stop - 1`` (1-based) of ``path``."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    source_name = Path(path).name
+    return [
+        (index, _extract_page_text(reader.pages[index - 1], index, source_name))
+        for index in range(start, stop)
+    ]
+
+
+# One pool per process, started on the first large PDF and reused afterwards:
+# spawning interpreters (and importing pypdf in each) costs more than
+# extracting a typical document, so it must not be paid on every parse.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _shared_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is None:
+                atexit.register(_shutdown_pool)
+            else:
+                _pool.shutdown(wait=False)
+            # Spawned workers avoid forking a multi-threaded Streamlit server.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _shutdown_pool() -> None:
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_parallel(path: Path, page_count: int, workers: int) -> List[Tuple[int, str]]:
+    # A few ranges per worker keeps the pool busy when some pages are much
+    # heavier than others.
+    chunk = max(1, math.ceil(page_count / (workers * 4)))
+    ranges = [(start, min(start + chunk, page_count + 1)) for start in range(1, page_count + 1, chunk)]
+    pool = _shared_pool(workers)
+    try:
+        futures = [pool.submit(_extract_page_range, str(path), start, stop) for start, stop in ranges]
+        pages: List[Tuple[int, str]] = []
+        for future in futures:
+            pages.extend(future.result())
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    pages.sort(key=lambda item: item[0])
+    return pages
+
+
+def parse_pdf(path: Path, *, workers: int = 1, parallel_threshold: int = 64) -> Dict[str, Any]:
+    from pypdf import PdfReader
+
+    with span("pdf.open", file=path.name) as attrs:
+        reader = PdfReader(str(path))
+        page_count = attrs["pages"] = len(reader.pages)
+
+    pages: List[Tuple[int, str]] = []
+    if workers > 1 and page_count >= parallel_threshold:
         try:
-            text = page.extract_text() or ""
+            with span("pdf.extract_parallel", pages=page_count, workers=min(workers, page_count)):
+                pages = _extract_parallel(path, page_count, min(workers, page_count))
         except Exception as exc:  # pragma: no cover - safety net
-            logger.warning("Failed to extract text from page %s of %s: %s", index, path.name, exc)
-            text = ""
-        text = text.strip()
-        if not text:
-            text = "[No selectable text on this page – likely scanned or image-based.]"
-        elements.append({"page_number": index, "text": text})
+            logger.warning("Parallel extraction failed for %s, falling back to serial: %s", path.name, exc)
+            pages = []
+    if not pages:
+        with span("pdf.extract", pages=page_count):
+            pages = [
+                (index, _extract_page_text(page, index, path.name))
+                for index, page in enumerate(reader.pages, start=1)
+            ]
+
+    elements: List[Dict[str, Any]] = [{"page_number": index, "text": text} for index, text in pages]
 
     if not elements:
         elements.append({"page_number": 1, "text": "[PDF contained no extractable pages.]"})
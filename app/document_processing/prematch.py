@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Header keywords that identify the numeric columns of a charge table. A
+# column gets at most one role, checked in this order.
+_ROLE_PATTERNS = (
+    ("rate", re.compile(r"\b(?:rate|tariff|price|unit\s*(?:price|cost)|per\s*unit)\b", re.IGNORECASE)),
+    ("amount", re.compile(r"\b(?:amount|amt|total|value|charges?|cost|net|gross|sum)\b", re.IGNORECASE)),
+    ("quantity", re.compile(r"\b(?:qty|quantity|nbr|count|units?|moves?|teus?|pcs|volume)\b", re.IGNORECASE)),
+)
+_ANY_ROLE = re.compile("|".join(pattern.pattern for _role, pattern in _ROLE_PATTERNS), re.IGNORECASE)
+_TOTAL_RE = r"^\s*(?:sub\s*-?\s*)?total\b"
+_UNNAMED_RE = re.compile(r"^Unnamed: \d+$")
+
+# Absolute tolerance when comparing rates and amounts (currency rounding).
+AMOUNT_TOLERANCE = 0.01
+
+
+def _normalise(value: Any) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+def _cells(sheet: Dict[str, Any]) -> pd.DataFrame:
+    rows = sheet.get("rows") or []
+    columns = list(sheet.get("columns") or (rows[0].keys() if rows else []))
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    return frame.fillna("").astype(str).apply(lambda column: column.str.strip())
+
+
+def _to_numbers(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.apply(
+        lambda column: pd.to_numeric(column.str.replace(",", "", regex=False), errors="coerce")
+    )
+
+
+def _header_names(values: List[str]) -> Dict[int, str]:
+    """Column position -> unique header name for the non-blank header cells."""
+    names: Dict[int, str] = {}
+    seen: Dict[str, int] = {}
+    for position, value in enumerate(values):
+        if not value:
+            continue
+        count = seen.get(value, 0)
+        seen[value] = count + 1
+        names[position] = value if count == 0 else f"{value}.{count}"
+    return names
+
+
+def _roles(headers: Dict[int, str]) -> Dict[str, int]:
+    roles: Dict[str, int] = {}
+    for role, pattern in _ROLE_PATTERNS:
+        for position, name in headers.items():
+            if position not in roles.values() and pattern.search(name):
+                roles[role] = position
+                break
+    return roles
+
+
+def find_tables(sheet: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Locate charge tables in a parsed sheet.
+
+    A table starts at a header (the sheet's own columns, or an in-sheet row of
+    labels naming a quantity, amount or rate column) and runs until the next
+    header or blank row. Each table carries its body as a string frame, the
+    matching numeric frame, the header name per column and the column roles.
+    """
+    cells = _cells(sheet)
+    if cells.empty:
+        return []
+    numbers = _to_numbers(cells)
+    filled = cells != ""
+    textual = filled & numbers.isna()
+    blank = ~filled.any(axis=1)
+    mentions_role = cells.apply(lambda column: column.str.contains(_ANY_ROLE)).any(axis=1)
+    is_header = (textual.sum(axis=1) >= 2) & numbers.notna().sum(axis=1).eq(0) & mentions_role
+
+    starts: List[Tuple[int, Dict[int, str]]] = []
+    own = [str(column) for column in cells.columns]
+    if not all(_UNNAMED_RE.match(name) for name in own[1:]) and _roles(_header_names(own)):
+        starts.append((-1, _header_names(own)))
+    starts.extend((int(index), _header_names(cells.iloc[index].tolist())) for index in np.flatnonzero(is_header))
+
+    stops = np.flatnonzero(blank | is_header)
+    tables: List[Dict[str, Any]] = []
+    for start, headers in starts:
+        roles = _roles(headers)
+        if not roles:
+            continue
+        later = stops[stops > start]
+        stop = int(later[0]) if later.size else len(cells)
+        if stop <= start + 1:
+            continue
+        positions = sorted(headers)
+        tables.append({
+            "headers": [headers[position] for position in positions],
+            "cells": cells.iloc[start + 1:stop, positions].set_axis([headers[p] for p in positions], axis=1),
+            "numbers": numbers.iloc[start + 1:stop, positions].set_axis([headers[p] for p in positions], axis=1),
+            "roles": {role: headers[position] for role, position in roles.items()},
+        })
+    return tables
+
+
+def _descriptors(table: Dict[str, Any]) -> List[str]:
+    role_columns = set(table["roles"].values())
+    filled = (table["cells"] != "").any()
+    return [name for name in table["headers"] if name not in role_columns and filled[name]]
+
+
+def _role_values(table: Dict[str, Any], role: str) -> pd.Series:
+    column = table["roles"].get(role)
+    if column is None:
+        return pd.Series(np.nan, index=table["cells"].index)
+    return table["numbers"][column]
+
+
+def contract_rates(contract: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rate tables from a spreadsheet contract, one frame per table.
+
+    Each frame holds the normalised descriptor columns, ``contract_rate`` and
+    ``contract_ref``. Descriptor combinations priced more than once at
+    different rates are dropped because they cannot be matched exactly.
+    """
+    rate_tables: List[Dict[str, Any]] = []
+    for sheet_name, sheet in (contract.get("sheets") or {}).items():
+        offset = sheet.get("row_offset", 0)
+        for table in find_tables(sheet):
+            if "rate" not in table["roles"]:
+                continue
+            descriptors = _descriptors(table)
+            if not descriptors:
+                continue
+            frame = table["cells"][descriptors].apply(lambda column: column.map(_normalise))
+            frame.columns = [_normalise(name) for name in descriptors]
+            frame["contract_rate"] = _role_values(table, "rate")
+            frame["contract_ref"] = [f"{sheet_name} row {offset + index + 1}" for index in frame.index]
+            frame = frame[frame["contract_rate"].notna()]
+            keys = [column for column in frame.columns if column not in {"contract_rate", "contract_ref"}]
+            frame = frame.drop_duplicates(subset=keys + ["contract_rate"])
+            frame = frame[~frame.duplicated(subset=keys, keep=False)]
+            if not frame.empty:
+                rate_tables.append({"keys": keys, "frame": frame})
+    return rate_tables
+
+
+def _join_rates(table: Dict[str, Any], descriptors: List[str], rate_tables: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Contract rate and reference per invoice row (NaN where nothing joins)."""
+    index = table["cells"].index
+    joined = pd.DataFrame({"contract_rate": np.nan, "contract_ref": ""}, index=index)
+    if not descriptors:
+        return joined
+    by_name = {_normalise(name): name for name in descriptors}
+    candidates = [(len(set(by_name) & set(rates["keys"])), rates) for rates in rate_tables]
+    candidates = [(shared, rates) for shared, rates in candidates if shared]
+    if not candidates:
+        return joined
+    _shared, rates = max(candidates, key=lambda candidate: candidate[0])
+    keys = [key for key in rates["keys"] if key in by_name]
+    left = table["cells"][[by_name[key] for key in keys]].apply(lambda column: column.map(_normalise))
+    left.columns = keys
+    right = rates["frame"][keys + ["contract_rate", "contract_ref"]]
+    right = right[~right.duplicated(subset=keys, keep=False)]
+    merged = left.reset_index().merge(right, on=keys, how="left").set_index("index")
+    joined.loc[merged.index, "contract_rate"] = merged["contract_rate"]
+    joined.loc[merged.index, "contract_ref"] = merged["contract_ref"].fillna("")
+    return joined
+
+
+def prematch_invoice(invoice: Dict[str, Any], contract: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Classify billable invoice rows and match them against contract rates.
+
+    Returns ``charge_items``: one entry per row with a quantity, amount or
+    rate, ``category`` ``charge`` (priced) or ``possible_charge`` (quantity
+    only). Rows whose rate, or amount / quantity, equals the single contract
+    rate joined on the shared descriptor columns get ``status: Compliant``.
+    Total rows are skipped.
+    """
+    rate_tables = contract_rates(contract or {})
+    items: List[Dict[str, Any]] = []
+    for sheet_name, sheet in (invoice.get("sheets") or {}).items():
+        offset = sheet.get("row_offset", 0)
+        for table in find_tables(sheet):
+            cells = table["cells"]
+            quantity = _role_values(table, "quantity")
+            rate = _role_values(table, "rate")
+            amount = _role_values(table, "amount")
+            is_total = cells.apply(lambda column: column.str.contains(_TOTAL_RE, case=False)).any(axis=1)
+            priced = (amount.notna() & amount.ne(0)) | (rate.notna() & quantity.notna())
+            possible = ~priced & quantity.notna() & quantity.gt(0)
+            billable = ~is_total & (priced | possible)
+            if not billable.any():
+                continue
+
+            descriptors = _descriptors(table)
+            joined = _join_rates(table, descriptors, rate_tables)
+            contract_rate = joined["contract_rate"].astype(float)
+            known = contract_rate.notna()
+            rate_ok = rate.isna() | np.isclose(rate, contract_rate, rtol=0, atol=AMOUNT_TOLERANCE)
+            amount_ok = (
+                amount.isna()
+                | quantity.isna()
+                | np.isclose(amount, quantity * contract_rate, rtol=0, atol=AMOUNT_TOLERANCE)
+            )
+            evidence = rate.notna() | (amount.notna() & quantity.notna())
+            compliant = billable & priced & known & evidence & rate_ok & amount_ok
+
+            description = cells[descriptors].apply(lambda row: " ".join(value for value in row if value), axis=1) \
+                if descriptors else pd.Series("", index=cells.index)
+            for index in np.flatnonzero(billable.to_numpy()):
+                label = cells.index[index]
+                item: Dict[str, Any] = {
+                    "sheet": sheet_name,
+                    "line": offset + int(label) + 1,
+                    "description": description[label],
+                    "category": "charge" if priced[label] else "possible_charge",
+                }
+                for role, values in (("quantity", quantity), ("rate", rate), ("amount", amount)):
+                    if pd.notna(values[label]):
+                        item[role] = float(values[label])
+                if known[label]:
+                    item["contract_rate"] = float(contract_rate[label])
+                    item["contract_ref"] = joined["contract_ref"][label]
+                if compliant[label]:
+                    item["status"] = "Compliant"
+                items.append(item)
+    return items
+
+
+def residual_invoice(
+    invoice: Dict[str, Any],
+    charge_items: List[Dict[str, Any]],
+    *,
+    resolved: Iterable[Tuple[str, int]] = (),
+) -> Dict[str, Any]:
+    """The invoice payload the LLM still has to review.
+
+    Blank rows, rows pre-matched as Compliant and ``resolved`` ``(sheet,
+    line)`` rows are removed. Every remaining row gains a leading ``line``
+    (its original line number, since positions shift) and, when there are
+    charge items, ``category`` (``charge``/``possible_charge`` for billable
+    rows, blank for context rows); unmatched rows whose descriptors joined to
+    a contract rate also carry ``contract_rate``.
+    """
+    by_line = {(item["sheet"], item["line"]): item for item in charge_items}
+    skip = set(resolved) | {key for key, item in by_line.items() if item.get("status") == "Compliant"}
+    with_rate = any("contract_rate" in item and "status" not in item for item in charge_items)
+    extra_columns = ["line"] + (["category"] if charge_items else []) + (["contract_rate"] if with_rate else [])
+    sheets: Dict[str, Any] = {}
+    for sheet_name, sheet in (invoice.get("sheets") or {}).items():
+        offset = sheet.get("row_offset", 0)
+        rows = []
+        for position, row in enumerate(sheet.get("rows") or [], start=1):
+            key = (sheet_name, offset + position)
+            if key in skip or not any(str(value).strip() for value in row.values()):
+                continue
+            item = by_line.get(key, {})
+            extra: Dict[str, Any] = {"line": offset + position}
+            if charge_items:
+                extra["category"] = item.get("category", "")
+            if with_rate:
+                extra["contract_rate"] = item.get("contract_rate", "")
+            rows.append({**extra, **row})
+        columns = extra_columns + list(sheet.get("columns") or [])
+        sheets[sheet_name] = {**sheet, "columns": columns, "rows": rows}
+    return {**invoice, "sheets": sheets}
+
+
+def _format_number(value: float) -> str:
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+
+def render_prematched(items: List[Dict[str, Any]]) -> str:
+    """Markdown Line Item Review rows for the deterministically matched items."""
+    lines = [
+        "| Sheet | Line | Invoice Details | Contract Alignment | Status | Confidence |",
+        "|---|---|---|---|---|---|",
+    ]
+    for item in items:
+        figures = ", ".join(
+            f"{role} {_format_number(item[role])}" for role in ("quantity", "rate", "amount") if role in item
+        )
+        details = f"{item['description']} ({figures})" if item["description"] else figures
+        alignment = f"Rate {_format_number(item['contract_rate'])} per [{item['contract_ref']}]"
+        lines.append(
+            f"| {item['sheet']} | {item['line']} | {details.replace('|', '/')} | {alignment} | Compliant | High (exact rate match) |"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[str, Optional[float]], None]
+StreamCallback = Callable[[str, str], None]
+JobWork = Callable[[ProgressCallback, StreamCallback], Dict[str, Any]]
+
+ACTIVE_STATES = ("queued", "running")
+_INTERRUPTED = "Interrupted: the process running the job stopped before it finished."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL DEFAULT '',
+    stages TEXT NOT NULL DEFAULT '[]',
+    params TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    owner TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+"""
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """Runs review jobs on a local thread pool and records their progress in SQLite.
+
+    Job rows (status, current stage, finished stages with their durations,
+    result or error) are visible to every session and survive a browser
+    reconnect; text streamed by a running job is kept in memory only.
+
+    While a job is queued or running here, a heartbeat refreshes its
+    ``updated_at`` every ``heartbeat_seconds``. Active jobs whose heartbeat is
+    older than ``stale_seconds`` (their process is gone, e.g. a container
+    restarted under a new hostname) or whose process on this host has exited
+    are marked as interrupted, on start-up and when they are looked up.
+    """
+
+    def __init__(
+        self, path: Path, *, workers: int, heartbeat_seconds: float = 15.0, stale_seconds: float = 120.0
+    ) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._owner = _owner()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="review-job")
+        self._live_lock = threading.Lock()
+        self._live: Dict[str, Dict[str, str]] = {}
+        self._active: Set[str] = set()
+        self.heartbeat_seconds = heartbeat_seconds
+        # Never shorter than a few missed heartbeats, or live jobs would be reaped.
+        self.stale_seconds = max(stale_seconds, 3 * heartbeat_seconds)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._abandon_orphans()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30.0)
+
+    def _abandon_orphans(self, job_id: Optional[str] = None) -> None:
+        """Mark active jobs (all, or just ``job_id``) interrupted if nothing is running them any more."""
+        host = self._owner.split(":", 1)[0]
+        now = time.time()
+        query = "SELECT job_id, owner, updated_at FROM jobs WHERE status IN (?, ?)"
+        params: List[Any] = list(ACTIVE_STATES)
+        if job_id is not None:
+            query += " AND job_id = ?"
+            params.append(job_id)
+        with self._live_lock:
+            active = set(self._active)
+        with closing(self._connect()) as conn, conn:
+            orphans = []
+            for candidate, owner, updated_at in conn.execute(query, params).fetchall():
+                if candidate in active:
+                    continue
+                owner_host, _sep, pid = owner.partition(":")
+                dead = owner_host == host and owner != self._owner and not _pid_alive(int(pid or 0))
+                if dead or updated_at < now - self.stale_seconds:
+                    orphans.append((_INTERRUPTED, now, candidate, *ACTIVE_STATES))
+            conn.executemany(
+                "UPDATE jobs SET status = 'error', error = ?, updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                orphans,
+            )
+        if orphans:
+            logger.warning("Marked %s orphaned jobs as interrupted", len(orphans))
+
+    def _heartbeat(self) -> None:
+        while not self._stopped.wait(self.heartbeat_seconds):
+            with self._live_lock:
+                active = list(self._active)
+            if not active:
+                continue
+            try:
+                with closing(self._connect()) as conn, conn:
+                    conn.execute(
+                        f"UPDATE jobs SET updated_at = ? WHERE job_id IN ({', '.join('?' * len(active))})",
+                        (time.time(), *active),
+                    )
+            except sqlite3.Error:
+                logger.exception("Job heartbeat failed")
+
+    def submit(self, job_id: str, work: JobWork, *, kind: str = "review", params: Optional[Dict[str, Any]] = None) -> str:
+        """Queue ``work(progress, stream)`` under ``job_id`` and return the id.
+
+        ``progress(stage, seconds)`` marks ``stage`` as current, or as finished
+        after ``seconds`` when given; ``stream(step, text)`` publishes partial
+        LLM output. The dict ``work`` returns is stored as the job result.
+        A finished or failed job can be queued again under the same id (its
+        progress is reset); one still queued or running cannot.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            queued = conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, owner, created_at, updated_at)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?)"
+                " ON CONFLICT(job_id) DO UPDATE SET kind = excluded.kind, status = 'queued', stage = '', stages = '[]',"
+                " params = excluded.params, result = NULL, error = NULL, owner = excluded.owner,"
+                " created_at = excluded.created_at, updated_at = excluded.updated_at"
+                " WHERE jobs.status NOT IN (?, ?)",
+                (job_id, kind, json.dumps(params or {}, ensure_ascii=False), self._owner, now, now, *ACTIVE_STATES),
+            ).rowcount
+        if not queued:
+            raise ValueError(f"Job {job_id} is still queued or running.")
+        with self._live_lock:
+            self._active.add(job_id)
+        self._pool.submit(self._run, job_id, work)
+        logger.info("Job %s queued (%s)", job_id, kind)
+        return job_id
+
+    def _run(self, job_id: str, work: JobWork) -> None:
+        self._update(job_id, status="running")
+        try:
+            result = work(
+                lambda stage, seconds=None: self._progress(job_id, stage, seconds),
+                lambda step, text: self._stream(job_id, step, text),
+            )
+        except Exception as exc:  # noqa: BLE001 - the job row carries the failure
+            logger.exception("Job %s failed", job_id)
+            self._update(job_id, status="error", error=str(exc) or exc.__class__.__name__)
+        else:
+            self._update(job_id, status="done", stage="done", result=json.dumps(result, ensure_ascii=False, default=str))
+        finally:
+            with self._live_lock:
+                self._live.pop(job_id, None)
+                self._active.discard(job_id)
+
+    def _progress(self, job_id: str, stage: str, seconds: Optional[float]) -> None:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT stages FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            stages: List[Dict[str, Any]] = json.loads(row[0]) if row else []
+            if seconds is not None:
+                stages.append({"stage": stage, "seconds": round(seconds, 3)})
+            conn.execute(
+                "UPDATE jobs SET stage = ?, stages = ?, updated_at = ? WHERE job_id = ?",
+                (stage, json.dumps(stages), time.time(), job_id),
+            )
+
+    def _stream(self, job_id: str, step: str, text: str) -> None:
+        with self._live_lock:
+            self._live.setdefault(job_id, {})[step] = text
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+                (*fields.values(), time.time(), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._abandon_orphans(job_id)
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"])
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        with self._live_lock:
+            job["live"] = dict(self._live.get(job_id, {}))
+        return job
+
+    def list_jobs(self, *, limit: int = 20) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [job for job in (self.get(job_id) for (job_id,) in rows) if job is not None]
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+        self._stopped.set()
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Process-wide runner, so jobs outlive the Streamlit script run that queued them."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(
+                settings.job_db_path,
+                workers=settings.job_workers,
+                heartbeat_seconds=settings.job_heartbeat_seconds,
+                stale_seconds=settings.job_stale_seconds,
+            )
+        return _runner
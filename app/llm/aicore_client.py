@@ -1,16 +1,44 @@
 from __future__ import annotations
 
+import json
+import logging
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import requests
 from requests import Response
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from tenacity import RetryCallState, retry, stop_after_attempt, wait_exponential
+
+from ..utils import cancellation, metrics
+from ..utils.config import settings
+from .http_session import build_session
+from .rate_limit import RETRY_STATUSES, RateLimiter, estimate_request_tokens, get_rate_limiter
+from .token_cache import TokenCache
+
+logger = logging.getLogger(__name__)
+
+# Tokens this close to expiry are never handed out.
+_EXPIRY_SKEW_SECONDS = 30.0
 
 
 class SAPAICoreClientError(RuntimeError):
-    pass
+    def __init__(self, message: str, *, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _retryable(retry_state: RetryCallState) -> bool:
+    """Retry transport and AI Core errors, except throttling the client's rate limiter already retried."""
+    exc = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    if isinstance(exc, requests.RequestException):
+        return True
+    if not isinstance(exc, SAPAICoreClientError):
+        return False
+    # The limiter honoured Retry-After up to LLM_MAX_RETRIES times; backing
+    # off again here would multiply the sends and ignore the server's delay.
+    return exc.status_code not in RETRY_STATUSES or retry_state.args[0].rate_limiter is None
 
 
 class SAPAICoreClient:
@@ -28,6 +56,10 @@ class SAPAICoreClient:
         chat_completions_path: Optional[str] = None,
         request_timeout: float = 120.0,
         api_version: Optional[str] = "2023-05-15",
+        session: Optional[requests.Session] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        token_cache: Optional[TokenCache] = None,
+        token_refresh_margin: float = 300.0,
     ) -> None:
         self.client_id = client_id
         self.client_secret = client_secret
@@ -47,9 +79,31 @@ class SAPAICoreClient:
             self.chat_completions_path = default_path
         self.request_timeout = request_timeout
         self.api_version = api_version
+        self.session = session or build_session()
+        self.rate_limiter = rate_limiter
+
+        self.token_cache = token_cache
+        self.token_refresh_margin = token_refresh_margin
 
         self._token: Optional[str] = None
         self._token_expiry: float = 0.0
+        self._token_key = TokenCache.key_for(self.auth_url, client_id, scope)
+        self._token_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._scheduled_for: Optional[float] = None
+        self._closed = False
+
+    def close(self) -> None:
+        with self._timer_lock:
+            self._closed = True
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+        self.session.close()
+
+    def connection_stats(self) -> Dict[str, int]:
+        stats = getattr(self.session, "connection_stats", None)
+        return stats() if stats else {}
 
     def _token_url(self) -> str:
         return f"{self.auth_url}/oauth/token"
@@ -65,21 +119,111 @@ class SAPAICoreClient:
     def _chat_url(self) -> str:
         return urljoin(f"{self.api_base}/", self.chat_completions_path.lstrip("/"))
 
+    # ---------------------------- OAuth token ----------------------------
+
     def _get_token(self) -> str:
+        token = self._usable_token()
+        if token is not None:
+            return token
+        # Single flight: one thread per process refreshes, the rest wait for it.
+        with self._token_lock:
+            token = self._usable_token()
+            if token is not None:
+                return token
+            return self._refresh_token()
+
+    def _usable_token(self) -> Optional[str]:
         now = time.time()
-        if self._token and now < self._token_expiry - 30:
+        if self._token and now < self._token_expiry - _EXPIRY_SKEW_SECONDS:
             return self._token
+        cached = self._newer_cached_token()
+        if cached is not None:
+            self._adopt_token(*cached)
+            return cached[0]
+        return None
+
+    def _newer_cached_token(self) -> Optional[Tuple[str, float]]:
+        if self.token_cache is None:
+            return None
+        cached = self.token_cache.get(self._token_key)
+        if cached is None or cached[1] <= self._token_expiry or time.time() >= cached[1] - _EXPIRY_SKEW_SECONDS:
+            return None
+        return cached
+
+    def _adopt_token(self, token: str, expires_at: float) -> None:
+        self._token, self._token_expiry = token, expires_at
+        self._schedule_refresh()
+
+    def _refresh_token(self) -> str:
+        if self.token_cache is None:
+            token, expires_at = self._fetch_token()
+        else:
+            token, expires_at = self._refresh_shared_token()
+        self._adopt_token(token, expires_at)
+        return token
 
+    def _refresh_shared_token(self) -> Tuple[str, float]:
+        # Single flight across processes: whoever holds the lease fetches, the
+        # others pick its token up from the cache. An abandoned lease expires.
+        lease_seconds = self.request_timeout + 5
+        while not self.token_cache.claim_refresh(self._token_key, lease_seconds=lease_seconds):
+            cached = self._newer_cached_token()
+            if cached is not None:
+                return cached
+            time.sleep(0.2)
+        try:
+            cached = self._newer_cached_token()
+            if cached is not None:
+                self.token_cache.release_refresh(self._token_key)
+                return cached
+            token, expires_at = self._fetch_token()
+        except BaseException:
+            self.token_cache.release_refresh(self._token_key)
+            raise
+        self.token_cache.put(self._token_key, token, expires_at)
+        return token, expires_at
+
+    def _schedule_refresh(self, delay: Optional[float] = None) -> None:
+        """Refresh ahead of expiry on a timer so chat requests never wait for a token."""
+        with self._timer_lock:
+            if self._closed or (delay is None and self._scheduled_for == self._token_expiry):
+                return
+            if delay is None:
+                remaining = self._token_expiry - time.time()
+                delay = max(remaining - self.token_refresh_margin, remaining / 2, 0.0)
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+            timer = threading.Timer(delay, self._refresh_in_background)
+            timer.daemon = True
+            timer.start()
+            self._refresh_timer = timer
+            self._scheduled_for = self._token_expiry
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._token_lock:
+                cached = self._newer_cached_token()
+                if cached is not None and cached[1] - self.token_refresh_margin > time.time():
+                    self._adopt_token(*cached)
+                else:
+                    self._refresh_token()
+        except Exception:  # noqa: BLE001 - the current token stays valid until it expires
+            logger.warning("Background AI Core token refresh failed; retrying in 30s", exc_info=True)
+            self._schedule_refresh(30.0)
+
+    def _fetch_token(self) -> Tuple[str, float]:
+        now = time.time()
         payload = {"grant_type": "client_credentials"}
         if self.scope:
             payload["scope"] = self.scope
 
-        response = requests.post(
-            self._token_url(),
-            data=payload,
-            auth=(self.client_id, self.client_secret),
-            timeout=self.request_timeout,
-        )
+        with metrics.span("aicore.token"):
+            response = self.session.post(
+                self._token_url(),
+                data=payload,
+                auth=(self.client_id, self.client_secret),
+                timeout=self.request_timeout,
+            )
         if response.status_code != 200:
             raise SAPAICoreClientError(f"Token request failed: {response.status_code} {response.text}")
 
@@ -89,15 +233,16 @@ class SAPAICoreClient:
             raise SAPAICoreClientError("No access token in AI Core response")
 
         expires_in = float(body.get("expires_in", 600))
-        self._token = token
-        self._token_expiry = now + expires_in
-        return token
+        logger.info("Fetched AI Core access token valid for %.0fs", expires_in)
+        return token, now + expires_in
+
+    # ---------------------------- chat ----------------------------
 
     @retry(
         reraise=True,
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=2, min=1, max=30),
-        retry=retry_if_exception_type((requests.RequestException, SAPAICoreClientError)),
+        retry=_retryable,
     )
     def chat_completion(
         self,
@@ -119,15 +264,37 @@ class SAPAICoreClient:
         params: Dict[str, Any] = {}
         if self.api_version and "v2" in self.chat_completions_path:
             params["api-version"] = self.api_version
-        response = requests.post(
-            self._chat_url(),
-            headers=self._build_headers(),
-            json=payload,
-            params=params,
-            timeout=self.request_timeout,
-        )
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        metrics.count("llm_requests")
+        metrics.count("llm_request_bytes", len(data))
+
+        def send() -> Response:
+            cancellation.check()
+            return self.session.post(
+                self._chat_url(),
+                headers=self._build_headers(),
+                data=data,
+                params=params,
+                timeout=self.request_timeout,
+            )
+
+        with metrics.span("llm.request", model=payload.get("model", ""), stream=False) as attrs:
+            if self.rate_limiter is None:
+                response = send()
+            else:
+                # Throttled responses are retried by the limiter after their
+                # Retry-After; tenacity only sees what is left once it gives up.
+                with self.rate_limiter.request(send, tokens=estimate_request_tokens(messages, max_tokens)) as response:
+                    pass
+            attrs["status"] = response.status_code
+            attrs["response_bytes"] = len(response.content)
+            metrics.count("llm_response_bytes", attrs["response_bytes"])
         self._raise_for_status(response)
         body = response.json()
+        usage = body.get("usage") or {}
+        metrics.count("llm_prompt_tokens", usage.get("prompt_tokens", 0))
+        metrics.count("llm_completion_tokens", usage.get("completion_tokens", 0))
         choices = body.get("choices") or []
         if not choices:
             raise SAPAICoreClientError("No choices returned from AI Core")
@@ -143,5 +310,25 @@ class SAPAICoreClient:
             response.raise_for_status()
         except requests.HTTPError as exc:
             raise SAPAICoreClientError(
-                f"AI Core request failed: {response.status_code} {response.text}"
+                f"AI Core request failed: {response.status_code} {response.text}", status_code=response.status_code
             ) from exc
+
+
+def build_aicore_client() -> SAPAICoreClient:
+    """AI Core client configured from ``SAP_AICORE_*`` settings, sharing tokens and rate limits process-wide."""
+    return SAPAICoreClient(
+        client_id=settings.sap_aicore_client_id,
+        client_secret=settings.sap_aicore_client_secret,
+        auth_url=settings.sap_aicore_auth_url,
+        api_base=settings.sap_aicore_api_base,
+        deployment_id=settings.sap_aicore_deployment_id,
+        model_name=settings.sap_aicore_model_name,
+        resource_group=settings.sap_aicore_resource_group,
+        scope=settings.sap_aicore_scope,
+        chat_completions_path=settings.chat_completions_path,
+        request_timeout=settings.request_timeout,
+        api_version=settings.sap_aicore_api_version,
+        rate_limiter=get_rate_limiter(),
+        token_cache=TokenCache(settings.sap_aicore_token_cache_path),
+        token_refresh_margin=settings.sap_aicore_token_refresh_seconds,
+    )
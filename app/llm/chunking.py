@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List
+
+# Rough, dependency-free estimate; ~4 characters per token holds well enough
+# for English contract text and YAML to decide when and where to split.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _estimate_value(value: Any) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def chunk_payload(payload: Dict[str, Any], *, token_budget: int) -> List[Dict[str, Any]]:
+    """Split a parsed document payload into chunks of roughly ``token_budget`` tokens.
+
+    PDF payloads are split on page boundaries (a single oversized page is split
+    on text), spreadsheet payloads on row boundaries with ``row_offset`` kept
+    so line numbers stay meaningful. Every chunk keeps the payload's shape.
+    """
+    if payload.get("elements"):
+        return _chunk_elements(payload, token_budget)
+    if payload.get("sheets"):
+        return _chunk_sheets(payload, token_budget)
+    return [payload]
+
+
+def _chunk_elements(payload: Dict[str, Any], token_budget: int) -> List[Dict[str, Any]]:
+    max_chars = token_budget * CHARS_PER_TOKEN
+    groups: List[List[Dict[str, Any]]] = [[]]
+    used = 0
+    for element in payload["elements"]:
+        pieces = [element]
+        text = element.get("text") or ""
+        if len(text) > max_chars:
+            pieces = [
+                {**element, "text": text[start:start + max_chars], "part": index + 1}
+                for index, start in enumerate(range(0, len(text), max_chars))
+            ]
+        for piece in pieces:
+            cost = _estimate_value(piece)
+            if groups[-1] and used + cost > token_budget:
+                groups.append([])
+                used = 0
+            groups[-1].append(piece)
+            used += cost
+    base = {key: value for key, value in payload.items() if key != "elements"}
+    return [
+        {**base, "chunk": f"{index}/{len(groups)}", "elements": group}
+        for index, group in enumerate(groups, start=1)
+    ]
+
+
+def _chunk_sheets(payload: Dict[str, Any], token_budget: int) -> List[Dict[str, Any]]:
+    chunks: List[Dict[str, Dict[str, Any]]] = [{}]
+    used = 0
+    for sheet_name, sheet in payload["sheets"].items():
+        columns = sheet.get("columns") or []
+        header_cost = _estimate_value(columns)
+        rows = sheet.get("rows") or []
+        start = 0
+        current: List[Any] = []
+        for index, row in enumerate(rows):
+            cost = _estimate_value(row)
+            if used + header_cost + cost > token_budget and (current or chunks[-1]):
+                if current:
+                    chunks[-1][sheet_name] = {"columns": columns, "row_offset": start, "rows": current}
+                chunks.append({})
+                used = 0
+                start = index
+                current = []
+            current.append(row)
+            used += cost
+        if current or not rows:
+            chunks[-1][sheet_name] = {"columns": columns, "row_offset": start, "rows": current}
+            used += header_cost
+    chunks = [chunk for chunk in chunks if chunk]
+    base = {key: value for key, value in payload.items() if key != "sheets"}
+    return [
+        {**base, "chunk": f"{index}/{len(chunks)}", "sheets": sheets}
+        for index, sheets in enumerate(chunks, start=1)
+    ]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..utils.config import settings
+
+
+class PooledSession(requests.Session):
+    """``requests.Session`` backed by a bounded keep-alive connection pool.
+
+    ``pool_connections`` caps how many hosts keep a pool, ``pool_maxsize`` caps
+    the connections kept open per host. ``connection_stats`` reports how many
+    requests were served over a reused connection versus a fresh handshake.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = 4,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+    ) -> None:
+        super().__init__()
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.mount("https://", self._adapter)
+        self.mount("http://", self._adapter)
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+
+        # Pools evicted from the pool manager take their counters with them,
+        # so fold them into running totals before they are disposed.
+        self._lock = threading.Lock()
+        self._retired = {"requests": 0, "new_connections": 0}
+        pools = self._adapter.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def _retire(pool: Any) -> None:
+            self._record_retired(pool)
+            if dispose is not None:
+                dispose(pool)
+
+        pools.dispose_func = _retire
+
+    def _record_retired(self, pool: Any) -> None:
+        with self._lock:
+            self._retired["requests"] += getattr(pool, "num_requests", 0)
+            self._retired["new_connections"] += getattr(pool, "num_connections", 0)
+
+    def connection_stats(self) -> Dict[str, int]:
+        with self._lock:
+            requests_sent = self._retired["requests"]
+            new_connections = self._retired["new_connections"]
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += getattr(pool, "num_requests", 0)
+            new_connections += getattr(pool, "num_connections", 0)
+        return {
+            "requests": requests_sent,
+            "new_connections": new_connections,
+            "reused_connections": max(0, requests_sent - new_connections),
+            "active_pools": len(pools),
+        }
+
+
+def build_session() -> PooledSession:
+    """Session sized by the ``HTTP_POOL_*`` / ``HTTP_KEEP_ALIVE`` settings, for every LLM client."""
+    return PooledSession(
+        pool_connections=settings.http_pool_connections,
+        pool_maxsize=settings.http_pool_maxsize,
+        pool_block=settings.http_pool_block,
+        keep_alive=settings.http_keep_alive,
+    )
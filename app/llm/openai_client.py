@@ -1,9 +1,22 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
+from ..utils import cancellation, metrics
+from .http_session import build_session
+from .rate_limit import RateLimiter, estimate_request_tokens
+from .response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+Accept = Callable[[str], bool]
+
 
 class OpenAIClientError(RuntimeError):
     """Raised when the OpenAI API returns an error."""
@@ -17,6 +30,9 @@ class OpenAIChatClient:
         api_base: str = "https://api.openai.com/v1",
         model: str = "gpt-4o-mini",
         request_timeout: float = 120.0,
+        session: Optional[requests.Session] = None,
+        response_cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
     ) -> None:
         if not api_key:
             raise ValueError("OPENAI_API_KEY is required to use the contract agent.")
@@ -24,17 +40,39 @@ class OpenAIChatClient:
         self.api_base = api_base.rstrip("/")
         self.model = model
         self.request_timeout = request_timeout
+        self.session = session or build_session()
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+
+    def close(self) -> None:
+        self.session.close()
+
+    def connection_stats(self) -> Dict[str, int]:
+        stats = getattr(self.session, "connection_stats", None)
+        return stats() if stats else {}
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.response_cache.stats() if self.response_cache is not None else {}
+
+    def rate_limit_stats(self) -> Dict[str, float]:
+        return self.rate_limiter.stats() if self.rate_limiter is not None else {}
 
     def _chat_url(self) -> str:
         return f"{self.api_base}/chat/completions"
 
-    def chat_completion(
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _payload(
         self,
         messages: List[Dict[str, str]],
         *,
-        max_completion_tokens: int = 900,
-        temperature: Optional[float] = None,
-    ) -> str:
+        max_completion_tokens: int,
+        temperature: Optional[float],
+    ) -> Dict[str, Any]:
         payload: Dict[str, Any] = {
             "model": self.model,
             "messages": messages,
@@ -42,21 +80,170 @@ class OpenAIChatClient:
         }
         if temperature is not None:
             payload["temperature"] = temperature
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        response = requests.post(
-            self._chat_url(),
-            json=payload,
-            headers=headers,
-            timeout=self.request_timeout,
-        )
-        if response.status_code != 200:
-            raise OpenAIClientError(
-                f"OpenAI request failed: {response.status_code} {response.text}"
+        return payload
+
+    @contextmanager
+    def _post(self, payload: Dict[str, Any], *, stream: bool = False) -> Iterator[requests.Response]:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        metrics.count("llm_requests")
+        metrics.count("llm_request_bytes", len(body))
+
+        def send() -> requests.Response:
+            cancellation.check()
+            return self.session.post(
+                self._chat_url(),
+                data=body,
+                headers=self._headers(),
+                timeout=self.request_timeout,
+                stream=stream,
             )
-        body = response.json()
+
+        if self.rate_limiter is None:
+            with send() as response:
+                yield response
+            return
+        tokens = estimate_request_tokens(payload["messages"], payload["max_completion_tokens"])
+        with self.rate_limiter.request(send, tokens=tokens) as response, response:
+            yield response
+
+    @staticmethod
+    def _record_usage(attrs: Dict[str, Any], usage: Optional[Dict[str, Any]]) -> None:
+        if not usage:
+            return
+        attrs["prompt_tokens"] = usage.get("prompt_tokens", 0)
+        attrs["completion_tokens"] = usage.get("completion_tokens", 0)
+        metrics.count("llm_prompt_tokens", attrs["prompt_tokens"])
+        metrics.count("llm_completion_tokens", attrs["completion_tokens"])
+
+    def _cached(
+        self,
+        messages: List[Dict[str, str]],
+        max_completion_tokens: int,
+        temperature: Optional[float],
+        bypass_cache: bool,
+        accept: Optional[Accept],
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if self.response_cache is None:
+            return None, None
+        cache_key = ResponseCache.fingerprint(self.model, messages, max_completion_tokens, temperature)
+        # A bypassed call still refreshes the cached entry with the new answer.
+        cached = None if bypass_cache else self.response_cache.get(cache_key)
+        if cached is not None and not _cacheable(cached, accept):
+            cached = None  # written before answers were vetted
+        if cached is not None:
+            logger.info("LLM response cache hit model=%s key=%s", self.model, cache_key[:12])
+            metrics.count("llm_cache_hits")
+        return cache_key, cached
+
+    def _store(self, cache_key: Optional[str], content: str, accept: Optional[Accept]) -> None:
+        if cache_key is None:
+            return
+        if not _cacheable(content, accept):
+            logger.info("LLM response not cached (empty or rejected) key=%s", cache_key[:12])
+            return
+        self.response_cache.put(cache_key, self.model, content)
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_completion_tokens: int = 900,
+        temperature: Optional[float] = None,
+        bypass_cache: bool = False,
+        accept: Optional[Accept] = None,
+    ) -> str:
+        cache_key, cached = self._cached(messages, max_completion_tokens, temperature, bypass_cache, accept)
+        if cached is not None:
+            return cached
+        content = self._request_completion(
+            messages,
+            max_completion_tokens=max_completion_tokens,
+            temperature=temperature,
+        )
+        self._store(cache_key, content, accept)
+        return content
+
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_completion_tokens: int = 900,
+        temperature: Optional[float] = None,
+        bypass_cache: bool = False,
+        accept: Optional[Accept] = None,
+    ) -> Iterator[str]:
+        """Yield content deltas from a ``stream=True`` (server-sent events) completion.
+
+        A cache hit is yielded as a single delta. The assembled text is cached
+        once the stream finishes, unless it is blank or ``accept`` rejects it.
+        """
+        cache_key, cached = self._cached(messages, max_completion_tokens, temperature, bypass_cache, accept)
+        if cached is not None:
+            yield cached
+            return
+        payload = self._payload(messages, max_completion_tokens=max_completion_tokens, temperature=temperature)
+        payload["stream"] = True
+        # Ask for a final usage event so streamed calls report token counts too.
+        payload["stream_options"] = {"include_usage": True}
+        parts: List[str] = []
+        started = time.perf_counter()
+        with metrics.span("llm.request", model=self.model, stream=True) as attrs, self._post(
+            payload, stream=True
+        ) as response:
+            attrs["status"] = response.status_code
+            if response.status_code != 200:
+                raise OpenAIClientError(
+                    f"OpenAI request failed: {response.status_code} {response.text}"
+                )
+            response.encoding = response.encoding or "utf-8"
+            received = 0
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    cancellation.check()  # closing the response ends the generation
+                    received += len(line) + 1
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        event = json.loads(data)
+                    except ValueError as exc:
+                        raise OpenAIClientError(f"Malformed OpenAI stream event: {data[:200]}") from exc
+                    if event.get("error"):
+                        raise OpenAIClientError(f"OpenAI stream failed: {event['error']}")
+                    self._record_usage(attrs, event.get("usage"))
+                    for choice in event.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            if not parts:
+                                attrs["first_token_seconds"] = round(time.perf_counter() - started, 4)
+                            parts.append(delta)
+                            yield delta
+            finally:
+                attrs["response_bytes"] = received
+                metrics.count("llm_response_bytes", received)
+        self._store(cache_key, "".join(parts), accept)
+
+    def _request_completion(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_completion_tokens: int,
+        temperature: Optional[float],
+    ) -> str:
+        payload = self._payload(messages, max_completion_tokens=max_completion_tokens, temperature=temperature)
+        with metrics.span("llm.request", model=self.model, stream=False) as attrs, self._post(payload) as response:
+            attrs["status"] = response.status_code
+            attrs["response_bytes"] = len(response.content)
+            attrs["server_seconds"] = round(response.elapsed.total_seconds(), 4)
+            metrics.count("llm_response_bytes", attrs["response_bytes"])
+            if response.status_code != 200:
+                raise OpenAIClientError(
+                    f"OpenAI request failed: {response.status_code} {response.text}"
+                )
+            body = response.json()
+            self._record_usage(attrs, body.get("usage"))
         choices = body.get("choices") or []
         if not choices:
             raise OpenAIClientError("OpenAI response did not contain choices")
@@ -67,3 +254,8 @@ class OpenAIChatClient:
                 return str(message["tool_calls"])
             return str(body)
         return content
+
+
+def _cacheable(content: str, accept: Optional[Accept]) -> bool:
+    """Blank answers and answers the caller rejects (``accept``) are never cached."""
+    return bool(content and content.strip()) and (accept is None or accept(content))
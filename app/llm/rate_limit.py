@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+
+import requests
+
+from ..utils import metrics
+from ..utils.config import settings
+from .chunking import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 429 is the provider's rate limit; 503 is what gateways send when overloaded
+# and usually carries a Retry-After as well.
+RETRY_STATUSES = frozenset({429, 503})
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a header duration such as ``"1s"``, ``"6m0s"``, ``"20ms"`` or ``"0.5"``."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNIT_SECONDS[unit] for number, unit in parts)
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Delay requested by ``Retry-After`` / ``retry-after-ms``, in seconds."""
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return max(0.0, float(milliseconds) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_completion_tokens: int) -> int:
+    # Providers count the completion allowance against the token quota up front.
+    return sum(estimate_tokens(message.get("content") or "") for message in messages) + max_completion_tokens
+
+
+class _Bucket:
+    """Per-minute token bucket. A capacity of 0 means the limit is not known (yet)."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.configured = float(max(0, per_minute))
+        self.capacity = self.configured
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.capacity:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_for(self, cost: float) -> float:
+        if not self.capacity:
+            return 0.0
+        missing = min(cost, self.capacity) - self.level
+        return max(0.0, missing * 60.0 / self.capacity)
+
+    def take(self, cost: float) -> None:
+        if self.capacity:
+            self.level -= min(cost, self.capacity)
+
+    def observe(self, limit: Optional[str], remaining: Optional[str]) -> None:
+        # The provider's view wins over the local estimate: it also counts
+        # traffic from other processes and machines sharing the key. A
+        # configured limit is kept as a ceiling, e.g. to leave quota to others.
+        try:
+            if limit is not None:
+                reported = float(limit)
+                if not self.capacity:
+                    self.level = reported
+                self.capacity = min(self.configured, reported) if self.configured else reported
+            if remaining is not None and self.capacity:
+                self.level = min(self.level, float(remaining))
+        except ValueError:
+            return
+
+
+class RateLimiter:
+    """Client-side limiter shared by every LLM client of a process.
+
+    Requests wait for a per-minute request bucket and token bucket (seeded from
+    ``rpm``/``tpm`` and corrected by the ``x-ratelimit-*`` response headers),
+    for a global pause after a ``Retry-After``, and for a free slot under an
+    adaptive concurrency limit: every throttled response halves the limit,
+    every successful one grows it by ``1/limit`` (AIMD) up to ``max_concurrency``.
+    """
+
+    def __init__(self, *, rpm: int = 0, tpm: int = 0, max_concurrency: int = 8, max_retries: int = 4) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._stats: Dict[str, float] = {
+            "requests": 0,
+            "throttled": 0,
+            "retries": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    # ---------------------------- admission ----------------------------
+
+    def _acquire(self, tokens: int) -> None:
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                delay = max(
+                    self._paused_until - now,
+                    self._requests.wait_for(1),
+                    self._tokens.wait_for(tokens),
+                )
+                if delay <= 0 and self._in_flight < int(self._limit):
+                    break
+                self._cond.wait(timeout=min(delay, 1.0) if delay > 0 else 1.0)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._in_flight += 1
+            waited = time.monotonic() - started
+            self._stats["requests"] += 1
+            if waited > 0.001:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += waited
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+        if waited > 0.001:
+            metrics.count("llm_queue_wait_seconds", waited)
+
+    def _release(self, *, throttled: bool = False, pause: float = 0.0) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(1.0, self._limit / 2)
+                self._stats["throttled"] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+                logger.warning(
+                    "LLM request throttled; pausing %.1fs, concurrency limit now %d", pause, int(self._limit)
+                )
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._cond.notify_all()
+        if throttled:
+            metrics.count("llm_throttled")
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Fold ``x-ratelimit-{limit,remaining}-{requests,tokens}`` headers into the buckets."""
+        with self._cond:
+            now = time.monotonic()
+            for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+                bucket.refill(now)
+                bucket.observe(
+                    headers.get(f"x-ratelimit-limit-{kind}"),
+                    headers.get(f"x-ratelimit-remaining-{kind}"),
+                )
+
+    @contextmanager
+    def request(self, send: Callable[[], requests.Response], *, tokens: int) -> Iterator[requests.Response]:
+        """Send once admitted and yield the response, holding the slot until the block exits.
+
+        Throttled responses (429/503) are retried after their ``Retry-After``
+        (exponential backoff otherwise) up to ``max_retries`` times; the last
+        one is yielded for the caller to report.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._acquire(tokens)
+            try:
+                response = send()
+            except BaseException:
+                self._release()
+                raise
+            self.observe(response.headers)
+            throttled = response.status_code in RETRY_STATUSES
+            if throttled and attempt < self.max_retries:
+                delay = retry_after_seconds(response.headers)
+                response.close()
+                self._release(throttled=True, pause=min(60.0, 2.0 ** attempt) if delay is None else delay)
+                with self._cond:
+                    self._stats["retries"] += 1
+                metrics.count("llm_retries")
+                continue
+            try:
+                yield response
+            finally:
+                self._release(throttled=throttled)
+            return
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+            stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+            stats["concurrency_limit"] = int(self._limit)
+            stats["in_flight"] = self._in_flight
+            stats["rpm_limit"] = int(self._requests.capacity)
+            stats["tpm_limit"] = int(self._tokens.capacity)
+        return stats
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter, so every service instance and review draws on one quota."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                rpm=settings.llm_rate_limit_rpm,
+                tpm=settings.llm_rate_limit_tpm,
+                max_concurrency=settings.llm_max_concurrency,
+                max_retries=settings.llm_max_retries,
+            )
+            metrics.REGISTRY.register_gauges("rate_limiter", _limiter.stats)
+        return _limiter
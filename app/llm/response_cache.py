@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class ResponseCache:
+    """SQLite-backed cache of chat completions keyed by a prompt fingerprint.
+
+    Entries older than ``ttl_seconds`` are ignored and purged; once the stored
+    content exceeds ``max_bytes`` the least recently read entries are dropped.
+    A connection is opened per operation so the cache can be shared between
+    threads and processes.
+    """
+
+    def __init__(self, path: Path, *, ttl_seconds: float, max_bytes: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def fingerprint(
+        model: str,
+        messages: List[Dict[str, str]],
+        max_completion_tokens: int,
+        temperature: Optional[float] = None,
+    ) -> str:
+        material = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "max_completion_tokens": max_completion_tokens,
+                "temperature": temperature,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30.0)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            self._bump("misses")
+            return None
+        self._bump("hits")
+        return row[0]
+
+    def put(self, key: str, model: str, content: str) -> None:
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, size, now, now),
+            )
+            self._evict(conn, now)
+        self._bump("stores")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        evicted = max(expired, 0)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            stale: List[Any] = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            evicted += len(stale)
+        if evicted:
+            self._bump("evictions", evicted)
+            logger.info("LLM response cache evicted %s entries", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate_pct"] = round(100 * stats["hits"] / lookups) if lookups else 0
+        return stats
+
+    def _bump(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[counter] += amount
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    key TEXT PRIMARY KEY,
+    token TEXT NOT NULL DEFAULT '',
+    expires_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class TokenCache:
+    """SQLite-backed store of OAuth bearer tokens shared by threads and processes.
+
+    Besides the token and its expiry each row carries a refresh lease: the
+    process holding it fetches the next token while everyone else keeps using
+    (or waits for) the cached one. The database is created readable by the
+    owner only, since it holds live credentials; SQLite gives the ``-wal``
+    and ``-shm`` files it creates later the database file's permissions.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._restrict_permissions()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._restrict_permissions()
+
+    def _restrict_permissions(self) -> None:
+        """Create the database 0600 before SQLite opens it and tighten existing sidecar files."""
+        try:
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            for path in (self.path, Path(f"{self.path}-wal"), Path(f"{self.path}-shm")):
+                if path.exists():
+                    os.chmod(path, 0o600)
+        except OSError:
+            logger.warning("Could not restrict permissions of token cache %s", self.path)
+
+    @staticmethod
+    def key_for(auth_url: str, client_id: str, scope: Optional[str]) -> str:
+        material = "\0".join([auth_url, client_id, scope or ""])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """``(token, expires_at)`` if a token that has not expired yet is cached."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT token, expires_at FROM tokens WHERE key = ?", (key,)).fetchone()
+        if row is None or not row[0] or row[1] <= time.time():
+            return None
+        return row[0], row[1]
+
+    def put(self, key: str, token: str, expires_at: float) -> None:
+        """Store a fresh token and release the refresh lease."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO tokens (key, token, expires_at, lease_until, updated_at) VALUES (?, ?, ?, 0, ?)"
+                " ON CONFLICT(key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at,"
+                " lease_until = 0, updated_at = excluded.updated_at",
+                (key, token, expires_at, time.time()),
+            )
+
+    def claim_refresh(self, key: str, *, lease_seconds: float) -> bool:
+        """Take the refresh lease for ``key`` unless another live holder has it."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT lease_until FROM tokens WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.execute(
+                    "INSERT INTO tokens (key, lease_until, updated_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET lease_until = excluded.lease_until",
+                    (key, now + lease_seconds, now),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def release_refresh(self, key: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE tokens SET lease_until = 0 WHERE key = ?", (key,))
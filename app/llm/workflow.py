@@ -1,63 +1,350 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, TypedDict
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Any, Callable, Dict, Optional, TypedDict
 
-from langgraph.graph import END, StateGraph
+from ..utils import cancellation, metrics
+from ..utils.config import settings
 
+if TYPE_CHECKING:
+    from ..service import ContractAgentService
 
-class ContractAgentState(TypedDict, total=False):
-    contract_summary: str
-    invoice_summary: str
-    comment_md: str
+logger = logging.getLogger(__name__)
 
+PARSE_STEPS = ("parse_contract", "parse_invoice")
+REVIEW_STEPS = ("compliance", "contract_review", "translation")
 
-def build_workflow(client: Any, *, extra_instructions: Optional[str] = None):
-    graph = StateGraph(ContractAgentState)
+# Per-node defaults, overridden by WORKFLOW_NODE_CONCURRENCY / WORKFLOW_NODE_TIMEOUTS.
+# Concurrency is process-wide (all runs share one slot pool per node); the
+# time limit covers the node's own work, not the wait for a slot. 0 = no limit.
+NODE_CONCURRENCY: Dict[str, float] = {
+    "parse_contract": 4,
+    "parse_invoice": 4,
+    "compliance": 8,
+    "contract_review": 8,
+    "translation": 4,
+    "report": 0,
+}
+NODE_TIMEOUT_SECONDS: Dict[str, float] = {
+    "parse_contract": 600,
+    "parse_invoice": 600,
+    "compliance": 1800,
+    "contract_review": 900,
+    "translation": 900,
+    "report": 60,
+}
 
-    def comment_node(state: ContractAgentState) -> Dict[str, str]:
-        contract_summary = state.get("contract_summary", "")
-        invoice_summary = state.get("invoice_summary", "")
-        base_instructions = (
-            "You are an SAP contract compliance analyst.\n"
-            "Determine whether each invoice line item is consistent with the contract clauses.\n"
-            "For every line item you must state one of: Compliant, Non-compliant, Needs review.\n"
-            "Reference the contract clause numbers or text snippets that justify your decision.\n"
-            "Return markdown with sections: Compliance Overview, Line Item Review, Risks & Follow-up.\n"
-            "Each charge_items entry includes a 'category' flag (either 'charge' or 'possible_charge'); treat 'possible_charge' rows cautiously and mark them Needs review unless supported by the contract.\n"
-            "Under Line Item Review, render a markdown table with columns: Sheet, Line, Invoice Details, Contract Alignment, Status, Confidence.\n"
-            "If exact matches are unavailable, infer the most plausible contract condition and indicate it explicitly.\n"
-            "If information is missing to decide, mark Status as 'Needs review' but still offer your best professional judgment."
-        )
-        if extra_instructions and extra_instructions.strip():
-            base_instructions = (
-                f"{base_instructions}\n\nAdditional reviewer guidance:\n{extra_instructions.strip()}"
+Emit = Callable[[str, str], None]
+NodeBody = Callable[["ReviewState", Emit], Dict[str, Any]]
+
+
+def _merge(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    return {**left, **right}
+
+
+class ReviewState(TypedDict, total=False):
+    run_id: str
+    contract_path: str
+    invoice_path: str
+    contract_yaml: str
+    invoice_yaml: str
+    contract_yaml_path: str
+    invoice_yaml_path: str
+    # Written by parallel branches, hence merged rather than overwritten.
+    results: Annotated[Dict[str, Any], _merge]
+    latency_seconds: Annotated[Dict[str, float], _merge]
+
+
+class NodeTimeoutError(TimeoutError):
+    pass
+
+
+_slots: Dict[str, threading.BoundedSemaphore] = {}
+_slots_lock = threading.Lock()
+
+
+def _node_slots(name: str, concurrency: int) -> Optional[threading.BoundedSemaphore]:
+    if concurrency <= 0:
+        return None
+    with _slots_lock:
+        if name not in _slots:
+            _slots[name] = threading.BoundedSemaphore(concurrency)
+        return _slots[name]
+
+
+def _limited(
+    name: str, body: NodeBody, *, ready: Optional[Callable[[ReviewState], Dict[str, Any]]] = None
+) -> Callable[[ReviewState], Dict[str, Any]]:
+    """Wrap ``body`` as a graph node honouring the node's concurrency and time limit.
+
+    The body runs on its own thread (in a copy of the node's context, which
+    keeps the LangGraph stream writer working) so the graph can stop waiting
+    for it once the limit passes. The abandoned body is then cancelled (see
+    ``app.utils.cancellation``): it stops at its next LLM request, streamed
+    delta or file write, so it neither keeps spending tokens nor writes
+    outputs or checkpoints over a later attempt. Its slot is only released
+    when it ends.
+    ``ready`` blocks until the node's inputs exist and returns them as a state
+    update; that wait holds no slot and does not count against the limit.
+    """
+    concurrency = int(settings.workflow_node_concurrency.get(name, NODE_CONCURRENCY[name]))
+    timeout = settings.workflow_node_timeouts.get(name, NODE_TIMEOUT_SECONDS[name])
+    body = metrics.in_context(body)
+
+    def node(state: ReviewState) -> Dict[str, Any]:
+        from langgraph.config import get_stream_writer
+
+        writer = get_stream_writer()
+        slots = _node_slots(name, concurrency)
+        with metrics.span(f"workflow.{name}") as attrs:
+            if ready is not None:
+                started = time.perf_counter()
+                state = {**state, **ready(state)}
+                attrs["input_wait_seconds"] = round(time.perf_counter() - started, 4)
+            started = time.perf_counter()
+            if slots is not None:
+                slots.acquire()
+            attrs["wait_seconds"] = round(time.perf_counter() - started, 4)
+            outcome: "Future[Dict[str, Any]]" = Future()
+            cancelled = threading.Event()
+
+            def run() -> None:
+                try:
+                    with cancellation.scope(cancelled):
+                        outcome.set_result(body(state, lambda step, text: writer((step, text))))
+                except BaseException as exc:  # noqa: BLE001 - re-raised on the graph thread
+                    outcome.set_exception(exc)
+                finally:
+                    if slots is not None:
+                        slots.release()
+
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(run,), name=f"{name}-{state['run_id'][:8]}", daemon=True).start()
+            try:
+                return outcome.result(timeout=timeout or None)
+            except FutureTimeoutError:
+                cancelled.set()
+                raise NodeTimeoutError(f"Review step {name} exceeded its {timeout:g}s time limit.") from None
+
+    return node
+
+
+def _fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def build_review_graph(
+    service: "ContractAgentService",
+    *,
+    parse: bool,
+    extra_instructions: Optional[str] = None,
+    bypass_cache: bool = False,
+    invoice_format: Optional[str] = None,
+    translation_language: Optional[str] = None,
+    stream: bool = False,
+    resume: bool = False,
+):
+    """Compile the review pipeline for one run.
+
+    With ``parse`` the contract and invoice are parsed in parallel and each
+    branch (compliance, contract review and, with ``translation_language``,
+    translation) starts as soon as the documents it reads are parsed;
+    otherwise the state must already carry both YAML texts and the branches
+    start at once. The branches run concurrently and join in ``report``. Each node returns its result
+    under ``results`` and its duration under ``latency_seconds``; with
+    ``stream`` the LLM branches emit ``(step, text so far)`` custom events.
+
+    Every node checkpoints its output together with a fingerprint of its
+    inputs (see ``StorageManager.save_checkpoint``). With ``resume`` a node
+    whose checkpoint still matches returns the stored output instead of
+    running again, so only failed, missing or stale stages are recomputed.
+    """
+    from langgraph.graph import END, START, StateGraph
+
+    storage = service.storage
+    # Part of every LLM stage's fingerprint: a deploy or config change that
+    # alters the prompts makes their checkpoints stale.
+    prompt_config = service.prompt_config()
+
+    def checkpointed(name: str, inputs_of: Callable[[ReviewState], str], body: NodeBody) -> NodeBody:
+        def run(state: ReviewState, emit: Emit) -> Dict[str, Any]:
+            run_id = state["run_id"]
+            inputs = inputs_of(state)
+            if resume:
+                restored = storage.restore_checkpoint(run_id, name, inputs=inputs)
+                if restored is not None:
+                    logger.info("Run %s step %s restored from its checkpoint", run_id, name)
+                    metrics.count("checkpoint_hits")
+                    return _restored(name, *restored, path=storage.data_root / run_id / restored[0]["output"])
+            try:
+                update = body(state, emit)
+            except Exception as exc:
+                storage.save_checkpoint(run_id, name, inputs=inputs, error=str(exc) or exc.__class__.__name__)
+                raise
+            if name in PARSE_STEPS:
+                label = name[len("parse_"):]
+                output, result = Path(update[f"{label}_yaml_path"]), {}
+            else:
+                result = {key: value for key, value in update["results"][name].items() if key != "content"}
+                output = Path(result["path"])
+            storage.save_checkpoint(
+                run_id, name, inputs=inputs, output=output, result=result, seconds=update["latency_seconds"][name]
             )
+            return update
+
+        return run
+
+    def timed(name: str, result: Dict[str, Any], started: float) -> Dict[str, Any]:
+        return {"results": {name: result}, "latency_seconds": {name: time.perf_counter() - started}}
+
+    def text_callback(name: str, emit: Emit):
+        return (lambda text: emit(name, text)) if stream else None
+
+    def parse_node(label: str):
+        def body(state: ReviewState, _emit: Emit) -> Dict[str, Any]:
+            started = time.perf_counter()
+            yaml_text, yaml_path = service.ingest_document(state["run_id"], Path(state[f"{label}_path"]), label=label)
+            return {
+                f"{label}_yaml": yaml_text,
+                f"{label}_yaml_path": str(yaml_path),
+                "latency_seconds": {f"parse_{label}": time.perf_counter() - started},
+            }
 
-        user_prompt = (
-            f"{base_instructions}\n\n"
-            "Contract summary:\n```yaml\n"
-            f"{contract_summary}\n"
-            "```\n"
+        def inputs(state: ReviewState) -> str:
+            document = service.document_fingerprint(state["run_id"], Path(state[f"{label}_path"]), label=label)
+            return _fingerprint(label, document)
+
+        return checkpointed(f"parse_{label}", inputs, body)
+
+    def compliance(state: ReviewState, emit: Emit) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = service.generate_compliance_report(
+            state["run_id"],
+            contract_yaml=state["contract_yaml"],
+            invoice_yaml=state["invoice_yaml"],
+            extra_instructions=extra_instructions,
+            bypass_cache=bypass_cache,
+            on_text=text_callback("compliance", emit),
+            invoice_format=invoice_format,
+        )
+        return timed("compliance", result, started)
+
+    def contract_review(state: ReviewState, emit: Emit) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = service.generate_contract_review(
+            state["run_id"],
+            contract_yaml=state["contract_yaml"],
+            extra_instructions=extra_instructions,
+            bypass_cache=bypass_cache,
+            on_text=text_callback("contract_review", emit),
         )
-        if invoice_summary:
-            user_prompt += "".join([
-                "Invoice summary (with charge_items for billable rows and metadata_preview for contextual lines):\n```yaml\n",
-                invoice_summary,
-                "\n```\n",
-                "Focus exclusively on charge_items when making compliance decisions. Use metadata_preview only when it clarifies context.\n",
-                "If a contract clause cannot be found, hypothesize a reasonable clause based on similar terms in the contract summary.\n",
-            ])
-        response = client.chat_completion(
-            [
-                {"role": "system", "content": "You operate within SAP BTP AI Core as a meticulous contract compliance analyst who produces concise, structured reviews."},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_completion_tokens=1500,
+        return timed("contract_review", result, started)
+
+    def translation(state: ReviewState, emit: Emit) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = service.generate_translation(
+            state["run_id"],
+            contract_yaml=state["contract_yaml"],
+            language=translation_language or "",
+            bypass_cache=bypass_cache,
+            on_text=text_callback("translation", emit),
         )
-        return {"comment_md": response}
+        return timed("translation", result, started)
+
+    def report(state: ReviewState, _emit: Emit) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = service.generate_final_report(state["run_id"], results=state.get("results") or {})
+        return timed("report", result, started)
+
+    def report_inputs(state: ReviewState) -> str:
+        results = state.get("results") or {}
+        contents = sorted((name, (result or {}).get("content")) for name, result in results.items())
+        return _fingerprint(contents, prompt_config["prompt_version"])
+
+    branch_inputs = {
+        "compliance": lambda state: _fingerprint(
+            state["contract_yaml"],
+            state["invoice_yaml"],
+            extra_instructions or "",
+            invoice_format or settings.invoice_prompt_format,
+            prompt_config,
+        ),
+        "contract_review": lambda state: _fingerprint(state["contract_yaml"], extra_instructions or "", prompt_config),
+        "translation": lambda state: _fingerprint(state["contract_yaml"], translation_language or "", prompt_config),
+    }
+
+    graph = StateGraph(ReviewState)
+    branches = {"compliance": compliance, "contract_review": contract_review}
+    if translation_language:
+        branches["translation"] = translation
+    branches = {name: checkpointed(name, branch_inputs[name], body) for name, body in branches.items()}
+    report = checkpointed("report", report_inputs, report)
+    graph.add_node("report", _limited("report", report))
+
+    if parse:
+        # A LangGraph superstep ends only when all of its nodes have, so a branch
+        # chained after parse_contract would also wait for parse_invoice. The
+        # branches are scheduled alongside the parses instead and wait on the
+        # parsed documents they actually read (only compliance needs the invoice).
+        parsed: Dict[str, "Future[Dict[str, Any]]"] = {label: Future() for label in ("contract", "invoice")}
+        for label in parsed:
+            graph.add_node(f"parse_{label}", _published(parsed[label], _limited(f"parse_{label}", parse_node(label))))
+            graph.add_edge(START, f"parse_{label}")
+        for name, body in branches.items():
+            needs = ("contract", "invoice") if name == "compliance" else ("contract",)
+            graph.add_node(name, _limited(name, body, ready=_awaiting(parsed, needs)))
+        graph.add_edge(list(branches) + list(PARSE_STEPS), "report")
+    else:
+        for name, body in branches.items():
+            graph.add_node(name, _limited(name, body))
+        graph.add_edge(list(branches), "report")
+    for name in branches:
+        graph.add_edge(START, name)
+    graph.add_edge("report", END)
+    # One executor thread per first-superstep node, so a branch waiting for a
+    # parse can never occupy the thread that parse needs.
+    return graph.compile().with_config(max_concurrency=len(branches) + len(PARSE_STEPS))
+
+
+def _published(
+    parsed: "Future[Dict[str, Any]]", node: Callable[[ReviewState], Dict[str, Any]]
+) -> Callable[[ReviewState], Dict[str, Any]]:
+    """Wrap a parse ``node`` so the branches waiting on ``parsed`` get its update (or failure)."""
+
+    def run(state: ReviewState) -> Dict[str, Any]:
+        try:
+            update = node(state)
+        except BaseException as exc:
+            parsed.set_exception(exc)
+            raise
+        parsed.set_result(update)
+        return update
+
+    return run
+
+
+def _awaiting(
+    parsed: Dict[str, "Future[Dict[str, Any]]"], labels: Any
+) -> Callable[[ReviewState], Dict[str, Any]]:
+    """The ``ready`` hook of a branch reading the parsed ``labels`` documents."""
+
+    def ready(_state: ReviewState) -> Dict[str, Any]:
+        return {f"{label}_yaml": parsed[label].result()[f"{label}_yaml"] for label in labels}
+
+    return ready
 
-    graph.add_node("comment", comment_node)
-    graph.set_entry_point("comment")
-    graph.add_edge("comment", END)
 
-    return graph.compile()
+def _restored(name: str, entry: Dict[str, Any], text: str, *, path: Path) -> Dict[str, Any]:
+    """The state update of a node restored from its checkpoint ``entry``."""
+    latency = {"latency_seconds": {name: 0.0}}
+    if name in PARSE_STEPS:
+        label = name[len("parse_"):]
+        return {f"{label}_yaml": text, f"{label}_yaml_path": str(path), **latency}
+    return {"results": {name: {**entry.get("result", {}), "content": text, "path": str(path)}}, **latency}
@@ -1,45 +1,148 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Set, TextIO, Tuple, Union
 
-import yaml
-
-from .document_processing.excel_parser import parse_excel
-from .document_processing.pdf_parser import parse_pdf
+from .document_processing.cache import ParseCache, hash_file
+from .document_processing.clause_index import ClauseIndex, invoice_queries, render_clauses
+from .document_processing.compact import INVOICE_FORMATS, render_invoice
+from .document_processing.excel_parser import (
+    PARSER_VERSION as EXCEL_PARSER_VERSION,
+    STREAMING_PARSER_VERSION as EXCEL_STREAMING_PARSER_VERSION,
+    parse_excel,
+    write_excel_sheets_yaml,
+)
+from .document_processing.incremental import (
+    VERDICTS_VERSION,
+    RowKey,
+    parse_line_verdicts,
+    render_verdicts,
+    row_fingerprints,
+    verdict_key,
+)
+from .document_processing.pdf_parser import PARSER_VERSION as PDF_PARSER_VERSION, parse_pdf
+from .jobs import JobRunner, JobWork, ProgressCallback, get_job_runner
+from .llm.chunking import CHARS_PER_TOKEN, chunk_payload, estimate_tokens
+from .llm.http_session import build_session
 from .llm.openai_client import OpenAIChatClient
+from .llm.rate_limit import get_rate_limiter
+from .llm.workflow import PARSE_STEPS, REVIEW_STEPS, build_review_graph
+from .llm.response_cache import ResponseCache
+from .utils import cancellation, metrics
 from .utils.config import settings
+from .utils.run_catalog import RunCatalog
 from .utils.storage import StorageManager
+from .utils.yaml_io import dump_yaml, load_yaml
 
 logger = logging.getLogger(__name__)
 
+_RUN_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Earlier runs inspected (most recent first) when looking for reusable verdicts.
+_VERDICT_CANDIDATES = 50
+
+# Bump whenever a review prompt's wording or structure changes, so resume()
+# recomputes the stages checkpointed under the old prompts.
+PROMPT_VERSION = 1
+
+# Appended to the reviewer's instructions when a finished run's output looked empty.
+STRICTER_INSTRUCTIONS = (
+    "\nEnsure the response contains a detailed table, bullet points, and explicit conclusions. "
+    "For the contract review, provide at least five concrete insights covering obligations, pricing, "
+    "service levels, risks, and controls."
+)
+
+StepCallback = Callable[[str, Dict[str, Any], float], None]
+TextCallback = Callable[[str], None]
+StreamCallback = Callable[[str, str], None]
+
 
 class ContractAgentService:
-    def _parse_document(self, path: Path, *, label: str) -> Dict[str, Any]:
+    def _parser_for(self, path: Path, *, label: str) -> Tuple[Callable[[Path], Dict[str, Any]], str]:
         suffix = path.suffix.lower()
         if suffix in {'.pdf'}:
-            payload = parse_pdf(path)
-        elif suffix in {'.xlsx', '.xls'}:
-            payload = parse_excel(path)
-        else:
-            raise ValueError(f"Unsupported {label} file type: {suffix or 'unknown'}")
+            parser = partial(
+                parse_pdf,
+                workers=settings.pdf_parse_workers,
+                parallel_threshold=settings.pdf_parallel_page_threshold,
+            )
+            return parser, PDF_PARSER_VERSION
+        if suffix in {'.xlsx', '.xls'}:
+            return parse_excel, EXCEL_PARSER_VERSION
+        raise ValueError(f"Unsupported {label} file type: {suffix or 'unknown'}")
+
+    def _parse_document(self, path: Path, *, label: str) -> Dict[str, Any]:
+        parser, _version = self._parser_for(path, label=label)
+        payload = parser(path)
         if not payload:
             payload = {'notice': f'{label} document returned empty payload'}
         payload.setdefault('source_file', path.name)
-        payload.setdefault('document_type', suffix.lstrip('.'))
+        payload.setdefault('document_type', path.suffix.lower().lstrip('.'))
         return payload
 
     def __init__(self) -> None:
-        self.storage = StorageManager(settings.data_storage_path, settings.artefact_storage_path)
+        self.storage = StorageManager(
+            settings.data_storage_path,
+            settings.artefact_storage_path,
+            catalog=RunCatalog(settings.run_catalog_path) if settings.run_catalog_enabled else None,
+            max_upload_bytes=settings.max_upload_bytes,
+        )
         self.llm_client = OpenAIChatClient(
             api_key=settings.openai_api_key,
             api_base=settings.openai_api_base,
             model=settings.openai_model,
             request_timeout=settings.request_timeout,
+            session=build_session(),
+            response_cache=(
+                ResponseCache(
+                    settings.llm_cache_path,
+                    ttl_seconds=settings.llm_cache_ttl_seconds,
+                    max_bytes=settings.llm_cache_max_bytes,
+                )
+                if settings.llm_cache_enabled
+                else None
+            ),
+            rate_limiter=get_rate_limiter(),
         )
+        self.parse_cache = (
+            ParseCache(settings.parse_cache_path, max_bytes=settings.parse_cache_max_bytes)
+            if settings.parse_cache_enabled
+            else None
+        )
+        self._digest_lock = threading.Lock()
+        self._digests: Dict[str, "Future[str]"] = {}
         logger.info("Storage initialised data=%s artefacts=%s", settings.data_storage_path, settings.artefact_storage_path)
 
+    def close(self) -> None:
+        logger.info("Closing LLM client session stats=%s", self.llm_client.connection_stats())
+        self.llm_client.close()
+
+    def __enter__(self) -> "ContractAgentService":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def connection_stats(self) -> Dict[str, int]:
+        return self.llm_client.connection_stats()
+
+    def parse_cache_stats(self) -> Dict[str, int]:
+        return self.parse_cache.stats() if self.parse_cache is not None else {}
+
+    def llm_cache_stats(self) -> Dict[str, int]:
+        return self.llm_client.cache_stats()
+
+    def rate_limit_stats(self) -> Dict[str, float]:
+        return self.llm_client.rate_limit_stats()
+
     # ---------------------------- ingestion ----------------------------
 
     def process_documents(
@@ -51,17 +154,9 @@ class ContractAgentService:
     ) -> Dict[str, str]:
         run_identifier = run_id or self.storage.create_run_id()
 
-        contract_payload = self._parse_document(contract_path, label="contract")
-        invoice_payload = self._parse_document(invoice_path, label="invoice")
-
-        contract_yaml_text = yaml.safe_dump(contract_payload, sort_keys=False, allow_unicode=False)
-        invoice_yaml_text = yaml.safe_dump(invoice_payload, sort_keys=False, allow_unicode=False)
-
-        self._assert_yaml_not_empty("contract", contract_yaml_text)
-        self._assert_yaml_not_empty("invoice", invoice_yaml_text)
-
-        contract_yaml_path = self.storage.save_yaml(run_identifier, "contract_raw", contract_payload)
-        invoice_yaml_path = self.storage.save_yaml(run_identifier, "invoice_raw", invoice_payload)
+        with metrics.collect(run_identifier, self.storage.save_metrics), metrics.span("process_documents"):
+            contract_yaml_text, contract_yaml_path = self.ingest_document(run_identifier, contract_path, label="contract")
+            invoice_yaml_text, invoice_yaml_path = self.ingest_document(run_identifier, invoice_path, label="invoice")
 
         logger.info("Parsed documents saved for run %s", run_identifier)
 
@@ -73,6 +168,86 @@ class ContractAgentService:
             "invoice_yaml_path": str(invoice_yaml_path),
         }
 
+    @staticmethod
+    def _streams_excel(path: Path) -> bool:
+        return settings.excel_parser_mode == "streaming" and path.suffix.lower() == ".xlsx"
+
+    @staticmethod
+    def prompt_config() -> Dict[str, Any]:
+        """The prompt version and every setting that changes what the review prompts contain."""
+        return {
+            "prompt_version": PROMPT_VERSION,
+            "model": settings.openai_model,
+            "prompt_token_budget": settings.llm_prompt_token_budget,
+            "chunk_token_budget": settings.llm_chunk_token_budget,
+            "retrieval": [settings.retrieval_top_k, settings.retrieval_min_tokens, settings.retrieval_max_tokens],
+            "prematch": settings.invoice_prematch_enabled,
+            "incremental": settings.incremental_review_enabled,
+        }
+
+    def document_fingerprint(self, run_id: str, path: Path, *, label: str) -> Tuple[str, str, str]:
+        """``(name, SHA-256, parser version)`` of a document; stored uploads reuse their manifest hash."""
+        manifest = self.storage.load_manifest(run_id) if path.parent == self.storage.artefact_root / run_id else {}
+        digest = (manifest.get(path.name) or {}).get("sha256") or hash_file(path)
+        parser_version = (
+            EXCEL_STREAMING_PARSER_VERSION if self._streams_excel(path) else self._parser_for(path, label=label)[1]
+        )
+        return path.name, digest, parser_version
+
+    def ingest_document(self, run_id: str, path: Path, *, label: str) -> Tuple[str, Path]:
+        """Parse ``path`` (or reuse a cached parse) and persist ``<label>_raw.yaml``.
+
+        The payload is serialised exactly once and that text is both written
+        and returned. Cache entries hold everything after the ``source_file``
+        line so the same bytes uploaded under another name still hit.
+
+        In ``streaming`` Excel mode only parsing and writing run in flat
+        memory: the returned text is the written file read back once, since
+        the review prompts need it whole.
+        """
+        streaming = self._streams_excel(path)
+        parser_version = EXCEL_STREAMING_PARSER_VERSION if streaming else self._parser_for(path, label=label)[1]
+        header = dump_yaml({"source_file": path.name})
+        name = f"{label}_raw"
+
+        cache_key = None
+        body = None
+        if self.parse_cache is not None:
+            cache_key = self.parse_cache.key_for(path, parser_version)
+            body = self.parse_cache.get(cache_key)
+        cached = body is not None
+
+        if cached:
+            yaml_text = header + body
+            yaml_path = self.storage.save_text(run_id, name, yaml_text, suffix=".yaml")
+        elif streaming:
+            # openpyxl read-only rows are written straight to disk so the
+            # workbook is never materialised; see write_excel_sheets_yaml.
+            def write(handle: TextIO) -> None:
+                handle.write(header)
+                write_excel_sheets_yaml(path, handle, document_type=path.suffix.lower().lstrip("."))
+
+            with metrics.span(f"parse.{label}", file=path.name, mode="streaming"):
+                yaml_path = self.storage.save_yaml_stream(run_id, name, write)
+            if cache_key is not None:
+                self.parse_cache.put_file(cache_key, yaml_path, offset=len(header.encode("utf-8")))
+                cache_key = None
+            yaml_text = yaml_path.read_text(encoding="utf-8")
+        else:
+            with metrics.span(f"parse.{label}", file=path.name, bytes=path.stat().st_size):
+                payload = self._parse_document(path, label=label)
+            self._assert_payload_not_empty(label, payload)
+            with metrics.span("yaml.serialize", document=label) as attrs:
+                body = dump_yaml({key: value for key, value in payload.items() if key != "source_file"})
+                attrs["chars"] = len(body)
+            yaml_text = header + body
+            yaml_path = self.storage.save_text(run_id, name, yaml_text, suffix=".yaml")
+        metrics.count("parse_cache_hits" if cached else "documents_parsed")
+
+        if cache_key is not None and not cached:
+            self.parse_cache.put(cache_key, body)
+        return yaml_text, yaml_path
+
     # ---------------------------- LLM calls ----------------------------
 
     def generate_compliance_report(
@@ -82,6 +257,9 @@ class ContractAgentService:
         contract_yaml: str,
         invoice_yaml: str,
         extra_instructions: Optional[str] = None,
+        bypass_cache: bool = False,
+        on_text: Optional[TextCallback] = None,
+        invoice_format: Optional[str] = None,
     ) -> Dict[str, str]:
         base_prompt = (
             "You are GPT-5 running within SAP. Produce a contract vs invoice compliance assessment.\n"
@@ -93,22 +271,83 @@ class ContractAgentService:
         if extra_instructions and extra_instructions.strip():
             base_prompt = f"{base_prompt}\n\nAdditional reviewer instructions:\n{extra_instructions.strip()}"
 
-        response = self._chat_with_fallback(
+        with metrics.span("review.plan"):
+            plan = self._plan_review(
+                run_id,
+                contract_yaml=contract_yaml,
+                invoice_yaml=invoice_yaml,
+                extra_instructions=extra_instructions,
+                bypass_cache=bypass_cache,
+            )
+        if plan["invoice_yaml"] is None:
+            response = self._resolved_report(plan)
+        else:
+            if plan["notes"]:
+                base_prompt = f"{base_prompt}\n\n" + " ".join(plan["notes"])
+            response = self._review_invoice(
+                run_id,
+                base_prompt=base_prompt,
+                contract_yaml=contract_yaml,
+                invoice_yaml=plan["invoice_yaml"],
+                bypass_cache=bypass_cache,
+                on_text=on_text,
+                invoice_format=invoice_format,
+            )
+            response = "\n\n".join([response, *plan["sections"]])
+        if plan["sections"] and on_text is not None:
+            on_text(response)
+        self._save_line_verdicts(run_id, response, plan)
+        path = self.storage.save_markdown(run_id, "compliance_report", response)
+        return {"content": response, "path": str(path)}
+
+    def _review_invoice(
+        self,
+        run_id: str,
+        *,
+        base_prompt: str,
+        contract_yaml: str,
+        invoice_yaml: str,
+        bypass_cache: bool,
+        on_text: Optional[TextCallback],
+        invoice_format: Optional[str],
+    ) -> str:
+        invoice_chunks = self._split_for_budget(invoice_yaml)
+        index = self._clause_index(run_id, contract_yaml)
+        if index is not None:
+            contexts = [
+                self._retrieved_context(run_id, index, chunk, contract_yaml, bypass_cache=bypass_cache)
+                for chunk in invoice_chunks
+            ]
+        else:
+            contexts = [self._contract_context(run_id, contract_yaml, bypass_cache=bypass_cache)] * len(invoice_chunks)
+        invoice_parts = [self._invoice_prompt(chunk, invoice_format) for chunk in invoice_chunks]
+        if len(invoice_parts) > 1:
+            return self._map_reduce_compliance(
+                run_id,
+                base_prompt=base_prompt,
+                contexts=contexts,
+                invoice_parts=invoice_parts,
+                bypass_cache=bypass_cache,
+                on_text=on_text,
+            )
+        contract_label, contract_context = contexts[0]
+        invoice_label, invoice_text, invoice_fence = invoice_parts[0]
+        return self._chat_with_fallback(
             messages=[
                 {"role": "system", "content": "You are a senior SAP contract compliance reviewer."},
                 {
                     "role": "user",
                     "content": (
-                        f"{base_prompt}\n\nContract YAML:\n```yaml\n{contract_yaml}\n```\n"
-                        f"Invoice YAML:\n```yaml\n{invoice_yaml}\n```"
+                        f"{base_prompt}\n\n{contract_label}:\n```{self._fence(contract_label)}\n{contract_context}\n```\n"
+                        f"{invoice_label}:\n```{invoice_fence}\n{invoice_text}\n```"
                     ),
                 },
             ],
             max_completion_tokens=1800,
+            bypass_cache=bypass_cache,
+            on_text=on_text,
             insist_message="Your previous draft was empty or unclear. Produce a detailed analysis with tables, bullets, and actionable follow-up suggestions.",
         )
-        path = self.storage.save_markdown(run_id, "compliance_report", response)
-        return {"content": response, "path": str(path)}
 
     def generate_contract_review(
         self,
@@ -116,6 +355,8 @@ class ContractAgentService:
         *,
         contract_yaml: str,
         extra_instructions: Optional[str] = None,
+        bypass_cache: bool = False,
+        on_text: Optional[TextCallback] = None,
     ) -> Dict[str, str]:
         prompt = (
             "Summarise the contract's critical obligations, pricing mechanics, service levels, and termination clauses.\n"
@@ -125,29 +366,800 @@ class ContractAgentService:
         if extra_instructions and extra_instructions.strip():
             prompt = f"{prompt}\n\nAdditional reviewer guidance:\n{extra_instructions.strip()}"
 
+        contract_label, contract_context = self._contract_context(run_id, contract_yaml, bypass_cache=bypass_cache)
         response = self._chat_with_fallback(
             messages=[
                 {"role": "system", "content": "You prepare executive contract briefings."},
                 {
                     "role": "user",
-                    "content": f"{prompt}\n\nContract YAML:\n```yaml\n{contract_yaml}\n```",
+                    "content": f"{prompt}\n\n{contract_label}:\n```{self._fence(contract_label)}\n{contract_context}\n```",
                 },
             ],
             max_completion_tokens=1200,
+            bypass_cache=bypass_cache,
+            on_text=on_text,
             insist_message="Provide at least five concrete observations covering obligations, pricing, service levels, risks, and recommended controls.",
         )
         path = self.storage.save_markdown(run_id, "contract_review", response)
         return {"content": response, "path": str(path)}
 
-    # ---------------------------- helpers ----------------------------
+    def generate_translation(
+        self,
+        run_id: str,
+        *,
+        contract_yaml: str,
+        language: str,
+        bypass_cache: bool = False,
+        on_text: Optional[TextCallback] = None,
+    ) -> Dict[str, str]:
+        prompt = (
+            f"Translate the contract content below into {language} as markdown.\n"
+            "Keep clause numbers, amounts, currencies, dates, units and party names exactly as written, and keep tables as tables.\n"
+            "Translate faithfully; do not summarise, comment or add content."
+        )
+        contract_label, contract_context = self._contract_context(run_id, contract_yaml, bypass_cache=bypass_cache)
+        response = self._chat_with_fallback(
+            messages=[
+                {"role": "system", "content": "You are a professional legal and commercial translator."},
+                {
+                    "role": "user",
+                    "content": f"{prompt}\n\n{contract_label}:\n```{self._fence(contract_label)}\n{contract_context}\n```",
+                },
+            ],
+            max_completion_tokens=3000,
+            bypass_cache=bypass_cache,
+            on_text=on_text,
+            insist_message=f"Return the full {language} translation of the contract content as markdown.",
+        )
+        path = self.storage.save_markdown(run_id, "contract_translation", response)
+        return {"content": response, "path": str(path), "language": language}
 
-    def _assert_yaml_not_empty(self, label: str, yaml_text: str) -> None:
-        try:
-            data = yaml.safe_load(yaml_text) if yaml_text and yaml_text.strip() else None
-        except yaml.YAMLError:
-            logger.warning("Unable to parse %s YAML for validation", label)
+    def generate_final_report(self, run_id: str, *, results: Dict[str, Any]) -> Dict[str, str]:
+        """Join the branch outputs into ``review_report.md``."""
+        sections = []
+        for key, title in (
+            ("compliance", "Compliance assessment"),
+            ("contract_review", "Contract review"),
+            ("translation", "Contract translation"),
+        ):
+            content = ((results.get(key) or {}).get("content") or "").strip()
+            if content:
+                language = (results.get(key) or {}).get("language")
+                sections.append(f"# {title}{f' ({language})' if language else ''}\n\n{content}")
+        report = "\n\n".join(sections) + "\n"
+        path = self.storage.save_markdown(run_id, "review_report", report)
+        return {"content": report, "path": str(path)}
+
+    # ---------------------------- map-reduce ----------------------------
+    #
+    # Payloads larger than LLM_PROMPT_TOKEN_BUDGET are split into chunks of
+    # LLM_CHUNK_TOKENS. An oversized contract is first condensed into a digest
+    # of the clauses that matter (one map call per chunk, shared by the
+    # compliance and review prompts); an oversized invoice is analysed chunk by
+    # chunk and the partial analyses are reduced into the usual sections.
+
+    @staticmethod
+    def _fence(label: str) -> str:
+        return "yaml" if label.endswith("YAML") else "markdown"
+
+    def _split_for_budget(self, yaml_text: str) -> List[str]:
+        if estimate_tokens(yaml_text) <= settings.llm_prompt_token_budget // 2:
+            return [yaml_text]
+        payload = load_yaml(yaml_text)
+        chunks = chunk_payload(payload, token_budget=settings.llm_chunk_token_budget)
+        return [dump_yaml(chunk) for chunk in chunks]
+
+    def _contract_context(self, run_id: str, contract_yaml: str, *, bypass_cache: bool) -> Tuple[str, str]:
+        chunks = self._split_for_budget(contract_yaml)
+        if len(chunks) == 1:
+            return "Contract YAML", contract_yaml
+        key = hashlib.sha256(contract_yaml.encode("utf-8")).hexdigest()
+        while True:
+            with self._digest_lock:
+                future = self._digests.get(key)
+                owner = future is None
+                if owner:
+                    if len(self._digests) >= 8:
+                        self._digests.clear()
+                    future = self._digests[key] = Future()
+            if owner:
+                try:
+                    future.set_result(self._build_contract_digest(run_id, chunks, bypass_cache=bypass_cache))
+                except BaseException as exc:
+                    future.set_exception(exc)
+                    with self._digest_lock:
+                        self._digests.pop(key, None)
+            try:
+                return "Contract digest", future.result()
+            except cancellation.Cancelled:
+                if owner:
+                    raise
+                # The step building it timed out; that says nothing about this one.
+
+    def _build_contract_digest(self, run_id: str, chunks: List[str], *, bypass_cache: bool) -> str:
+        prompt = (
+            "Extract every clause from this contract excerpt that matters for invoice compliance and contract risk: "
+            "rates, tariffs, charge definitions, surcharges, free time, discounts, obligations, service levels, "
+            "penalties, and termination terms.\n"
+            "Return concise markdown bullets, quoting figures exactly and citing page numbers, sheet names or clause numbers."
+        )
+        notes = self._map_concurrently(
+            [
+                [
+                    {"role": "system", "content": "You condense contracts for SAP compliance analysts without losing figures."},
+                    {"role": "user", "content": f"{prompt}\n\nContract YAML (part {index}/{len(chunks)}):\n```yaml\n{chunk}\n```"},
+                ]
+                for index, chunk in enumerate(chunks, start=1)
+            ],
+            max_completion_tokens=1200,
+            bypass_cache=bypass_cache,
+        )
+        digest = "\n\n".join(
+            f"### Contract part {index}/{len(notes)}\n{note}" for index, note in enumerate(notes, start=1)
+        )
+        self.storage.save_markdown(run_id, "contract_digest", digest)
+        logger.info("Run %s contract condensed from %s chunks", run_id, len(chunks))
+        return digest
+
+    def _map_reduce_compliance(
+        self,
+        run_id: str,
+        *,
+        base_prompt: str,
+        contexts: List[Tuple[str, str]],
+        invoice_parts: List[Tuple[str, str, str]],
+        bypass_cache: bool,
+        on_text: Optional[TextCallback],
+    ) -> str:
+        total = len(invoice_parts)
+        partials = self._map_concurrently(
+            [
+                [
+                    {"role": "system", "content": "You are a senior SAP contract compliance reviewer."},
+                    {
+                        "role": "user",
+                        "content": (
+                            f"{base_prompt}\n\nThis is part {index}/{total} of the invoice. Analyse only the rows below; "
+                            "number lines as row_offset + position within the sheet (or by the `line` field when rows carry one) so parts can be merged.\n\n"
+                            f"{contract_label}:\n```{self._fence(contract_label)}\n{contract_context}\n```\n"
+                            f"{invoice_label} (part {index}/{total}):\n```{invoice_fence}\n{invoice_text}\n```"
+                        ),
+                    },
+                ]
+                for index, ((invoice_label, invoice_text, invoice_fence), (contract_label, contract_context)) in enumerate(
+                    zip(invoice_parts, contexts), start=1
+                )
+            ],
+            max_completion_tokens=1800,
+            bypass_cache=bypass_cache,
+        )
+        for index, partial in enumerate(partials, start=1):
+            self.storage.save_markdown(run_id, f"compliance_part_{index:02d}", partial)
+        logger.info("Run %s compliance mapped over %s invoice chunks", run_id, total)
+
+        merged = "\n\n".join(
+            f"### Partial analysis {index}/{total}\n{partial}" for index, partial in enumerate(partials, start=1)
+        )
+        return self._chat_with_fallback(
+            messages=[
+                {"role": "system", "content": "You are a senior SAP contract compliance reviewer."},
+                {
+                    "role": "user",
+                    "content": (
+                        f"{base_prompt}\n\nThe invoice was too large for one pass and was analysed in {total} parts. "
+                        "Merge the partial analyses below into a single report with the required sections: one Compliance Overview "
+                        "for the whole invoice, one combined Line Item Review table keeping every row, and de-duplicated "
+                        f"Risks & Follow-up and Suggested Next Actions.\n\n{merged}"
+                    ),
+                },
+            ],
+            max_completion_tokens=3000,
+            bypass_cache=bypass_cache,
+            on_text=on_text,
+            insist_message="Your previous draft was empty or unclear. Merge every partial analysis into the full report with tables, bullets, and actionable follow-up suggestions.",
+        )
+
+    def _map_concurrently(
+        self,
+        prompts: List[List[Dict[str, str]]],
+        *,
+        max_completion_tokens: int,
+        bypass_cache: bool,
+    ) -> List[str]:
+        workers = max(1, min(settings.llm_chunk_concurrency, len(prompts)))
+        complete = cancellation.in_context(
+            metrics.in_context(
+                lambda messages: self._chat_with_fallback(
+                    messages=messages,
+                    max_completion_tokens=max_completion_tokens,
+                    bypass_cache=bypass_cache,
+                    insist_message="Your previous answer was empty. Return the requested markdown for this part.",
+                )
+            )
+        )
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-map") as pool:
+            return list(pool.map(complete, prompts))
+
+    def _invoice_prompt(self, invoice_yaml: str, invoice_format: Optional[str]) -> Tuple[str, str, str]:
+        """Invoice ``(label, text, fence)`` in the requested prompt format."""
+        invoice_format = invoice_format or settings.invoice_prompt_format
+        if invoice_format not in INVOICE_FORMATS:
+            raise ValueError(f"Unsupported invoice prompt format: {invoice_format}")
+        if invoice_format == "records":
+            return "Invoice YAML", invoice_yaml, "yaml"
+        return render_invoice(load_yaml(invoice_yaml) or {}, invoice_format, records_yaml=invoice_yaml)
+
+    # ---------------------------- review planning ----------------------------
+    #
+    # Before the compliance prompt is built, spreadsheet invoice rows are
+    # resolved without the LLM where possible: billable rows are classified with
+    # pandas and joined to the contract's rate tables (exact matches are
+    # Compliant), and rows identical to an earlier review of the same contract
+    # keep that run's verdict. Only the remaining rows are sent for review.
+
+    def _plan_review(
+        self,
+        run_id: str,
+        *,
+        contract_yaml: str,
+        invoice_yaml: str,
+        extra_instructions: Optional[str],
+        bypass_cache: bool,
+    ) -> Dict[str, Any]:
+        """Decide what the compliance prompt still has to cover.
+
+        Returns ``invoice_yaml`` (``None`` when every line item is resolved),
+        prompt ``notes``, report ``sections`` for the resolved rows, and the row
+        ``fingerprints`` and ``context_key`` used to store this run's verdicts.
+        Spreadsheet rows always reach the prompt with their original ``line``
+        number, the only Line value verdicts can safely be stored under;
+        ``line_numbers`` records whether they did.
+        """
+        # Pandas-backed, so imported on the first review rather than at startup.
+        from .document_processing.prematch import render_prematched, residual_invoice
+
+        plan: Dict[str, Any] = {
+            "invoice_yaml": invoice_yaml,
+            "notes": [],
+            "sections": [],
+            "fingerprints": {},
+            "context_key": "",
+            "prior_run": None,
+            "line_numbers": False,
+        }
+        invoice = load_yaml(invoice_yaml) or {}
+        if not invoice.get("sheets"):
+            return plan
+        guidance = (extra_instructions or "").strip()
+        fingerprints = plan["fingerprints"] = row_fingerprints(invoice)
+        plan["context_key"] = hashlib.sha256(
+            json.dumps([VERDICTS_VERSION, settings.openai_model, guidance, contract_yaml]).encode("utf-8")
+        ).hexdigest()
+
+        charge_items = self._prematch(run_id, contract_yaml, invoice)
+        matched = [item for item in charge_items if item.get("status") == "Compliant"]
+        matched_keys = {(item["sheet"], item["line"]) for item in matched}
+        prior_run, carried, unchanged = None, {}, set()
+        if settings.incremental_review_enabled and not bypass_cache:
+            prior_run, carried, unchanged = self._carry_over_verdicts(run_id, plan["context_key"], fingerprints)
+        carried = {key: verdict for key, verdict in carried.items() if key not in matched_keys}
+        plan["prior_run"] = prior_run
+
+        if matched:
+            plan["sections"].append(
+                "### Pre-matched Line Items\n"
+                "These rows match the contract rate table exactly and were not sent for LLM review.\n\n"
+                f"{render_prematched(matched)}"
+            )
+        if carried:
+            plan["sections"].append(
+                "### Unchanged Line Items\n"
+                f"These rows are identical to the invoice reviewed in run {prior_run}; their verdicts were carried over.\n\n"
+                f"{render_verdicts([carried[key] for key in fingerprints if key in carried])}"
+            )
+
+        if prior_run is not None:
+            resolved = not any(key not in unchanged and key not in matched_keys for key in fingerprints)
+        else:
+            resolved = bool(matched) and len(matched) == len(charge_items) and not guidance
+        if resolved:
+            plan["invoice_yaml"] = None
+            return plan
+
+        if charge_items:
+            plan["notes"].append(
+                "Invoice rows carry their original `line` number (use it as Line) and a `category`: 'charge' rows are billed, "
+                "'possible_charge' rows have a quantity but no price and should be marked Needs review unless the contract supports them; "
+                "rows without a category are context only. Where present, `contract_rate` is the rate the contract's tariff table "
+                "lists for that row."
+            )
+        else:
+            plan["notes"].append("Invoice rows carry their original `line` number; use it as Line.")
+        if matched:
+            plan["notes"].append(
+                f"{len(matched)} further line items already match the contract rates exactly; they are reported separately, "
+                "so do not review or list them."
+            )
+        if carried:
+            plan["notes"].append(
+                f"{len(carried)} unchanged line items were reviewed in an earlier run and have been removed from the invoice; "
+                "they are reported separately, so do not review or list them."
+            )
+        plan["invoice_yaml"] = dump_yaml(residual_invoice(invoice, charge_items, resolved=carried))
+        plan["line_numbers"] = True
+        return plan
+
+    def _prematch(self, run_id: str, contract_yaml: str, invoice: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if not settings.invoice_prematch_enabled:
+            return []
+        from .document_processing.prematch import prematch_invoice
+
+        charge_items = prematch_invoice(invoice, load_yaml(contract_yaml) or {})
+        if not charge_items:
+            return []
+        self.storage.save_yaml(run_id, "invoice_prematch", {"charge_items": charge_items})
+        logger.info(
+            "Run %s pre-matched %s/%s invoice line items against contract rates",
+            run_id,
+            sum(1 for item in charge_items if item.get("status") == "Compliant"),
+            len(charge_items),
+        )
+        return charge_items
+
+    def _carry_over_verdicts(
+        self,
+        run_id: str,
+        context_key: str,
+        fingerprints: Dict[RowKey, str],
+    ) -> Tuple[Optional[str], Dict[RowKey, Dict[str, str]], Set[RowKey]]:
+        """Find the earlier run sharing most reviewed rows and diff against its invoice.
+
+        Returns that run id, its verdicts re-keyed to this invoice's rows, and
+        the rows that also appear in its ``invoice_raw.yaml``.
+        """
+        wanted = {fingerprint: key for key, fingerprint in fingerprints.items()}
+        candidates = [
+            (candidate, verdict_path)
+            for candidate, verdict_path in self.storage.recent_runs_with("line_verdicts.json", limit=_VERDICT_CANDIDATES + 1)
+            if candidate != run_id
+        ]
+        best_run, best_verdicts, best_overlap = None, {}, 0
+        for candidate, verdict_path in candidates[:_VERDICT_CANDIDATES]:
+            try:
+                stored = json.loads(verdict_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if stored.get("version") != VERDICTS_VERSION or stored.get("context_key") != context_key:
+                continue
+            verdicts = stored.get("verdicts") or {}
+            overlap = sum(1 for fingerprint in verdicts if fingerprint in wanted)
+            if overlap > best_overlap:
+                best_run, best_verdicts, best_overlap = candidate, verdicts, overlap
+        if best_run is None:
+            return None, {}, set()
+
+        previous_yaml = self.storage.read_text(best_run, "invoice_raw", suffix=".yaml")
+        previous_rows = set(row_fingerprints(load_yaml(previous_yaml) or {}).values()) if previous_yaml else set()
+        unchanged = {key for key, fingerprint in fingerprints.items() if fingerprint in previous_rows}
+        carried: Dict[RowKey, Dict[str, str]] = {}
+        for fingerprint, verdict in best_verdicts.items():
+            key = wanted.get(fingerprint)
+            if key is not None and key in unchanged:
+                carried[key] = {**verdict, "Sheet": key[0], "Line": str(key[1])}
+        logger.info(
+            "Run %s re-uses %s line verdicts from run %s; %s of %s invoice rows are new or changed",
+            run_id,
+            len(carried),
+            best_run,
+            len(fingerprints) - len(unchanged),
+            len(fingerprints),
+        )
+        return best_run, carried, unchanged
+
+    def _save_line_verdicts(self, run_id: str, report: str, plan: Dict[str, Any]) -> None:
+        """Store the report's Line Item Review rows by row fingerprint for later re-reviews."""
+        fingerprints: Dict[RowKey, str] = plan["fingerprints"]
+        if not fingerprints or (plan["invoice_yaml"] is not None and not plan["line_numbers"]):
+            # Without the original line numbers in the prompt, the report's
+            # Line values cannot be trusted to name invoice rows.
             return
-        if not data:
+        sheet_names = list(dict.fromkeys(sheet for sheet, _line in fingerprints))
+        verdicts: Dict[str, Dict[str, str]] = {}
+        for verdict in parse_line_verdicts(report):
+            key = verdict_key(verdict, sheet_names)
+            if key in fingerprints:
+                verdicts[fingerprints[key]] = verdict
+        self.storage.save_text(
+            run_id,
+            "line_verdicts",
+            json.dumps(
+                {"version": VERDICTS_VERSION, "context_key": plan["context_key"], "verdicts": verdicts},
+                ensure_ascii=False,
+            ),
+            suffix=".json",
+        )
+
+    @staticmethod
+    def _resolved_report(plan: Dict[str, Any]) -> str:
+        if plan["prior_run"] is not None:
+            overview = (
+                f"No invoice line item changed since run {plan['prior_run']} reviewed this invoice against the same contract "
+                "and instructions, so its verdicts are reused"
+            )
+            risks = f"- See the report of run {plan['prior_run']} for the risks noted on these lines."
+        else:
+            overview = "All billable invoice line items match the contract rate table exactly (rate, or amount divided by quantity)"
+            risks = "- No rate deviations found. Surcharges or charges not itemised in the invoice were not assessed."
+        return (
+            f"## Compliance Overview\n{overview}; no new LLM review was needed.\n\n"
+            "## Line Item Review\n" + "\n\n".join(section.rstrip() for section in plan["sections"]) + "\n\n"
+            f"## Risks & Follow-up\n{risks}\n\n"
+            "## Suggested Next Actions\n- Approve the lines marked Compliant and follow up on any others listed above.\n"
+        )
+
+    # ---------------------------- clause retrieval ----------------------------
+    #
+    # Long contracts are indexed once per run (BM25 over clause-sized passages,
+    # stored as data/<run_id>/contract_index.json) and the compliance prompt only
+    # receives the top-k passages per invoice line item instead of every page.
+
+    def _clause_index(self, run_id: str, contract_yaml: str) -> Optional[ClauseIndex]:
+        if settings.retrieval_top_k <= 0 or estimate_tokens(contract_yaml) < settings.retrieval_min_tokens:
+            return None
+        source_hash = hashlib.sha256(contract_yaml.encode("utf-8")).hexdigest()
+        stored = self.storage.read_text(run_id, "contract_index", suffix=".json")
+        if stored:
+            index = ClauseIndex.from_json(stored)
+            if index is not None and index.source_hash == source_hash:
+                return index
+        with metrics.span("retrieval.build_index"):
+            index = ClauseIndex.from_payload(load_yaml(contract_yaml), source_hash=source_hash)
+        self.storage.save_text(run_id, "contract_index", index.to_json(), suffix=".json")
+        logger.info("Run %s contract index built with %s passages", run_id, len(index.passages))
+        return index
+
+    def _retrieved_context(
+        self,
+        run_id: str,
+        index: ClauseIndex,
+        invoice_yaml: str,
+        contract_yaml: str,
+        *,
+        bypass_cache: bool,
+    ) -> Tuple[str, str]:
+        queries = invoice_queries(load_yaml(invoice_yaml) or {})
+        passages = index.retrieve(
+            queries,
+            top_k=settings.retrieval_top_k,
+            max_chars=settings.retrieval_max_tokens * CHARS_PER_TOKEN,
+        )
+        if not passages:
+            logger.info("Run %s retrieval found no matching clauses, sending the full contract", run_id)
+            return self._contract_context(run_id, contract_yaml, bypass_cache=bypass_cache)
+        clauses = render_clauses(passages)
+        logger.info(
+            "Run %s retrieval kept %s/%s contract passages for %s invoice lines (~%s of ~%s tokens)",
+            run_id,
+            len(passages),
+            len(index.passages),
+            len(queries),
+            estimate_tokens(clauses),
+            estimate_tokens(contract_yaml),
+        )
+        return "Relevant contract clauses (retrieved by keyword match; cite the bracketed references)", clauses
+
+    # ---------------------------- orchestration ----------------------------
+
+    def run_review(
+        self,
+        run_id: str,
+        *,
+        contract_yaml: str,
+        invoice_yaml: str,
+        extra_instructions: Optional[str] = None,
+        bypass_cache: bool = False,
+        invoice_format: Optional[str] = None,
+        on_step_complete: Optional[StepCallback] = None,
+        on_stream: Optional[StreamCallback] = None,
+    ) -> Dict[str, Any]:
+        """Run the LLM branches of the review graph on already parsed documents.
+
+        The compliance report, contract review and (with
+        REVIEW_TRANSLATION_LANGUAGE) translation run concurrently, each result
+        persisted by its own generator as soon as it arrives, and are joined in
+        ``review_report.md``. ``on_step_complete(step, result, seconds)`` is
+        invoked from the calling thread in completion order so UIs can report
+        each call separately. When ``on_stream(step, text)`` is given the
+        calls stream and it receives the text generated so far, also on the
+        calling thread.
+        """
+        return self._run_graph(
+            {"run_id": run_id, "contract_yaml": contract_yaml, "invoice_yaml": invoice_yaml},
+            parse=False,
+            extra_instructions=extra_instructions,
+            bypass_cache=bypass_cache,
+            invoice_format=invoice_format,
+            on_step_complete=on_step_complete,
+            on_stream=on_stream,
+        )
+
+    def review_documents(
+        self,
+        run_id: str,
+        *,
+        contract_path: Path,
+        invoice_path: Path,
+        extra_instructions: Optional[str] = None,
+        bypass_cache: bool = False,
+        invoice_format: Optional[str] = None,
+        on_step_complete: Optional[StepCallback] = None,
+        on_stream: Optional[StreamCallback] = None,
+    ) -> Dict[str, Any]:
+        """Parse both uploads in parallel, then run ``run_review``'s branches.
+
+        Steps reported to ``on_step_complete`` additionally include
+        ``parse_contract`` and ``parse_invoice``; the parsed documents are
+        returned under ``documents`` in the shape of ``process_documents``.
+        The parameters are checkpointed with the run so ``resume`` can pick
+        it up again after a failure or crash.
+        """
+        self.storage.save_run_params(
+            run_id,
+            {
+                "contract_name": contract_path.name,
+                "invoice_name": invoice_path.name,
+                "extra_instructions": extra_instructions or "",
+                # The reviewer's own instructions, kept apart from any stricter re-run's.
+                "base_extra_instructions": extra_instructions or "",
+                "invoice_format": invoice_format or "",
+            },
+        )
+        results = self._run_graph(
+            {"run_id": run_id, "contract_path": str(contract_path), "invoice_path": str(invoice_path)},
+            parse=True,
+            extra_instructions=extra_instructions,
+            bypass_cache=bypass_cache,
+            invoice_format=invoice_format,
+            on_step_complete=on_step_complete,
+            on_stream=on_stream,
+        )
+        logger.info("Parsed documents saved for run %s", run_id)
+        return results
+
+    def resume(
+        self,
+        run_id: str,
+        *,
+        extra_instructions: Optional[str] = None,
+        on_step_complete: Optional[StepCallback] = None,
+        on_stream: Optional[StreamCallback] = None,
+    ) -> Dict[str, Any]:
+        """Finish an interrupted or failed ``review_documents`` run.
+
+        Stages whose checkpoint still matches their inputs and whose output
+        file is unchanged are restored (reported with 0 seconds); failed,
+        missing or stale ones run again, as does everything downstream of a
+        stage whose output changed. New ``extra_instructions`` replace the
+        run's (and the reviewer's), so the LLM steps run again with them.
+        """
+        params = self.storage.load_checkpoints(run_id)["params"]
+        if not params:
+            raise ValueError(f"Run {run_id} has no checkpoint to resume from.")
+        if extra_instructions is not None:
+            params = {**params, "extra_instructions": extra_instructions, "base_extra_instructions": extra_instructions}
+            self.storage.save_run_params(run_id, params)
+        upload_dir = self.storage.artefact_root / run_id
+        paths = {label: upload_dir / params[f"{label}_name"] for label in ("contract", "invoice")}
+        missing = [path.name for path in paths.values() if not path.is_file()]
+        if missing:
+            raise ValueError(f"Run {run_id} cannot be resumed: missing upload {', '.join(missing)}.")
+        logger.info("Resuming run %s", run_id)
+        return self._run_graph(
+            {"run_id": run_id, "contract_path": str(paths["contract"]), "invoice_path": str(paths["invoice"])},
+            parse=True,
+            extra_instructions=params.get("extra_instructions") or None,
+            bypass_cache=False,
+            invoice_format=params.get("invoice_format") or None,
+            on_step_complete=on_step_complete,
+            on_stream=on_stream,
+            resume=True,
+        )
+
+    def _run_graph(
+        self,
+        state: Dict[str, Any],
+        *,
+        parse: bool,
+        extra_instructions: Optional[str],
+        bypass_cache: bool,
+        invoice_format: Optional[str],
+        on_step_complete: Optional[StepCallback],
+        on_stream: Optional[StreamCallback],
+        resume: bool = False,
+    ) -> Dict[str, Any]:
+        run_id = state["run_id"]
+        results: Dict[str, Any] = {}
+        latency: Dict[str, float] = {}
+        documents: Dict[str, str] = {"run_id": run_id}
+        with metrics.collect(run_id, self.storage.save_metrics), metrics.span("run_review"):
+            graph = build_review_graph(
+                self,
+                parse=parse,
+                extra_instructions=extra_instructions,
+                bypass_cache=bypass_cache,
+                invoice_format=invoice_format,
+                translation_language=settings.review_translation_language,
+                stream=on_stream is not None,
+                resume=resume,
+            )
+            for mode, chunk in graph.stream(state, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    if on_stream is not None:
+                        on_stream(*chunk)
+                    continue
+                for node, update in chunk.items():
+                    update = update or {}
+                    seconds = (update.get("latency_seconds") or {}).get(node, 0.0)
+                    latency[node] = seconds
+                    result = (update.get("results") or {}).get(node)
+                    if result is not None:
+                        results[node] = result
+                    else:
+                        result = {key: value for key, value in update.items() if key.endswith("_yaml_path")}
+                        documents.update({key: value for key, value in update.items() if key.endswith(("_yaml", "_yaml_path"))})
+                    logger.info("Run %s step %s finished in %.2fs", run_id, node, seconds)
+                    if on_step_complete is not None and node in PARSE_STEPS + REVIEW_STEPS:
+                        on_step_complete(node, result, seconds)
+        results["latency_seconds"] = latency
+        if parse:
+            results["documents"] = documents
+        logger.info("Run %s LLM response cache stats %s", run_id, self.llm_cache_stats())
+        logger.info("Run %s LLM rate limiter stats %s", run_id, self.rate_limit_stats())
+        return results
+
+    # ---------------------------- background jobs ----------------------------
+
+    def submit_review(
+        self,
+        *,
+        contract_name: str,
+        contract_content: Union[bytes, BinaryIO],
+        invoice_name: str,
+        invoice_content: Union[bytes, BinaryIO],
+        extra_instructions: Optional[str] = None,
+        invoice_format: Optional[str] = None,
+        jobs: Optional[JobRunner] = None,
+    ) -> str:
+        """Store the uploads and queue the review graph as a background job.
+
+        The job id is the run id, so a finished job's outputs can always be
+        reloaded with ``load_run`` from ``data/<run_id>/``. Progress is
+        reported as the stages ``parse`` and ``review``; the latter finishes as
+        ``compliance``, ``contract_review`` and, when enabled, ``translation``.
+        """
+        runner = jobs or get_job_runner()
+        run_id = self.storage.create_run_id()
+        contract_path = self.storage.save_raw_file(run_id, contract_name, contract_content, role="contract")
+        invoice_path = self.storage.save_raw_file(run_id, invoice_name, invoice_content, role="invoice")
+        review = partial(
+            self.review_documents,
+            run_id,
+            contract_path=contract_path,
+            invoice_path=invoice_path,
+            extra_instructions=extra_instructions,
+            invoice_format=invoice_format,
+        )
+        return runner.submit(
+            run_id,
+            self._review_job(run_id, review),
+            params={
+                "contract_name": contract_name,
+                "invoice_name": invoice_name,
+                "extra_instructions": extra_instructions or "",
+                "invoice_format": invoice_format or settings.invoice_prompt_format,
+            },
+        )
+
+    def submit_resume(
+        self, run_id: str, *, extra_instructions: Optional[str] = None, jobs: Optional[JobRunner] = None
+    ) -> str:
+        """Queue ``resume(run_id)`` as a background job under the run id, with ``submit_review``'s stages."""
+        runner = jobs or get_job_runner()
+        params = self.storage.load_checkpoints(run_id)["params"]
+        if not params:
+            raise ValueError(f"Run {run_id} has no checkpoint to resume from.")
+        if extra_instructions is not None:
+            params = {**params, "extra_instructions": extra_instructions, "base_extra_instructions": extra_instructions}
+        review = partial(self.resume, run_id, extra_instructions=extra_instructions)
+        return runner.submit(run_id, self._review_job(run_id, review), params=params)
+
+    def submit_stricter_rerun(self, run_id: str, *, jobs: Optional[JobRunner] = None) -> str:
+        """Queue a resume of ``run_id`` whose LLM steps run with ``STRICTER_INSTRUCTIONS``.
+
+        The stricter text follows the reviewer's own instructions rather than
+        the run's current ones, and the run's params record the re-run, so a
+        run is re-run this way at most once.
+        """
+        runner = jobs or get_job_runner()
+        params = self.storage.load_checkpoints(run_id)["params"]
+        if not params:
+            raise ValueError(f"Run {run_id} has no checkpoint to resume from.")
+        if params.get("stricter_rerun"):
+            raise ValueError(f"Run {run_id} was already re-run with stricter instructions.")
+        base = params.get("base_extra_instructions", params.get("extra_instructions", ""))
+        rerun = {
+            **params,
+            "base_extra_instructions": base,
+            "extra_instructions": (base + STRICTER_INSTRUCTIONS).strip(),
+            "stricter_rerun": True,
+        }
+        # resume() reads the instructions from the saved params.
+        self.storage.save_run_params(run_id, rerun)
+        try:
+            return runner.submit(run_id, self._review_job(run_id, partial(self.resume, run_id)), params=rerun)
+        except BaseException:
+            self.storage.save_run_params(run_id, params)
+            raise
+
+    @staticmethod
+    def _review_job(run_id: str, review: Callable[..., Dict[str, Any]]) -> JobWork:
+        """Job work running ``review(on_step_complete=..., on_stream=...)`` with ``parse``/``review`` progress."""
+
+        def work(progress: ProgressCallback, stream: StreamCallback) -> Dict[str, Any]:
+            progress("parse", None)
+            started = time.perf_counter()
+            parsed: Set[str] = set()
+
+            def step_done(step: str, _result: Dict[str, Any], seconds: float) -> None:
+                if step not in PARSE_STEPS:
+                    progress(step, seconds)
+                    return
+                parsed.add(step)
+                if len(parsed) == len(PARSE_STEPS):
+                    progress("parse", time.perf_counter() - started)
+                    progress("review", None)
+
+            results = review(on_step_complete=step_done, on_stream=stream)
+            return {"run_id": run_id, "latency_seconds": results["latency_seconds"]}
+
+        return work
+
+    def load_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Reload a run's parsed documents, reports and checkpointed params from ``data/<run_id>/``."""
+        if not _RUN_ID_RE.match(run_id or ""):
+            return None
+        contract_yaml = self.storage.read_text(run_id, "contract_raw", suffix=".yaml")
+        invoice_yaml = self.storage.read_text(run_id, "invoice_raw", suffix=".yaml")
+        if contract_yaml is None or invoice_yaml is None:
+            return None
+        run_dir = self.storage.data_root / run_id
+        bundle: Dict[str, Any] = {
+            "run_id": run_id,
+            "result": {
+                "run_id": run_id,
+                "contract_yaml": contract_yaml,
+                "invoice_yaml": invoice_yaml,
+                "contract_yaml_path": str(run_dir / "contract_raw.yaml"),
+                "invoice_yaml_path": str(run_dir / "invoice_raw.yaml"),
+            },
+        }
+        for key, name in (
+            ("compliance", "compliance_report"),
+            ("contract_review", "contract_review"),
+            ("translation", "contract_translation"),
+            ("report", "review_report"),
+        ):
+            content = self.storage.read_text(run_id, name, suffix=".md")
+            bundle[key] = {"content": content, "path": str(run_dir / f"{name}.md")} if content is not None else {}
+        stored_metrics = self.storage.read_text(run_id, "metrics", suffix=".json")
+        bundle["metrics"] = json.loads(stored_metrics) if stored_metrics else {}
+        bundle["params"] = self.storage.load_checkpoints(run_id)["params"]
+        return bundle
+
+    # ---------------------------- helpers ----------------------------
+
+    def _assert_payload_not_empty(self, label: str, payload: Dict[str, Any]) -> None:
+        if not payload:
             raise ValueError(
                 f"The {label} data appears empty after parsing. Please upload a richer {label} document or verify the file contents."
             )
@@ -158,13 +1170,25 @@ class ContractAgentService:
         messages: List[Dict[str, str]],
         max_completion_tokens: int,
         insist_message: str,
+        bypass_cache: bool = False,
+        on_text: Optional[TextCallback] = None,
     ) -> str:
         attempt_messages = list(messages)
         for attempt in range(2):
-            response = self.llm_client.chat_completion(
-                attempt_messages,
-                max_completion_tokens=max_completion_tokens,
-            )
+            if on_text is None:
+                response = self.llm_client.chat_completion(
+                    attempt_messages,
+                    max_completion_tokens=max_completion_tokens,
+                    bypass_cache=bypass_cache,
+                    accept=self._looks_meaningful,
+                )
+            else:
+                response = self._stream_completion(
+                    attempt_messages,
+                    max_completion_tokens=max_completion_tokens,
+                    bypass_cache=bypass_cache,
+                    on_text=on_text,
+                )
             if self._looks_meaningful(response):
                 return response
             attempt_messages = attempt_messages + [
@@ -172,6 +1196,27 @@ class ContractAgentService:
             ]
         return response
 
+    def _stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_completion_tokens: int,
+        bypass_cache: bool,
+        on_text: TextCallback,
+    ) -> str:
+        # Restart the display for every attempt so a retry replaces the weak draft.
+        text = ""
+        on_text(text)
+        for delta in self.llm_client.stream_chat_completion(
+            messages,
+            max_completion_tokens=max_completion_tokens,
+            bypass_cache=bypass_cache,
+            accept=self._looks_meaningful,
+        ):
+            text += delta
+            on_text(text)
+        return text
+
     @staticmethod
     def _looks_meaningful(text: str) -> bool:
         if not text:
@@ -183,5 +1228,14 @@ class ContractAgentService:
         return alnum_count >= 30
 
 
+_service: Optional[ContractAgentService] = None
+_service_lock = threading.Lock()
+
+
 def get_service() -> ContractAgentService:
-    return ContractAgentService()
+    """Process-wide service, built on first use and shared by every Streamlit rerun and job."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ContractAgentService()
+        return _service
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+_current: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("cancel_event", default=None)
+
+
+class Cancelled(RuntimeError):
+    """Raised inside work whose caller has given up on it (e.g. a timed-out review node)."""
+
+
+@contextmanager
+def scope(event: threading.Event) -> Iterator[threading.Event]:
+    """Make :func:`check` in this context raise once ``event`` is set."""
+    token = _current.set(event)
+    try:
+        yield event
+    finally:
+        _current.reset(token)
+
+
+def check() -> None:
+    """Raise :class:`Cancelled` if the enclosing :func:`scope` was cancelled.
+
+    Called before LLM requests, between streamed deltas and before run data is
+    written, so abandoned work stops spending tokens and cannot overwrite the
+    outputs or checkpoints of a later attempt.
+    """
+    event = _current.get()
+    if event is not None and event.is_set():
+        raise Cancelled("Work was cancelled after its caller stopped waiting for it.")
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind ``fn`` to the caller's cancellation scope, for work handed to a thread pool."""
+    event = _current.get()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        token = _current.set(event)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
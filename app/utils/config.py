@@ -2,7 +2,7 @@ import os
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from dotenv import load_dotenv
 
@@ -22,6 +22,35 @@ def _get_request_timeout() -> float:
     return 120.0
 
 
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _get_limits(name: str) -> Dict[str, float]:
+    """Parse ``node=value,node=value``; malformed entries are ignored."""
+    limits: Dict[str, float] = {}
+    for entry in (os.getenv(name) or "").split(","):
+        node, _, value = entry.partition("=")
+        try:
+            limits[node.strip()] = float(value)
+        except ValueError:
+            continue
+    return limits
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass
 class Settings:
     sap_aicore_client_id: str
@@ -33,6 +62,8 @@ class Settings:
     sap_aicore_resource_group: str
     sap_aicore_scope: Optional[str]
     sap_aicore_api_version: str
+    sap_aicore_token_cache_path: Path
+    sap_aicore_token_refresh_seconds: int
     data_storage_path: Path
     artefact_storage_path: Path
     chat_completions_path: Optional[str]
@@ -40,6 +71,44 @@ class Settings:
     openai_api_key: str
     openai_api_base: str
     openai_model: str
+    http_pool_connections: int
+    http_pool_maxsize: int
+    http_pool_block: bool
+    http_keep_alive: bool
+    parse_cache_enabled: bool
+    parse_cache_path: Path
+    parse_cache_max_bytes: int
+    llm_cache_enabled: bool
+    llm_cache_path: Path
+    llm_cache_ttl_seconds: int
+    llm_cache_max_bytes: int
+    pdf_parse_workers: int
+    pdf_parallel_page_threshold: int
+    excel_parser_mode: str
+    llm_prompt_token_budget: int
+    llm_chunk_token_budget: int
+    llm_chunk_concurrency: int
+    retrieval_top_k: int
+    retrieval_min_tokens: int
+    retrieval_max_tokens: int
+    invoice_prompt_format: str
+    invoice_prematch_enabled: bool
+    incremental_review_enabled: bool
+    job_db_path: Path
+    job_workers: int
+    job_heartbeat_seconds: int
+    job_stale_seconds: int
+    llm_rate_limit_rpm: int
+    llm_rate_limit_tpm: int
+    llm_max_concurrency: int
+    llm_max_retries: int
+    metrics_port: int
+    run_catalog_enabled: bool
+    run_catalog_path: Path
+    max_upload_bytes: int
+    review_translation_language: str
+    workflow_node_concurrency: Dict[str, float]
+    workflow_node_timeouts: Dict[str, float]
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -58,6 +127,8 @@ class Settings:
             sap_aicore_resource_group=os.getenv("SAP_AICORE_RESOURCE_GROUP", "default"),
             sap_aicore_scope=os.getenv("SAP_AICORE_SCOPE"),
             sap_aicore_api_version=os.getenv("SAP_AICORE_API_VERSION", "2023-05-15"),
+            sap_aicore_token_cache_path=Path(os.getenv("SAP_AICORE_TOKEN_CACHE_PATH", "cache/aicore_tokens.sqlite3")),
+            sap_aicore_token_refresh_seconds=_get_int("SAP_AICORE_TOKEN_REFRESH_SECONDS", 300),
             data_storage_path=data_storage,
             artefact_storage_path=artefact_storage,
             chat_completions_path=chat_path,
@@ -65,10 +136,46 @@ class Settings:
             openai_api_key=os.getenv("OPENAI_API_KEY", ""),
             openai_api_base=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
             openai_model=os.getenv("OPENAI_MODEL", "gpt-5"),
+            http_pool_connections=_get_int("HTTP_POOL_CONNECTIONS", 4),
+            http_pool_maxsize=_get_int("HTTP_POOL_MAXSIZE", 10),
+            http_pool_block=_get_bool("HTTP_POOL_BLOCK", False),
+            http_keep_alive=_get_bool("HTTP_KEEP_ALIVE", True),
+            parse_cache_enabled=_get_bool("PARSE_CACHE_ENABLED", True),
+            parse_cache_path=Path(os.getenv("PARSE_CACHE_PATH", "cache/parse")),
+            parse_cache_max_bytes=_get_int("PARSE_CACHE_MAX_MB", 512) * 1024 * 1024,
+            llm_cache_enabled=_get_bool("LLM_CACHE_ENABLED", True),
+            llm_cache_path=Path(os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3")),
+            llm_cache_ttl_seconds=_get_int("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600),
+            llm_cache_max_bytes=_get_int("LLM_CACHE_MAX_MB", 128) * 1024 * 1024,
+            pdf_parse_workers=_get_int("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1)),
+            pdf_parallel_page_threshold=_get_int("PDF_PARALLEL_PAGE_THRESHOLD", 64),
+            excel_parser_mode=os.getenv("EXCEL_PARSER_MODE", "pandas").strip().lower(),
+            llm_prompt_token_budget=_get_int("LLM_PROMPT_TOKEN_BUDGET", 100_000),
+            llm_chunk_token_budget=_get_int("LLM_CHUNK_TOKENS", 30_000),
+            llm_chunk_concurrency=_get_int("LLM_CHUNK_CONCURRENCY", 4),
+            retrieval_top_k=_get_int("CONTRACT_RETRIEVAL_TOP_K", 3),
+            retrieval_min_tokens=_get_int("CONTRACT_RETRIEVAL_MIN_TOKENS", 8_000),
+            retrieval_max_tokens=_get_int("CONTRACT_RETRIEVAL_MAX_TOKENS", 12_000),
+            invoice_prompt_format=os.getenv("INVOICE_PROMPT_FORMAT", "records").strip().lower(),
+            invoice_prematch_enabled=_get_bool("INVOICE_PREMATCH_ENABLED", True),
+            incremental_review_enabled=_get_bool("INCREMENTAL_REVIEW_ENABLED", True),
+            job_db_path=Path(os.getenv("JOB_DB_PATH", str(data_storage / "jobs.sqlite3"))),
+            job_workers=_get_int("JOB_WORKERS", 2),
+            job_heartbeat_seconds=_get_int("JOB_HEARTBEAT_SECONDS", 15),
+            job_stale_seconds=_get_int("JOB_STALE_SECONDS", 120),
+            llm_rate_limit_rpm=_get_int("LLM_RATE_LIMIT_RPM", 0),
+            llm_rate_limit_tpm=_get_int("LLM_RATE_LIMIT_TPM", 0),
+            llm_max_concurrency=_get_int("LLM_MAX_CONCURRENCY", 8),
+            llm_max_retries=_get_int("LLM_MAX_RETRIES", 4),
+            metrics_port=_get_int("METRICS_PORT", 0),
+            run_catalog_enabled=_get_bool("RUN_CATALOG_ENABLED", True),
+            run_catalog_path=Path(os.getenv("RUN_CATALOG_PATH", str(data_storage / "runs.sqlite3"))),
+            max_upload_bytes=_get_int("MAX_UPLOAD_MB", 200) * 1024 * 1024,
+            review_translation_language=os.getenv("REVIEW_TRANSLATION_LANGUAGE", "").strip(),
+            workflow_node_concurrency=_get_limits("WORKFLOW_NODE_CONCURRENCY"),
+            workflow_node_timeouts=_get_limits("WORKFLOW_NODE_TIMEOUTS"),
         )
-
-        settings.data_storage_path.mkdir(parents=True, exist_ok=True)
-        settings.artefact_storage_path.mkdir(parents=True, exist_ok=True)
+        # Folders are created by the stores that use them, not on import.
         return settings
 
 
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_VERSION = 1
+PROMETHEUS_PREFIX = "contract_agent"
+
+
+class RunMetrics:
+    """Spans and counters recorded while work for one run is in progress."""
+
+    def __init__(self, run_id: str) -> None:
+        self.run_id = run_id
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+
+    def add_span(self, name: str, seconds: float, attrs: Dict[str, Any]) -> None:
+        record = {"name": name, "start": round(time.time() - seconds - self.started, 3), "seconds": round(seconds, 4)}
+        record.update(attrs)
+        with self._lock:
+            self.spans.append(record)
+
+    def add(self, counter: str, amount: float) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        return {"started_at": self.started, "spans": spans, "counters": counters}
+
+
+class _Registry:
+    """Process-wide totals behind the Prometheus exporter."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._spans: Dict[str, Tuple[int, float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            count, total = self._spans.get(name, (0, 0.0))
+            self._spans[name] = (count + 1, total + seconds)
+
+    def add(self, counter: str, amount: float) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def register_gauges(self, name: str, collect: Callable[[], Dict[str, float]]) -> None:
+        with self._lock:
+            self._gauges[name] = collect
+
+    def render(self) -> str:
+        with self._lock:
+            spans = dict(self._spans)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_span_seconds summary",
+        ]
+        for name, (count, total) in sorted(spans.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+            lines.append(f"{PROMETHEUS_PREFIX}_{name}_total {value:g}")
+        for group, collect in sorted(gauges.items()):
+            try:
+                values = collect()
+            except Exception:  # noqa: BLE001 - a broken gauge must not break the scrape
+                logger.exception("Metrics gauge %s failed", group)
+                continue
+            for name, value in sorted(values.items()):
+                lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{group}_{name} gauge")
+                lines.append(f"{PROMETHEUS_PREFIX}_{group}_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = _Registry()
+_current: contextvars.ContextVar[Optional[RunMetrics]] = contextvars.ContextVar("run_metrics", default=None)
+
+
+# ---------------------------- recording ----------------------------
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Time the block as ``name``; the yielded dict takes attributes found along the way."""
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        seconds = time.perf_counter() - started
+        REGISTRY.observe(name, seconds)
+        recorder = _current.get()
+        if recorder is not None:
+            recorder.add_span(name, seconds, attrs)
+
+
+def count(counter: str, amount: float = 1) -> None:
+    if not amount:
+        return
+    REGISTRY.add(counter, amount)
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.add(counter, amount)
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind ``fn`` to the caller's run, for work handed to a thread pool."""
+    recorder = _current.get()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        token = _current.set(recorder)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
+
+
+def merge(existing: Optional[Dict[str, Any]], recorded: Dict[str, Any]) -> Dict[str, Any]:
+    """Append ``recorded`` to a run's earlier ``metrics.json`` content and recompute totals."""
+    if not existing or existing.get("version") != METRICS_VERSION:
+        existing = {"version": METRICS_VERSION, "spans": [], "counters": {}}
+    spans = existing["spans"] + recorded["spans"]
+    counters = dict(existing["counters"])
+    for name, value in recorded["counters"].items():
+        counters[name] = round(counters.get(name, 0) + value, 4)
+    totals: Dict[str, Dict[str, float]] = {}
+    for record in spans:
+        entry = totals.setdefault(record["name"], {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] = round(entry["seconds"] + record["seconds"], 4)
+    return {"version": METRICS_VERSION, "updated_at": time.time(), "spans": spans, "counters": counters, "totals": totals}
+
+
+@contextmanager
+def collect(run_id: str, save: Callable[[RunMetrics], None]) -> Iterator[RunMetrics]:
+    """Record spans and counters of the block for ``run_id`` and hand them to ``save``.
+
+    Nested blocks for the same run share the outer recorder, so ``save`` runs
+    once per outermost block.
+    """
+    current = _current.get()
+    if current is not None and current.run_id == run_id:
+        yield current
+        return
+    recorder = RunMetrics(run_id)
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+        try:
+            save(recorder)
+        except Exception:  # noqa: BLE001 - metrics must never fail a run
+            logger.exception("Could not save metrics for run %s", run_id)
+
+
+# ---------------------------- exporter ----------------------------
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("metrics exporter: " + format, *args)
+
+
+_exporter: Optional[ThreadingHTTPServer] = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` in Prometheus text format from a daemon thread, once per process."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                _exporter = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as exc:
+                logger.warning("Metrics exporter not started on %s:%s: %s", host, port, exc)
+                return None
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+            logger.info("Prometheus metrics exported on http://%s:%s/metrics", host, port)
+        return _exporter
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Run status follows the furthest stage whose output exists.
+STAGE_OUTPUTS = (
+    ("reviewed", ("compliance_report.md", "contract_review.md")),
+    ("parsed", ("contract_raw.yaml", "invoice_raw.yaml")),
+)
+UPLOADED = "uploaded"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    contract_name TEXT,
+    contract_sha256 TEXT,
+    invoice_name TEXT,
+    invoice_sha256 TEXT,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_status_created_at ON runs (status, created_at);
+CREATE INDEX IF NOT EXISTS runs_contract_sha256 ON runs (contract_sha256);
+CREATE INDEX IF NOT EXISTS runs_invoice_sha256 ON runs (invoice_sha256);
+
+CREATE TABLE IF NOT EXISTS run_files (
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, kind, name)
+);
+CREATE INDEX IF NOT EXISTS run_files_sha256 ON run_files (sha256);
+CREATE INDEX IF NOT EXISTS run_files_name_updated_at ON run_files (name, updated_at);
+"""
+
+
+class RunCatalog:
+    """SQLite index of runs and the files they hold, kept current by ``StorageManager``.
+
+    Each ``save_*`` call upserts the file (kind ``data`` for generated
+    outputs, ``upload`` for originals) and refreshes the run's status, total
+    size and, for uploads tagged with a role, the contract/invoice name and
+    hash. A connection is opened per operation so threads and processes can
+    share it; ``rebuild`` recreates the index from the folders on disk.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ---------------------------- recording ----------------------------
+
+    def record_file(
+        self,
+        run_id: str,
+        *,
+        kind: str,
+        path: Path,
+        size: int,
+        sha256: Optional[str] = None,
+        role: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        now = timestamp or time.time()
+        with closing(self._connect()) as conn, conn:
+            self._upsert_file(conn, run_id, kind=kind, path=path, size=size, sha256=sha256, role=role, now=now)
+
+    def _upsert_file(
+        self,
+        conn: sqlite3.Connection,
+        run_id: str,
+        *,
+        kind: str,
+        path: Path,
+        size: int,
+        sha256: Optional[str],
+        role: Optional[str],
+        now: float,
+    ) -> None:
+        conn.execute(
+            "INSERT INTO runs (run_id, status, created_at, updated_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(run_id) DO UPDATE SET updated_at = MAX(updated_at, excluded.updated_at),"
+            " created_at = MIN(created_at, excluded.created_at)",
+            (run_id, UPLOADED, now, now),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO run_files (run_id, kind, name, path, size, sha256, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, kind, path.name, str(path), size, sha256, now),
+        )
+        if role in {"contract", "invoice"}:
+            conn.execute(
+                f"UPDATE runs SET {role}_name = ?, {role}_sha256 = ? WHERE run_id = ?",
+                (path.name, sha256, run_id),
+            )
+        names = {row[0] for row in conn.execute("SELECT name FROM run_files WHERE run_id = ? AND kind = 'data'", (run_id,))}
+        status = next((stage for stage, outputs in STAGE_OUTPUTS if all(name in names for name in outputs)), UPLOADED)
+        conn.execute(
+            "UPDATE runs SET status = ?,"
+            " total_bytes = (SELECT COALESCE(SUM(size), 0) FROM run_files WHERE run_id = ?) WHERE run_id = ?",
+            (status, run_id, run_id),
+        )
+
+    # ---------------------------- queries ----------------------------
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            files = conn.execute(
+                "SELECT kind, name, path, size, sha256, updated_at FROM run_files WHERE run_id = ? ORDER BY kind, name",
+                (run_id,),
+            ).fetchall()
+        run = dict(row)
+        run["files"] = [dict(entry) for entry in files]
+        return run
+
+    def list_runs(
+        self,
+        *,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Runs created in ``[since, until)``, newest first, optionally with one status."""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM runs {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_by_hash(self, sha256: str, *, limit: int = 100) -> List[Dict[str, Any]]:
+        """Runs whose uploaded contract or invoice has this SHA-256, newest first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM runs WHERE run_id IN ("
+                " SELECT run_id FROM runs WHERE contract_sha256 = ?"
+                " UNION SELECT run_id FROM runs WHERE invoice_sha256 = ?"
+                " UNION SELECT run_id FROM run_files WHERE sha256 = ?"
+                ") ORDER BY created_at DESC LIMIT ?",
+                (sha256, sha256, sha256, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def runs_with_file(self, name: str, *, limit: int) -> List[str]:
+        """Run ids holding a data file called ``name``, most recently written first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT run_id FROM run_files WHERE name = ? AND kind = 'data' ORDER BY updated_at DESC LIMIT ?",
+                (name, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def run_ids(self) -> List[str]:
+        """Every catalogued run id, newest first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT run_id FROM runs ORDER BY created_at DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM runs GROUP BY status").fetchall())
+        counts["total"] = sum(counts.values())
+        return counts
+
+    # ---------------------------- rebuild ----------------------------
+
+    def seed(self, data_root: Path, artefact_root: Path, *, manifest_name: str) -> Optional[Dict[str, int]]:
+        """``rebuild`` if the catalog is empty but run folders exist, e.g. runs made before it did."""
+        with closing(self._connect()) as conn:
+            if conn.execute("SELECT 1 FROM runs LIMIT 1").fetchone() is not None:
+                return None
+        if not any(_run_dirs(data_root)) and not any(_run_dirs(artefact_root)):
+            return None
+        logger.info("Run catalog %s is empty; indexing the existing run folders", self.path)
+        return self.rebuild(data_root, artefact_root, manifest_name=manifest_name)
+
+    def rebuild(self, data_root: Path, artefact_root: Path, *, manifest_name: str) -> Dict[str, int]:
+        """Replace the catalog with what is on disk under ``data_root`` and ``artefact_root``.
+
+        Upload hashes come from each run's artefact manifest; roles from the
+        parsed outputs' ``source_file`` or, before parsing, the file name.
+        """
+        run_ids = {path.name for path in _run_dirs(data_root)} | {path.name for path in _run_dirs(artefact_root)}
+        files = 0
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM run_files")
+            conn.execute("DELETE FROM runs")
+            for run_id in sorted(run_ids):
+                sources = _source_files(data_root / run_id)
+                manifest = _read_json(artefact_root / run_id / manifest_name)
+                for path in _files(artefact_root / run_id, exclude={manifest_name}):
+                    stat = path.stat()
+                    role = next((label for label, name in sources.items() if name == path.name), None) or next(
+                        (label for label in ("contract", "invoice") if label not in sources and label in path.stem.lower()),
+                        None,
+                    )
+                    self._upsert_file(
+                        conn,
+                        run_id,
+                        kind="upload",
+                        path=path,
+                        size=stat.st_size,
+                        sha256=(manifest.get(path.name) or {}).get("sha256"),
+                        role=role,
+                        now=stat.st_mtime,
+                    )
+                    files += 1
+                for path in _files(data_root / run_id):
+                    stat = path.stat()
+                    self._upsert_file(
+                        conn, run_id, kind="data", path=path, size=stat.st_size, sha256=None, role=None, now=stat.st_mtime
+                    )
+                    files += 1
+        stats = {"runs": len(run_ids), "files": files}
+        logger.info("Run catalog rebuilt: %s", stats)
+        return stats
+
+
+def _run_dirs(root: Path) -> Iterable[Path]:
+    if not root.exists():
+        return []
+    return [path for path in root.iterdir() if path.is_dir() and not path.name.startswith(("_", "."))]
+
+
+def _files(folder: Path, *, exclude: Iterable[str] = ()) -> List[Path]:
+    if not folder.is_dir():
+        return []
+    skipped = set(exclude)
+    return sorted(
+        path for path in folder.iterdir() if path.is_file() and path.name not in skipped and not path.name.endswith(".tmp")
+    )
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _source_files(run_dir: Path) -> Dict[str, str]:
+    """``{"contract": name, "invoice": name}`` from the parsed YAMLs' first line."""
+    sources: Dict[str, str] = {}
+    for label in ("contract", "invoice"):
+        path = run_dir / f"{label}_raw.yaml"
+        try:
+            with path.open(encoding="utf-8") as handle:
+                first = handle.readline()
+        except OSError:
+            continue
+        if first.startswith("source_file:"):
+            sources[label] = first.split(":", 1)[1].strip().strip("'\"")
+    return sources
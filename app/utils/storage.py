@@ -1,23 +1,74 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
 import uuid
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Union
 
-import yaml
+from . import cancellation
+from .metrics import RunMetrics, merge as merge_metrics, span
+from .run_catalog import RunCatalog
+from .yaml_io import dump_yaml, load_yaml
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+CHECKPOINTS_NAME = "checkpoints.json"
+CHECKPOINTS_VERSION = 1
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+def format_size(size: int) -> str:
+    """``size`` bytes as MB (or KB below 1 MB) for messages, e.g. ``"1.5 MB"``, ``"512 KB"``."""
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f}".rstrip("0").rstrip(".") + " MB"
+    return f"{max(1, round(size / 1024))} KB"
 
 
 class StorageManager:
-    def __init__(self, data_root: Path, artefact_root: Path) -> None:
+    def __init__(
+        self,
+        data_root: Path,
+        artefact_root: Path,
+        *,
+        catalog: Optional[RunCatalog] = None,
+        max_upload_bytes: int = 0,
+    ) -> None:
         self.data_root = data_root
         self.artefact_root = artefact_root
+        self.catalog = catalog
+        # 0 disables the limit; otherwise uploads are cut off while streaming.
+        self.max_upload_bytes = max_upload_bytes
         self.data_root.mkdir(parents=True, exist_ok=True)
         self.artefact_root.mkdir(parents=True, exist_ok=True)
+        # Upload bytes live once in a content-addressed blob store; run
+        # directories only hold hardlinks to them plus a manifest.
+        self.blob_root = self.artefact_root / "_blobs"
+        self.blob_root.mkdir(parents=True, exist_ok=True)
+        self._manifest_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        if self.catalog is not None:
+            try:
+                self.catalog.seed(self.data_root, self.artefact_root, manifest_name=MANIFEST_NAME)
+            except Exception:  # noqa: BLE001 - an unindexed history must not stop the app
+                logger.exception("Could not index existing runs in the run catalog")
 
     def create_run_id(self) -> str:
         return uuid.uuid4().hex
 
     def _run_data_dir(self, run_id: str) -> Path:
+        cancellation.check()  # a timed-out node must not overwrite a newer attempt's outputs
         path = self.data_root / run_id
         path.mkdir(parents=True, exist_ok=True)
         return path
@@ -27,32 +78,282 @@ class StorageManager:
         path.mkdir(parents=True, exist_ok=True)
         return path
 
+    def _catalog_file(
+        self, run_id: str, target: Path, *, kind: str = "data", sha256: Optional[str] = None, role: Optional[str] = None
+    ) -> None:
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.record_file(run_id, kind=kind, path=target, size=target.stat().st_size, sha256=sha256, role=role)
+        except Exception:  # noqa: BLE001 - the catalog is an index and must never fail a save
+            logger.exception("Could not record %s in the run catalog", target)
+
     def save_yaml(self, run_id: str, name: str, payload: Dict[str, Any]) -> Path:
         target = self._run_data_dir(run_id) / f"{name}.yaml"
-        with target.open("w", encoding="utf-8") as handle:
-            yaml.safe_dump(payload, handle, sort_keys=False, allow_unicode=False)
+        with span("storage.write", file=target.name) as attrs, target.open("w", encoding="utf-8") as handle:
+            dump_yaml(payload, handle)
+            attrs["chars"] = handle.tell()
+        self._catalog_file(run_id, target)
         return target
 
-    def save_markdown(self, run_id: str, name: str, content: str) -> Path:
-        target = self._run_data_dir(run_id) / f"{name}.md"
-        target.write_text(content, encoding="utf-8")
+    def save_yaml_stream(self, run_id: str, name: str, write: Callable[[TextIO], Any]) -> Path:
+        """Let ``write`` stream YAML straight into the run's ``<name>.yaml``."""
+        target = self._run_data_dir(run_id) / f"{name}.yaml"
+        with span("storage.write_stream", file=target.name) as attrs, target.open("w", encoding="utf-8") as handle:
+            write(handle)
+            attrs["chars"] = handle.tell()
+        self._catalog_file(run_id, target)
         return target
 
+    def save_markdown(self, run_id: str, name: str, content: str) -> Path:
+        return self.save_text(run_id, name, content, suffix=".md")
+
     def save_text(self, run_id: str, name: str, content: str, *, suffix: str = ".txt") -> Path:
         target = self._run_data_dir(run_id) / f"{name}{suffix}"
-        target.write_text(content, encoding="utf-8")
+        with span("storage.write", file=target.name) as attrs:
+            attrs["chars"] = target.write_text(content, encoding="utf-8")
+        self._catalog_file(run_id, target)
+        return target
+
+    def read_text(self, run_id: str, name: str, *, suffix: str = ".txt") -> Optional[str]:
+        target = self.data_root / run_id / f"{name}{suffix}"
+        if not target.exists():
+            return None
+        return target.read_text(encoding="utf-8")
+
+    def save_metrics(self, recorder: RunMetrics) -> Path:
+        """Merge ``recorder`` into the run's ``metrics.json``."""
+        with self._metrics_lock:
+            existing = self.read_text(recorder.run_id, "metrics", suffix=".json")
+            metrics = merge_metrics(json.loads(existing) if existing else None, recorder.to_dict())
+            target = self._run_data_dir(recorder.run_id) / "metrics.json"
+            tmp = target.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(metrics, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp, target)
+        self._catalog_file(recorder.run_id, target)
         return target
 
-    def save_raw_file(self, run_id: str, original_name: str, content: bytes) -> Path:
+    # ---------------------------- checkpoints ----------------------------
+    #
+    # data/<run_id>/checkpoints.json records the run's parameters and, per
+    # stage, the fingerprint of its inputs plus the name and SHA-256 of the
+    # output it wrote. A stage can be skipped on resume only if both still match.
+
+    def load_checkpoints(self, run_id: str) -> Dict[str, Any]:
+        text = self.read_text(run_id, "checkpoints", suffix=".json")
+        try:
+            checkpoints = json.loads(text) if text else {}
+        except ValueError:
+            logger.warning("Ignoring unreadable checkpoints of run %s", run_id)
+            checkpoints = {}
+        if checkpoints.get("version") != CHECKPOINTS_VERSION:
+            checkpoints = {"version": CHECKPOINTS_VERSION, "params": {}, "stages": {}}
+        return checkpoints
+
+    def _update_checkpoints(self, run_id: str, key: str, name: Optional[str], value: Any) -> None:
+        with self._checkpoint_lock:
+            checkpoints = self.load_checkpoints(run_id)
+            if name is None:
+                checkpoints[key] = value
+            else:
+                checkpoints[key][name] = value
+            target = self._run_data_dir(run_id) / CHECKPOINTS_NAME
+            tmp = target.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(checkpoints, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp, target)
+        self._catalog_file(run_id, target)
+
+    def save_run_params(self, run_id: str, params: Dict[str, Any]) -> None:
+        self._update_checkpoints(run_id, "params", None, params)
+
+    def save_checkpoint(
+        self,
+        run_id: str,
+        stage: str,
+        *,
+        inputs: str,
+        output: Optional[Path] = None,
+        result: Optional[Dict[str, Any]] = None,
+        seconds: float = 0.0,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record ``stage`` as done (with its ``output`` file) or, given ``error``, as failed."""
+        entry: Dict[str, Any] = {"status": "failed" if error else "done", "inputs": inputs, "finished_at": time.time()}
+        if error:
+            entry["error"] = error
+        else:
+            entry["seconds"] = round(seconds, 3)
+            entry["result"] = result or {}
+            if output is not None:
+                entry["output"] = output.name
+                entry["output_sha256"] = hashlib.sha256(output.read_bytes()).hexdigest()
+        self._update_checkpoints(run_id, "stages", stage, entry)
+
+    def restore_checkpoint(self, run_id: str, stage: str, *, inputs: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """``(entry, output text)`` if ``stage`` finished with these inputs and its output is unchanged."""
+        entry = self.load_checkpoints(run_id)["stages"].get(stage)
+        if not entry or entry.get("status") != "done" or entry.get("inputs") != inputs or not entry.get("output"):
+            return None
+        try:
+            content = (self.data_root / run_id / entry["output"]).read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(content).hexdigest() != entry.get("output_sha256"):
+            return None
+        return entry, content.decode("utf-8")
+
+    def save_raw_file(
+        self, run_id: str, original_name: str, content: Union[bytes, BinaryIO], *, role: Optional[str] = None
+    ) -> Path:
+        """Stream an upload into the blob store in chunks and link it into the run.
+
+        ``role`` ("contract"/"invoice") tags its hash in the run catalog.
+        Raises ``UploadTooLargeError`` once more than ``max_upload_bytes`` have
+        been read; nothing is kept in that case.
+        """
+        with span("storage.save_upload", file=original_name) as attrs:
+            try:
+                digest, size, blob = self._store_blob(content)
+            except UploadTooLargeError:
+                raise UploadTooLargeError(
+                    f"{original_name} is larger than the {format_size(self.max_upload_bytes)} upload limit."
+                ) from None
+            attrs["bytes"] = size
         target = self._run_artefact_dir(run_id) / original_name
-        target.write_bytes(content)
+        target.unlink(missing_ok=True)
+        try:
+            os.link(blob, target)
+        except OSError:
+            # Filesystems without hardlink support still get a usable file.
+            shutil.copyfile(blob, target)
+        self._record_manifest_entry(run_id, original_name, digest, size)
+        self._catalog_file(run_id, target, kind="upload", sha256=digest, role=role)
         return target
 
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_root / digest[:2] / digest
+
+    def _store_blob(self, content: Union[bytes, BinaryIO]) -> Tuple[str, int, Path]:
+        digest = hashlib.sha256()
+        size = 0
+        tmp = self.blob_root / f".{uuid.uuid4().hex}.tmp"
+        try:
+            with tmp.open("wb") as handle:
+                for chunk in _iter_chunks(content):
+                    size += len(chunk)
+                    if self.max_upload_bytes and size > self.max_upload_bytes:
+                        raise UploadTooLargeError(size)
+                    digest.update(chunk)
+                    handle.write(chunk)
+            blob = self._blob_path(digest.hexdigest())
+            if blob.exists():
+                tmp.unlink()
+                # A fresh mtime keeps collect_garbage off the blob until the
+                # run's hardlink and manifest entry reference it.
+                os.utime(blob)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, blob)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return digest.hexdigest(), size, blob
+
+    def _record_manifest_entry(self, run_id: str, name: str, digest: str, size: int) -> None:
+        with self._manifest_lock:
+            manifest = self.load_manifest(run_id)
+            manifest[name] = {"sha256": digest, "size": size}
+            target = self._run_artefact_dir(run_id) / MANIFEST_NAME
+            tmp = target.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, target)
+
+    def load_manifest(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        path = self.artefact_root / run_id / MANIFEST_NAME
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def collect_garbage(self, *, dry_run: bool = False, grace_seconds: float = 3600.0) -> Dict[str, int]:
+        """Delete blobs that no run manifest references any more.
+
+        Blobs (and interrupted-upload temp files) written or reused within
+        ``grace_seconds`` are kept: an upload in progress stores its blob
+        before the manifest refers to it.
+        """
+        cutoff = time.time() - grace_seconds
+        referenced = set()
+        for manifest_path in self.artefact_root.glob(f"*/{MANIFEST_NAME}"):
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable manifest %s", manifest_path)
+                continue
+            referenced.update(entry.get("sha256") for entry in manifest.values())
+
+        stats = {"kept": 0, "removed": 0, "freed_bytes": 0}
+        for blob in self.blob_root.glob("*/*"):
+            try:
+                stat = blob.stat()
+            except OSError:
+                continue
+            if blob.name in referenced or stat.st_mtime >= cutoff:
+                stats["kept"] += 1
+                continue
+            stats["removed"] += 1
+            stats["freed_bytes"] += stat.st_size
+            if not dry_run:
+                blob.unlink(missing_ok=True)
+        # Leftovers from interrupted uploads.
+        for tmp in self.blob_root.glob(".*.tmp"):
+            if tmp.stat().st_mtime < cutoff and not dry_run:
+                tmp.unlink(missing_ok=True)
+        logger.info("Artefact blob GC%s: %s", " (dry run)" if dry_run else "", stats)
+        return stats
+
     def load_yaml(self, path: Path) -> Dict[str, Any]:
         with path.open("r", encoding="utf-8") as handle:
-            return yaml.safe_load(handle)
+            return load_yaml(handle)
+
+    def recent_runs_with(self, file_name: str, *, limit: int) -> List[Tuple[str, Path]]:
+        """``(run_id, path)`` of the newest runs whose data folder holds ``file_name``.
+
+        Answered from the run catalog when there is one; otherwise every run
+        folder is stat'ed.
+        """
+        if self.catalog is not None:
+            try:
+                run_ids = self.catalog.runs_with_file(file_name, limit=limit)
+            except Exception:  # noqa: BLE001 - fall back to scanning the folders
+                logger.exception("Run catalog query failed; scanning %s", self.data_root)
+            else:
+                return [(run_id, self.data_root / run_id / file_name) for run_id in run_ids]
+        found = []
+        for path in self.data_root.glob(f"*/{file_name}"):
+            try:
+                found.append((path.stat().st_mtime, path.parent.name, path))
+            except OSError:
+                continue
+        found.sort(reverse=True)
+        return [(run_id, path) for _, run_id, path in found[:limit]]
+
+    def rebuild_catalog(self) -> Dict[str, int]:
+        if self.catalog is None:
+            raise RuntimeError("The run catalog is disabled (RUN_CATALOG_ENABLED=false).")
+        return self.catalog.rebuild(self.data_root, self.artefact_root, manifest_name=MANIFEST_NAME)
 
     def list_run_directories(self) -> Dict[str, Dict[str, Path]]:
+        """``{run_id: {"data": path, "artefacts": path}}``, from the run catalog when there is one."""
+        if self.catalog is not None:
+            try:
+                run_ids = self.catalog.run_ids()
+            except Exception:  # noqa: BLE001 - fall back to scanning the folders
+                logger.exception("Run catalog query failed; scanning %s", self.data_root)
+            else:
+                return {
+                    run_id: {"data": self.data_root / run_id, "artefacts": self.artefact_root / run_id}
+                    for run_id in run_ids
+                }
         listing: Dict[str, Dict[str, Path]] = {}
         for run_dir in self.data_root.glob("*"):
             if run_dir.is_dir():
@@ -61,3 +362,13 @@ class StorageManager:
                     "artefacts": self.artefact_root / run_dir.name,
                 }
         return listing
+
+
+def _iter_chunks(content: Union[bytes, BinaryIO]) -> Iterator[bytes]:
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        view = memoryview(content)
+        for offset in range(0, len(view), _CHUNK_SIZE):
+            yield view[offset:offset + _CHUNK_SIZE]
+        return
+    for chunk in iter(lambda: content.read(_CHUNK_SIZE), b""):
+        yield chunk
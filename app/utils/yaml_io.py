@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Any, Optional, TextIO, Union
+
+import yaml
+
+# LibYAML's C emitter/parser is several times faster than the pure-Python
+# implementation; PyYAML wheels ship it on most platforms.
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+    LIBYAML = True
+except ImportError:  # pragma: no cover - depends on the PyYAML build
+    from yaml import SafeDumper, SafeLoader
+    LIBYAML = False
+
+YAMLError = yaml.YAMLError
+
+
+def dump_yaml(payload: Any, stream: Optional[TextIO] = None, **options: Any) -> Optional[str]:
+    """``yaml.safe_dump`` with the repo's defaults, using LibYAML when available."""
+    options.setdefault("sort_keys", False)
+    options.setdefault("allow_unicode", False)
+    return yaml.dump(payload, stream, Dumper=SafeDumper, **options)
+
+
+def load_yaml(source: Union[str, bytes, TextIO]) -> Any:
+    """``yaml.safe_load`` using LibYAML when available."""
+    return yaml.load(source, Loader=SafeLoader)
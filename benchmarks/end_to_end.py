@@ -0,0 +1,248 @@
+"""End-to-end review throughput against the local stand-in LLM server.
+
+    python benchmarks/end_to_end.py --scales 1,4,16 --concurrency 1,4,8 --reviews 8
+
+For every scale a synthetic contract PDF (``5 * scale`` pages of rate
+clauses) and invoice workbook (``50 * scale`` charge rows) are generated. Each
+scale/concurrency pair then runs in a fresh spawned process with its own
+storage under a temporary folder and response/parse/incremental caches off,
+driving ``process_documents`` + ``run_review`` for ``--reviews`` runs over
+``--concurrency`` threads. Reported per scenario: mean parse time, p50/p95
+review latency, reviews per minute, LLM requests and peak RSS of the worker
+(including its PDF parse pool). Mock server options are those of
+``benchmarks/mock_llm.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Empty
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.mock_llm import add_arguments, config_from_args, start_server  # noqa: E402
+
+BASE_PAGES = 5
+BASE_ROWS = 50
+CLAUSES_PER_PAGE = 12
+MOVEMENTS = ("Discharged", "Loaded", "Restow", "Shifting", "Reefer monitoring")
+SIZES = ("20", "40", "45")
+
+
+# ---------------------------- synthetic documents ----------------------------
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, pages: List[List[str]]) -> None:
+    """Minimal text-only PDF (Helvetica, one line per entry) readable by pypdf."""
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * index for index in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for page_id, lines in zip(page_ids, pages):
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >>"
+            f" /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def _rate(movement: int, size: int) -> float:
+    return round(45 + 12.5 * movement + 20 * size, 2)
+
+
+def build_contract(path: Path, *, pages: int) -> None:
+    content = []
+    clause = 1
+    for page in range(pages):
+        lines = [f"Terminal Services Agreement - Schedule {page + 1}"]
+        for _ in range(CLAUSES_PER_PAGE):
+            movement = clause % len(MOVEMENTS)
+            size = clause % len(SIZES)
+            lines.append(
+                f"Clause {page + 1}.{clause}: {MOVEMENTS[movement]} of {SIZES[size]}ft laden containers is charged at"
+                f" USD {_rate(movement, size):.2f} per unit, payable within 30 days of invoice."
+            )
+            clause += 1
+        content.append(lines)
+    write_pdf(path, content)
+
+
+def build_invoice(path: Path, *, rows: int) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Invoice")
+    sheet.append(["Movement Type", "Size", "Full/Empty", "Quantity", "Rate", "Amount", "Currency"])
+    for row in range(rows):
+        movement = row % len(MOVEMENTS)
+        size = row % len(SIZES)
+        quantity = 1 + row % 7
+        rate = _rate(movement, size) + (5 if row % 11 == 0 else 0)
+        sheet.append([MOVEMENTS[movement], SIZES[size], "F", quantity, rate, round(quantity * rate, 2), "USD"])
+    workbook.save(path)
+
+
+# ---------------------------- scenario worker ----------------------------
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run_scenario(env: Dict[str, str], contract: str, invoice: str, concurrency: int, reviews: int, queue: Any) -> None:
+    # Settings are read at import time, so the environment goes first.
+    os.environ.update(env)
+    from app.service import get_service
+    from app.utils import metrics
+
+    service = get_service()
+
+    def review(_index: int) -> Dict[str, float]:
+        run_id = service.storage.create_run_id()
+        started = time.perf_counter()
+        contract_path = service.storage.save_raw_file(run_id, "contract.pdf", Path(contract).read_bytes(), role="contract")
+        invoice_path = service.storage.save_raw_file(run_id, "invoice.xlsx", Path(invoice).read_bytes(), role="invoice")
+        documents = service.process_documents(contract_path=contract_path, invoice_path=invoice_path, run_id=run_id)
+        parsed = time.perf_counter()
+        try:
+            service.run_review(run_id, contract_yaml=documents["contract_yaml"], invoice_yaml=documents["invoice_yaml"])
+        except Exception as exc:  # noqa: BLE001 - injected errors are part of the measurement
+            return {"parse": parsed - started, "error": str(exc)[:200]}
+        return {"parse": parsed - started, "review": time.perf_counter() - parsed, "total": time.perf_counter() - started}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(review, range(reviews)))
+    wall = time.perf_counter() - started
+
+    ok = [outcome for outcome in outcomes if "error" not in outcome]
+    requests = metrics.REGISTRY.counters().get("llm_requests", 0)
+    peak_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    queue.put(
+        {
+            "reviews": reviews,
+            "failed": len(outcomes) - len(ok),
+            "parse_mean": sum(outcome["parse"] for outcome in outcomes) / len(outcomes),
+            "review_p50": _percentile([outcome["review"] for outcome in ok], 50),
+            "review_p95": _percentile([outcome["review"] for outcome in ok], 95),
+            "total_p95": _percentile([outcome["total"] for outcome in ok], 95),
+            "per_minute": 60 * len(ok) / wall if wall else 0.0,
+            "llm_requests": int(requests),
+            "peak_rss_mb": peak_kb / 1024,
+            "rate_limiter": service.rate_limit_stats(),
+            "errors": sorted({outcome["error"] for outcome in outcomes if "error" in outcome})[:3],
+        }
+    )
+
+
+# ---------------------------- driver ----------------------------
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=_int_list, default=[1, 4, 16], help="document size multipliers")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 8], help="concurrent reviews per scenario")
+    parser.add_argument("--reviews", type=int, default=8, help="reviews per scenario")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_server(config_from_args(args))
+    context = multiprocessing.get_context("spawn")
+    results: List[Dict[str, Any]] = []
+    header = (
+        f"{'scale':>5} {'pages':>5} {'rows':>6} {'conc':>4} {'parse s':>8} {'p50 s':>7} {'p95 s':>7}"
+        f" {'rev/min':>8} {'LLM req':>7} {'fail':>4} {'RSS MB':>7}"
+    )
+    print(f"mock LLM on port {server.server_port}: latency {args.latency}s, {args.tokens_per_second} tok/s,"
+          f" throttle {args.throttle_rate:.0%}, errors {args.error_rate:.0%}")
+    print(header)
+    with tempfile.TemporaryDirectory(prefix="contract-bench-") as tmp:
+        root = Path(tmp)
+        for scale in args.scales:
+            pages, rows = BASE_PAGES * scale, BASE_ROWS * scale
+            contract, invoice = root / f"contract-{scale}.pdf", root / f"invoice-{scale}.xlsx"
+            build_contract(contract, pages=pages)
+            build_invoice(invoice, rows=rows)
+            for concurrency in args.concurrency:
+                scenario = root / f"s{scale}-c{concurrency}"
+                env = {
+                    "OPENAI_API_KEY": "benchmark",
+                    "OPENAI_API_BASE": f"http://127.0.0.1:{server.server_port}",
+                    "DATA_STORAGE_PATH": str(scenario / "data"),
+                    "ARTEFACT_STORAGE_PATH": str(scenario / "artefacts"),
+                    "JOB_DB_PATH": str(scenario / "jobs.sqlite3"),
+                    "LLM_CACHE_ENABLED": "false",
+                    "PARSE_CACHE_ENABLED": "false",
+                    "INCREMENTAL_REVIEW_ENABLED": "false",
+                    "METRICS_PORT": "0",
+                }
+                queue = context.Queue()
+                worker = context.Process(
+                    target=run_scenario, args=(env, str(contract), str(invoice), concurrency, args.reviews, queue)
+                )
+                worker.start()
+                while True:
+                    try:
+                        result = queue.get(timeout=1.0)
+                        break
+                    except Empty:
+                        if not worker.is_alive():
+                            raise SystemExit(f"scenario scale={scale} concurrency={concurrency} crashed")
+                worker.join()
+                result.update(scale=scale, pages=pages, rows=rows, concurrency=concurrency)
+                results.append(result)
+                print(
+                    f"{scale:>5} {pages:>5} {rows:>6} {concurrency:>4} {result['parse_mean']:>8.2f}"
+                    f" {result['review_p50']:>7.2f} {result['review_p95']:>7.2f} {result['per_minute']:>8.1f}"
+                    f" {result['llm_requests']:>7} {result['failed']:>4} {result['peak_rss_mb']:>7.0f}",
+                    flush=True,
+                )
+    stats = server.RequestHandlerClass.stats
+    print(f"mock server: {stats['requests']} requests, {stats['throttled']} throttled, {stats['errors']} errors")
+    server.shutdown()
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
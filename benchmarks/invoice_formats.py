@@ -0,0 +1,48 @@
+"""Compare prompt token counts of the invoice formats on a workbook.
+
+    python benchmarks/invoice_formats.py ["documents/contract1/Detailed Vessel Call.xlsx"]
+
+Counts use tiktoken when it is installed and the offline ~4 chars/token
+estimate otherwise.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.document_processing.compact import INVOICE_FORMATS, render_invoice  # noqa: E402
+from app.document_processing.excel_parser import parse_excel  # noqa: E402
+from app.llm.chunking import estimate_tokens  # noqa: E402
+from app.utils.yaml_io import dump_yaml  # noqa: E402
+
+
+def token_counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return "estimate", estimate_tokens
+    encoding = tiktoken.get_encoding("o200k_base")
+    return "tiktoken o200k_base", lambda text: len(encoding.encode(text))
+
+
+def main() -> None:
+    workbook = Path(sys.argv[1]) if len(sys.argv) > 1 else ROOT / "documents" / "contract1" / "Detailed Vessel Call.xlsx"
+    payload = parse_excel(workbook)
+    payload.setdefault("document_type", workbook.suffix.lstrip("."))
+    records_yaml = dump_yaml(payload)
+    method, count = token_counter()
+
+    baseline = count(records_yaml)
+    print(f"{workbook.name} ({method})")
+    print(f"{'format':<10} {'chars':>9} {'tokens':>8} {'vs records':>11}")
+    for invoice_format in INVOICE_FORMATS:
+        _label, text, _fence = render_invoice(payload, invoice_format, records_yaml=records_yaml)
+        tokens = count(text)
+        print(f"{invoice_format:<10} {len(text):>9} {tokens:>8} {tokens / baseline:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Local stand-in for the OpenAI ``/chat/completions`` endpoint.
+
+    python benchmarks/mock_llm.py --port 8765 --latency 0.5 --tokens-per-second 300 --throttle-rate 0.05
+
+Point ``OPENAI_API_BASE`` at ``http://127.0.0.1:<port>`` to run the service
+without a key. Replies are a fixed compliance-style markdown report padded to
+``--completion-tokens`` (or the request's ``max_completion_tokens`` when
+smaller), generated at ``--tokens-per-second`` after ``--latency`` seconds.
+Streaming requests get server-sent events and a final usage event. A share of
+requests can be answered with 429 + ``Retry-After`` or with a 500.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.llm.chunking import estimate_tokens  # noqa: E402
+
+REPORT_HEAD = (
+    "## Compliance Overview\n"
+    "Synthetic review produced by the benchmark stand-in server.\n\n"
+    "## Line Item Review\n"
+    "| Sheet | Line | Invoice Details | Contract Alignment | Status | Confidence |\n"
+    "|---|---|---|---|---|---|\n"
+)
+REPORT_ROW = "| Invoice | {line} | Stevedoring 20ft laden | Clause 4.{line} rate matches | Compliant | High |\n"
+# Roughly one token per word of filler, which is close enough for pacing.
+WORDS_PER_CHUNK = 4
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.3
+    tokens_per_second: float = 400.0
+    completion_tokens: int = 300
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int = 7
+
+
+def build_reply(tokens: int) -> str:
+    text = REPORT_HEAD
+    line = 1
+    while estimate_tokens(text) < tokens:
+        text += REPORT_ROW.format(line=line)
+        line += 1
+    return text
+
+
+def _pieces(text: str) -> List[str]:
+    words = text.split(" ")
+    return [" ".join(words[index:index + WORDS_PER_CHUNK]) + " " for index in range(0, len(words), WORDS_PER_CHUNK)]
+
+
+def make_handler(config: MockConfig) -> type:
+    rng = random.Random(config.seed)
+    lock = threading.Lock()
+    counters = {"requests": 0, "throttled": 0, "errors": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        stats = counters
+
+        def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            with lock:
+                counters["requests"] += 1
+                roll = rng.random()
+            if roll < config.throttle_rate:
+                with lock:
+                    counters["throttled"] += 1
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_exceeded"}},
+                    {"Retry-After": f"{config.retry_after:g}"},
+                )
+                return
+            if roll < config.throttle_rate + config.error_rate:
+                with lock:
+                    counters["errors"] += 1
+                self._send_json(500, {"error": {"message": "Injected server error (mock)", "type": "server_error"}})
+                return
+
+            prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in request.get("messages", []))
+            budget = min(config.completion_tokens, int(request.get("max_completion_tokens") or config.completion_tokens))
+            reply = build_reply(budget)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(reply),
+                "total_tokens": prompt_tokens + estimate_tokens(reply),
+            }
+            headers = {
+                "x-ratelimit-limit-requests": "10000",
+                "x-ratelimit-remaining-requests": "9999",
+                "x-ratelimit-limit-tokens": "10000000",
+                "x-ratelimit-remaining-tokens": "9999000",
+            }
+            time.sleep(config.latency)
+            delay = WORDS_PER_CHUNK / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+            if not request.get("stream"):
+                time.sleep(delay * len(_pieces(reply)))
+                self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": reply}}], "usage": usage}, headers)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            for piece in _pieces(reply):
+                event = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                time.sleep(delay)
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def start_server(config: MockConfig, *, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; ``server.server_port`` holds the bound port."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="generation speed; 0 for instant")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="reply length cap in tokens")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = start_server(config_from_args(args), port=args.port)
+    print(f"mock /chat/completions on http://127.0.0.1:{server.server_port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
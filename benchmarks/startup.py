@@ -0,0 +1,125 @@
+"""Cold-start cost: import time per module and service construction.
+
+    python benchmarks/startup.py --repeat 5 --top 15
+
+Every sample runs in a fresh interpreter with ``-X importtime``, importing
+each target module (``app.service``, ``app.cli``, ``app.batch``,
+``app.jobs`` by default) and then timing ``get_service()``. Storage and caches
+point at a temporary folder so nothing in the working tree is touched.
+Reported: median cumulative import time per target, median service
+construction time, and the third-party packages with the largest median
+self time (summed over their submodules) on the ``app.service`` import.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_TARGETS = ("app.service", "app.cli", "app.batch", "app.jobs")
+_SERVICE_MARKER = "service_seconds="
+
+_PROBE = """
+import sys, time
+for name in sys.argv[1:]:
+    __import__(name)
+from app.service import get_service
+started = time.perf_counter()
+get_service()
+print("{marker}%f" % (time.perf_counter() - started))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, float]]:
+    """``{module: {"self": ms, "cumulative": ms}}`` from ``-X importtime`` output."""
+    modules: Dict[str, Dict[str, float]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not parts[0].isdigit():
+            continue  # header row
+        modules[parts[2]] = {"self": int(parts[0]) / 1000, "cumulative": int(parts[1]) / 1000}
+    return modules
+
+
+def sample(target: str, env: Dict[str, str]) -> Dict[str, object]:
+    """One fresh interpreter importing ``target`` first, then the service."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(marker=_SERVICE_MARKER), target],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise SystemExit(f"importing {target} failed:\n" + "\n".join(errors[-10:]))
+    service_seconds = next(
+        float(line[len(_SERVICE_MARKER):]) for line in completed.stdout.splitlines() if line.startswith(_SERVICE_MARKER)
+    )
+    return {"modules": parse_importtime(completed.stderr), "service_ms": service_seconds * 1000}
+
+
+def _packages(modules: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for name, times in modules.items():
+        package = name.split(".", 1)[0]
+        totals[package] = totals.get(package, 0.0) + times["self"]
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default=",".join(DEFAULT_TARGETS), help="comma-separated modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=15, help="packages listed by self time")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    targets = [target.strip() for target in args.targets.split(",") if target.strip()]
+    results: Dict[str, Dict[str, object]] = {}
+    packages: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory(prefix="contract-startup-") as tmp:
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "benchmark",
+            DATA_STORAGE_PATH=str(Path(tmp) / "data"),
+            ARTEFACT_STORAGE_PATH=str(Path(tmp) / "artefacts"),
+            PARSE_CACHE_PATH=str(Path(tmp) / "cache" / "parse"),
+            LLM_CACHE_PATH=str(Path(tmp) / "cache" / "llm.sqlite3"),
+            METRICS_PORT="0",
+        )
+        # Warm the bytecode cache so the first sample is not an outlier.
+        sample(targets[0], env)
+        print(f"{'target':<24} {'import ms':>10} {'service ms':>11}")
+        for target in targets:
+            runs = [sample(target, env) for _ in range(args.repeat)]
+            import_ms = statistics.median(run["modules"].get(target, {}).get("cumulative", 0.0) for run in runs)
+            service_ms = statistics.median(run["service_ms"] for run in runs)
+            results[target] = {"import_ms": round(import_ms, 1), "service_ms": round(service_ms, 1)}
+            print(f"{target:<24} {import_ms:>10.1f} {service_ms:>11.1f}", flush=True)
+            if target == "app.service":
+                for run in runs:
+                    for package, self_ms in _packages(run["modules"]).items():
+                        packages.setdefault(package, []).append(self_ms)
+
+    if packages:
+        ranked = sorted(((statistics.median(times), package) for package, times in packages.items()), reverse=True)
+        print("\nslowest packages imported by app.service (median self ms)")
+        for self_ms, package in ranked[: args.top]:
+            print(f"  {package:<28} {self_ms:>8.1f}")
+        results["packages"] = {package: round(self_ms, 1) for self_ms, package in ranked[: args.top]}
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
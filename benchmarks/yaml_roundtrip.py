@@ -0,0 +1,63 @@
+"""Compare the legacy three-pass YAML handling in process_documents with the
+single LibYAML serialisation it was replaced by.
+
+    python benchmarks/yaml_roundtrip.py --rows 20000 --sheets 3
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.document_processing.excel_parser import parse_excel  # noqa: E402
+from app.utils.yaml_io import LIBYAML, dump_yaml  # noqa: E402
+
+
+def build_workbook(path: Path, *, rows: int, sheets: int) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for sheet_index in range(sheets):
+        sheet = workbook.create_sheet(f"Sheet{sheet_index + 1}")
+        sheet.append(["Terminal", "Movement Type", "Nbr", "Weight", "Size", "Type", "Operator", "Rate", "Amount", "Currency"])
+        for row in range(rows):
+            sheet.append(["MICT", "Discharged", row, row * 1.5, 20, "DV", "MSCU", 12.5, row * 12.5, "USD"])
+    workbook.save(path)
+
+
+def legacy(payload: dict, target: Path) -> None:
+    text = yaml.safe_dump(payload, sort_keys=False, allow_unicode=False)
+    yaml.safe_load(text)  # _assert_yaml_not_empty
+    with target.open("w", encoding="utf-8") as handle:  # StorageManager.save_yaml
+        yaml.safe_dump(payload, handle, sort_keys=False, allow_unicode=False)
+
+
+def single_pass(payload: dict, target: Path) -> None:
+    target.write_text(dump_yaml(payload), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000, help="data rows per sheet")
+    parser.add_argument("--sheets", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = Path(tmp) / "invoice.xlsx"
+        build_workbook(workbook, rows=args.rows, sheets=args.sheets)
+        payload = parse_excel(workbook)
+        print(f"workbook: {args.sheets} sheets x {args.rows} rows, LibYAML available: {LIBYAML}")
+        for label, run in (("legacy dump+load+dump", legacy), ("single dump", single_pass)):
+            started = time.perf_counter()
+            run(payload, Path(tmp) / f"{label.split()[0]}.yaml")
+            print(f"{label:<24} {time.perf_counter() - started:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
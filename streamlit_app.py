@@ -6,12 +6,26 @@ import time
 
 import streamlit as st
 
+from app.jobs import get_job_runner
 from app.service import get_service
+from app.utils.config import settings as service_settings
+from app.utils.metrics import start_exporter
+from app.utils.storage import UploadTooLargeError, format_size
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("streamlit_app")
-service = get_service()
-
+# The service and job runner are process-wide singletons built on first use,
+# so script reruns neither rebuild them nor pay for them before they are needed.
+if service_settings.metrics_port:
+    start_exporter(service_settings.metrics_port)
+
+STEP_LABELS = {
+    "parse": "Document parsing",
+    "review": "LLM review",
+    "compliance": "GPT-5 compliance analysis",
+    "contract_review": "Contract obligations review",
+    "translation": "Contract translation",
+}
 
 def format_duration(seconds: float) -> str:
     minutes, sec = divmod(int(seconds), 60)
@@ -39,9 +53,28 @@ def reset_session() -> None:
     keys = list(st.session_state.keys())
     for key in keys:
         del st.session_state[key]
+    st.query_params.clear()
     st.session_state["run_state"] = "ready"
 
 
+def finish_job(job_id: str, job: Dict[str, Any]) -> None:
+    """Load a finished run from ``data/<run_id>/`` into the session."""
+    bundle = get_service().load_run(job_id)
+    if bundle is None:
+        st.session_state["error_message"] = f"Run {job_id} has no stored results."
+        st.session_state["run_state"] = "error"
+        return
+    result = job.get("result") or {}
+    bundle["processing_seconds"] = max(0.0, job.get("updated_at", 0.0) - job.get("created_at", 0.0))
+    bundle["latency_seconds"] = result.get("latency_seconds") or {}
+    params = bundle.get("params") or job.get("params") or {}
+    # Only the reviewer's own instructions, never a stricter re-run's additions.
+    st.session_state["prompt_override"] = params.get("base_extra_instructions", params.get("extra_instructions", ""))
+    st.session_state["invoice_format"] = params.get("invoice_format")
+    st.session_state["result_bundle"] = bundle
+    st.session_state["run_state"] = "done"
+
+
 def main() -> None:
     st.set_page_config(page_title="SAP Contract Invoice Reviewer", layout="centered")
     svg_url = "https://www.sap.com/dam/application/shared/logos/sap-logo-svg.svg"
@@ -76,7 +109,13 @@ def main() -> None:
     )
 
     if "run_state" not in st.session_state:
-        st.session_state["run_state"] = "ready"
+        # A reconnecting browser keeps ?run=<run_id> and picks its job back up.
+        reconnect_id = st.query_params.get("run")
+        if reconnect_id:
+            st.session_state["job_id"] = reconnect_id
+            st.session_state["run_state"] = "processing"
+        else:
+            st.session_state["run_state"] = "ready"
 
     state = st.session_state["run_state"]
 
@@ -94,88 +133,105 @@ def main() -> None:
                 placeholder="e.g. Pay special attention to demurrage charges for terminal MICT.",
                 help="Temporarily extend the GPT-5 reviewer prompt for this run only.",
             )
+            format_labels = {
+                "records": "YAML records (one mapping per row)",
+                "columnar": "Columnar YAML (columns once, rows as lists)",
+                "csv": "CSV tables",
+                "markdown": "Markdown tables",
+            }
+            format_options = list(format_labels)
+            default_format = st.session_state.get("invoice_format", service_settings.invoice_prompt_format)
+            invoice_format = st.selectbox(
+                "Invoice prompt format",
+                options=format_options,
+                index=format_options.index(default_format) if default_format in format_options else 0,
+                format_func=format_labels.get,
+                help="Compact formats send each column name once and drop empty columns, cutting prompt tokens on wide invoice sheets.",
+            )
             submitted = st.form_submit_button("Start review")
 
         if submitted:
+            limit = service_settings.max_upload_bytes
+            oversized = [
+                upload.name for upload in (contract_file, invoice_file)
+                if upload is not None and limit and upload.size > limit
+            ]
             if contract_file is None or invoice_file is None:
                 st.warning("Please upload both the contract and the invoice before starting the review.")
+            elif oversized:
+                st.warning(f"{', '.join(oversized)} exceeds the {format_size(limit)} upload limit.")
             else:
-                st.session_state["contract_bytes"] = contract_file.getvalue()
-                st.session_state["contract_name"] = contract_file.name or "contract.pdf"
-                st.session_state["invoice_bytes"] = invoice_file.getvalue()
-                st.session_state["invoice_name"] = invoice_file.name or "invoice.pdf"
+                # Hand the upload buffers over as file objects: storage streams
+                # them in chunks into the artefact store instead of copying the
+                # whole content with getvalue(). Only the run id is kept.
+                contract_file.seek(0)
+                invoice_file.seek(0)
+                try:
+                    job_id = get_service().submit_review(
+                        contract_name=contract_file.name or "contract.pdf",
+                        contract_content=contract_file,
+                        invoice_name=invoice_file.name or "invoice.pdf",
+                        invoice_content=invoice_file,
+                        extra_instructions=prompt_override.strip(),
+                        invoice_format=invoice_format,
+                    )
+                except UploadTooLargeError as exc:
+                    st.warning(str(exc))
+                    return
+                st.session_state["job_id"] = job_id
                 st.session_state["prompt_override"] = prompt_override.strip()
-                st.session_state["processing_started"] = time.time()
+                st.session_state["invoice_format"] = invoice_format
+                st.query_params["run"] = job_id
                 st.session_state["run_state"] = "processing"
                 st.rerun()
         return
 
     if state == "processing":
-        with st.status("Review in progress", expanded=True) as status:
-            try:
-                status.write("Saving uploaded documents…")
-                run_id = service.storage.create_run_id()
-                contract_path = service.storage.save_raw_file(
-                    run_id,
-                    st.session_state.get("contract_name", f"contract_{run_id}.pdf"),
-                    st.session_state.get("contract_bytes", b""),
-                )
-                invoice_path = service.storage.save_raw_file(
-                    run_id,
-                    st.session_state.get("invoice_name", f"invoice_{run_id}.xlsx"),
-                    st.session_state.get("invoice_bytes", b""),
-                )
-
-                status.write("Extracting contract clauses and invoice line items…")
-                result = service.process_documents(
-                    contract_path=contract_path,
-                    invoice_path=invoice_path,
-                    run_id=run_id,
-                )
-
-                status.write("Running GPT-5 compliance analysis…")
-                compliance = service.generate_compliance_report(
-                    run_id,
-                    contract_yaml=result["contract_yaml"],
-                    invoice_yaml=result["invoice_yaml"],
-                    extra_instructions=st.session_state.get("prompt_override"),
-                )
-
-                status.write("Reviewing contract obligations…")
-                contract_review = service.generate_contract_review(
-                    run_id,
-                    contract_yaml=result["contract_yaml"],
-                    extra_instructions=st.session_state.get("prompt_override"),
-                )
-
-                processing_seconds = time.time() - st.session_state.get("processing_started", time.time())
-                st.session_state["result_bundle"] = {
-                    "run_id": run_id,
-                    "result": result,
-                    "compliance": compliance,
-                    "contract_review": contract_review,
-                    "processing_seconds": processing_seconds,
-                }
-                st.session_state["run_state"] = "done"
-                status.update(label="Review complete", state="complete")
-            except Exception as exc:  # noqa: BLE001
-                logger.exception("Review failed")
-                st.session_state["error_message"] = str(exc)
-                st.session_state["run_state"] = "error"
-                status.update(label="Review failed", state="error")
-            finally:
-                st.session_state.pop("contract_bytes", None)
-                st.session_state.pop("contract_name", None)
-                st.session_state.pop("invoice_bytes", None)
-                st.session_state.pop("invoice_name", None)
+        job_id = st.session_state.get("job_id", "")
+        job = get_job_runner().get(job_id)
+        if job is None or job["status"] == "done":
+            # Unknown to this runner (e.g. queued by another instance): fall back to stored outputs.
+            finish_job(job_id, job or {})
+            st.rerun()
+            return
+        if job["status"] == "error":
+            st.session_state["error_message"] = job.get("error") or "Unknown error"
+            st.session_state["run_state"] = "error"
+            st.rerun()
+            return
+
+        with st.status(f"Review in progress (run {job_id})", expanded=True):
+            if job["status"] == "queued":
+                st.write("Waiting for a free review worker…")
+            for finished in job["stages"]:
+                st.write(f"{STEP_LABELS.get(finished['stage'], finished['stage'])} finished in {finished['seconds']:.1f}s.")
+            if job["stage"] and job["stage"] not in {finished["stage"] for finished in job["stages"]}:
+                st.write(f"{STEP_LABELS.get(job['stage'], job['stage'])}…")
+            elapsed = time.time() - job["created_at"]
+            st.caption(f"Elapsed {format_duration(elapsed)}. You can close this page and come back with the same link.")
+            for step, text in job["live"].items():
+                st.caption(STEP_LABELS.get(step, step))
+                st.markdown(text or "_Waiting for first tokens…_")
+        time.sleep(1.0)
         st.rerun()
         return
 
     if state == "error":
         st.error(f"The review failed: {st.session_state.get('error_message', 'Unknown error')}")
-        if st.button("Try again"):
+        job_id = st.session_state.get("job_id", "")
+        retry, resume = st.columns(2)
+        if retry.button("Try again"):
             reset_session()
             st.rerun()
+        # Finished stages are restored from their checkpoints; only the rest runs again.
+        if job_id and resume.button("Resume run"):
+            try:
+                get_service().submit_resume(job_id)
+            except ValueError as exc:
+                st.warning(str(exc))
+                return
+            st.session_state["run_state"] = "processing"
+            st.rerun()
         return
 
     if state == "done":
@@ -189,17 +245,28 @@ def main() -> None:
         st.success(f"Review complete for run {run_id} in {format_duration(processing_seconds)}.")
 
         compliance_text = compliance.get("content", "")
-        if not _looks_meaningful(compliance_text):
-            st.warning("Compliance analysis looked empty. Re-running with stricter instructions…")
-            compliance = service.generate_compliance_report(
-                run_id,
-                contract_yaml=result.get("contract_yaml", ""),
-                invoice_yaml=result.get("invoice_yaml", ""),
-                extra_instructions=(st.session_state.get("prompt_override") or "") + "\nEnsure the response contains a detailed table, bullet points, and explicit conclusions.",
-            )
-            compliance_text = compliance.get("content", "")
-            bundle["compliance"] = compliance
-            st.session_state["result_bundle"] = bundle
+        review_text = contract_review.get("content", "")
+        weak = [
+            label
+            for label, text in (("Compliance analysis", compliance_text), ("Contract review", review_text))
+            if not _looks_meaningful(text)
+        ]
+        if weak and (bundle.get("params") or {}).get("stricter_rerun"):
+            st.warning(f"{' and '.join(weak)} still looked empty after a re-run with stricter instructions.")
+        elif weak:
+            st.warning(f"{' and '.join(weak)} looked empty.")
+            # A background job: parsing is restored from its checkpoints and the
+            # LLM steps run again with stricter instructions, once per run.
+            if st.button("Re-run with stricter instructions"):
+                try:
+                    get_service().submit_stricter_rerun(run_id)
+                except ValueError as exc:
+                    st.warning(f"The run could not be re-run: {exc}")
+                else:
+                    st.session_state["job_id"] = run_id
+                    st.session_state["run_state"] = "processing"
+                    st.rerun()
+                    return
 
         st.subheader("Compliance overview")
         st.markdown(compliance_text or "No output.")
@@ -218,28 +285,48 @@ def main() -> None:
             if result.get("invoice_yaml_path"):
                 st.caption(f"Stored at {result['invoice_yaml_path']}")
 
-        review_text = contract_review.get("content", "")
-        if not _looks_meaningful(review_text):
-            contract_review = service.generate_contract_review(
-                run_id,
-                contract_yaml=result.get("contract_yaml", ""),
-                extra_instructions="Your previous summary was too light. Provide at least five concrete insights covering obligations, pricing, service levels, risks, and controls.",
-            )
-            review_text = contract_review.get("content", "")
-            bundle["contract_review"] = contract_review
-            st.session_state["result_bundle"] = bundle
-
         if _looks_meaningful(review_text):
             with st.expander("Contract risk review"):
                 st.markdown(review_text)
                 if contract_review.get("path"):
                     st.caption(f"Stored at {contract_review['path']}")
 
+        translation = bundle.get("translation") or {}
+        if translation.get("content"):
+            with st.expander("Contract translation"):
+                st.markdown(translation["content"])
+                st.caption(f"Stored at {translation['path']}")
+
+        report = bundle.get("report") or {}
+        if report.get("content"):
+            st.download_button(
+                "Download full review report",
+                data=report["content"],
+                file_name=f"review_report_{run_id}.md",
+                mime="text/markdown",
+            )
+
         time_saved = max(0.0, 7200 - processing_seconds)
         st.info(
             f"GPT-5 processing time: {format_duration(processing_seconds)}. "
             f"Estimated manual effort saved: {format_duration(time_saved)}."
         )
+        latency = bundle.get("latency_seconds") or {}
+        if latency:
+            st.caption(
+                "LLM call latency: "
+                + ", ".join(f"{step.replace('_', ' ')} {seconds:.1f}s" for step, seconds in latency.items())
+            )
+        run_metrics = bundle.get("metrics") or {}
+        if run_metrics.get("totals"):
+            with st.expander("Run metrics"):
+                st.dataframe(
+                    [
+                        {"stage": name, "calls": entry["count"], "seconds": entry["seconds"]}
+                        for name, entry in sorted(run_metrics["totals"].items())
+                    ]
+                )
+                st.json(run_metrics.get("counters") or {})
 
         if st.button("Review another contract"):
             reset_session()
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+# Settings are read when app.utils.config is first imported, so the test
+# storage and a placeholder key have to be in place before any app import.
+_ROOT = Path(tempfile.mkdtemp(prefix="contract-agent-tests-"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_BASE", "http://127.0.0.1:9")
+os.environ["DATA_STORAGE_PATH"] = str(_ROOT / "data")
+os.environ["ARTEFACT_STORAGE_PATH"] = str(_ROOT / "artefacts")
+os.environ["PARSE_CACHE_PATH"] = str(_ROOT / "cache" / "parse")
+os.environ["LLM_CACHE_PATH"] = str(_ROOT / "cache" / "llm.sqlite3")
+os.environ["JOB_DB_PATH"] = str(_ROOT / "jobs.sqlite3")
+os.environ["RUN_CATALOG_PATH"] = str(_ROOT / "data" / "runs.sqlite3")
+os.environ["METRICS_PORT"] = "0"
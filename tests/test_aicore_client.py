@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import pytest
+
+from app.llm.aicore_client import SAPAICoreClient, SAPAICoreClientError
+from app.llm.rate_limit import RateLimiter
+from app.llm.token_cache import TokenCache
+
+
+class _AICore(BaseHTTPRequestHandler):
+    """Token endpoint plus a chat endpoint that is always throttled."""
+
+    calls: Dict[str, int]
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.calls[self.path] = self.calls.get(self.path, 0) + 1
+        if self.path == "/oauth/token":
+            time.sleep(0.3)  # long enough for concurrent callers to overlap
+            status, headers, body = 200, {}, {"access_token": f"token-{self.calls[self.path]}", "expires_in": 3600}
+        else:
+            status, headers, body = 429, {"Retry-After": "0"}, {"error": "rate limited"}
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in {**headers, "Content-Type": "application/json", "Content-Length": str(len(payload))}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[ThreadingHTTPServer]:
+    handler = type("Handler", (_AICore,), {"calls": {}})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _client(server: ThreadingHTTPServer, **kwargs: object) -> SAPAICoreClient:
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return SAPAICoreClient(
+        client_id="client",
+        client_secret="secret",
+        auth_url=base,
+        api_base=base,
+        deployment_id="",
+        model_name="gpt-test",
+        resource_group="default",
+        scope=None,
+        request_timeout=5.0,
+        **kwargs,
+    )
+
+
+def test_throttling_is_retried_by_the_limiter_only(server: ThreadingHTTPServer) -> None:
+    client = _client(server, rate_limiter=RateLimiter(max_retries=1))
+    try:
+        with pytest.raises(SAPAICoreClientError) as raised:
+            client.chat_completion([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert raised.value.status_code == 429
+    # One send plus the limiter's single retry; tenacity adds none on top.
+    assert server.RequestHandlerClass.calls["/v1/chat/completions"] == 2
+
+
+def test_clients_sharing_a_token_cache_fetch_one_token(server: ThreadingHTTPServer, tmp_path: Path) -> None:
+    cache = TokenCache(tmp_path / "tokens.sqlite3")
+    clients = [_client(server, token_cache=cache) for _ in range(2)]
+    start = threading.Barrier(4)
+    tokens: List[str] = []
+
+    def get_token(client: SAPAICoreClient) -> None:
+        start.wait()
+        tokens.append(client._get_token())
+
+    threads = [threading.Thread(target=get_token, args=(client,)) for client in clients for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    for client in clients:
+        client.close()
+    assert tokens == ["token-1"] * 4
+    assert server.RequestHandlerClass.calls["/oauth/token"] == 1
+
+
+def test_client_adopts_a_newer_token_from_another_process(server: ThreadingHTTPServer, tmp_path: Path) -> None:
+    cache = TokenCache(tmp_path / "tokens.sqlite3")
+    client = _client(server, token_cache=cache)
+    try:
+        assert client._get_token() == "token-1"
+        # Another process refreshed first and stored a token that lives longer.
+        cache.put(client._token_key, "other-process", time.time() + 7200)
+        client._refresh_in_background()
+        assert client._token == "other-process"
+
+        late = _client(server, token_cache=cache)
+        try:
+            assert late._get_token() == "other-process"
+        finally:
+            late.close()
+    finally:
+        client.close()
+    assert server.RequestHandlerClass.calls["/oauth/token"] == 1
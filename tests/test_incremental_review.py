@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.document_processing.incremental import row_fingerprints
+from app.service import ContractAgentService
+from app.utils.config import settings
+from app.utils.yaml_io import dump_yaml, load_yaml
+
+INVOICE = {
+    "sheets": {
+        "Invoice": {
+            "columns": ["Description", "Amount"],
+            "rows": [
+                {"Description": "Discharge 20ft laden", "Amount": "100"},
+                {"Description": "", "Amount": ""},
+                {"Description": "Loading 40ft laden", "Amount": "250"},
+                {"Description": "Reefer monitoring", "Amount": "75"},
+            ],
+        }
+    }
+}
+
+REPORT = """## Line Item Review
+| Sheet | Line | Invoice Details | Contract Alignment | Status | Confidence |
+|---|---|---|---|---|---|
+| Invoice | 1 | Discharge 20ft laden | Clause 1.1 | Compliant | High |
+| Invoice | 3 | Loading 40ft laden | Clause 1.2 | Non-compliant | High |
+| Invoice | 4 | Reefer monitoring | Not in contract | Needs review | Low |
+"""
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch) -> ContractAgentService:
+    # No contract rate table: nothing is pre-matched and nothing carried over.
+    monkeypatch.setattr(settings, "invoice_prematch_enabled", False)
+    monkeypatch.setattr(settings, "incremental_review_enabled", False)
+    return ContractAgentService()
+
+
+def test_prompt_keeps_original_line_numbers_when_rows_are_dropped(service: ContractAgentService) -> None:
+    run_id = service.storage.create_run_id()
+    plan = service._plan_review(
+        run_id, contract_yaml="elements: []\n", invoice_yaml=dump_yaml(INVOICE), extra_instructions=None, bypass_cache=False
+    )
+
+    rows = load_yaml(plan["invoice_yaml"])["sheets"]["Invoice"]["rows"]
+    assert [row["line"] for row in rows] == [1, 3, 4]
+    assert plan["line_numbers"]
+
+    service._save_line_verdicts(run_id, REPORT, plan)
+    stored = json.loads(service.storage.read_text(run_id, "line_verdicts", suffix=".json"))["verdicts"]
+    fingerprints = row_fingerprints(INVOICE)
+    assert stored[fingerprints[("Invoice", 3)]]["Invoice Details"] == "Loading 40ft laden"
+    assert stored[fingerprints[("Invoice", 4)]]["Invoice Details"] == "Reefer monitoring"
+
+
+def test_verdicts_are_not_stored_for_invoices_without_line_numbers(service: ContractAgentService) -> None:
+    # A PDF invoice reaches the prompt as page text: no sheets, so no row line numbers.
+    invoice_yaml = dump_yaml(
+        {"source_file": "invoice.pdf", "page_count": 1, "elements": [{"page_number": 1, "text": "Discharge 20ft laden 100"}]}
+    )
+    run_id = service.storage.create_run_id()
+    plan = service._plan_review(
+        run_id, contract_yaml="elements: []\n", invoice_yaml=invoice_yaml, extra_instructions=None, bypass_cache=False
+    )
+    assert plan["invoice_yaml"] == invoice_yaml
+    assert not plan["line_numbers"]
+
+    service._save_line_verdicts(run_id, REPORT, plan)
+    assert service.storage.read_text(run_id, "line_verdicts", suffix=".json") is None
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import io
+import time
+from email.utils import formatdate
+from typing import List, Optional
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from app.llm.rate_limit import RateLimiter, _Bucket, parse_duration, retry_after_seconds
+
+
+def _response(status: int, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.raw = io.BytesIO(b"")
+    return response
+
+
+@pytest.mark.parametrize(
+    ("value", "seconds"),
+    [("1s", 1.0), ("20ms", 0.02), ("6m0s", 360.0), ("1h30m", 5400.0), ("0.5", 0.5), ("", None), ("soon", None)],
+)
+def test_parse_duration(value: str, seconds: Optional[float]) -> None:
+    if seconds is None:
+        assert parse_duration(value) is None
+    else:
+        assert parse_duration(value) == pytest.approx(seconds)
+
+
+def test_retry_after_seconds() -> None:
+    assert retry_after_seconds({"retry-after-ms": "250", "retry-after": "9"}) == pytest.approx(0.25)
+    assert retry_after_seconds({"retry-after": "3"}) == 3.0
+    assert retry_after_seconds({"retry-after": "2m"}) == 120.0
+    assert retry_after_seconds({"retry-after": formatdate(time.time() + 30, usegmt=True)}) == pytest.approx(30, abs=2)
+    assert retry_after_seconds({"retry-after": formatdate(time.time() - 30, usegmt=True)}) == 0.0
+    assert retry_after_seconds({}) is None
+
+
+def test_bucket_takes_the_reported_limit_below_the_configured_ceiling() -> None:
+    bucket = _Bucket(100)
+    bucket.observe("60", "10")
+    assert (bucket.capacity, bucket.level) == (60.0, 10.0)
+    bucket.observe("500", None)
+    assert bucket.capacity == 100.0
+
+
+def test_bucket_learns_an_unconfigured_limit() -> None:
+    bucket = _Bucket(0)
+    assert bucket.wait_for(5) == 0.0
+    bucket.observe("120", "30")
+    assert (bucket.capacity, bucket.level) == (120.0, 30.0)
+    bucket.observe("not a number", "0")
+    assert bucket.capacity == 120.0
+
+
+def test_release_halves_on_throttle_and_grows_additively() -> None:
+    limiter = RateLimiter(max_concurrency=8)
+    for expected in (4, 2, 1, 1):
+        limiter._acquire(0)
+        limiter._release(throttled=True)
+        assert limiter.stats()["concurrency_limit"] == expected
+    for _ in range(3):
+        limiter._acquire(0)
+        limiter._release()
+    # 1 -> 2 -> 2.5 -> 2.9
+    assert limiter._limit == pytest.approx(2.9)
+    assert limiter.stats()["throttled"] == 4
+
+
+def test_request_retries_a_throttled_response_and_yields_the_next() -> None:
+    limiter = RateLimiter(max_retries=2)
+    responses: List[requests.Response] = [_response(429, **{"Retry-After": "0"}), _response(200)]
+    sent: List[requests.Response] = []
+
+    def send() -> requests.Response:
+        sent.append(responses.pop(0))
+        return sent[-1]
+
+    with limiter.request(send, tokens=10) as response:
+        assert response.status_code == 200
+    stats = limiter.stats()
+    assert len(sent) == 2
+    assert (stats["retries"], stats["throttled"], stats["in_flight"]) == (1, 1, 0)
+
+
+def test_request_yields_the_last_throttled_response_once_retries_run_out() -> None:
+    limiter = RateLimiter(max_retries=1)
+    sent: List[int] = []
+
+    def send() -> requests.Response:
+        sent.append(1)
+        return _response(503, **{"Retry-After": "0"})
+
+    with limiter.request(send, tokens=10) as response:
+        assert response.status_code == 503
+    assert len(sent) == 2
+    assert limiter.stats()["in_flight"] == 0
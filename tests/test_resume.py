@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Set
+
+import pytest
+
+from app.jobs import JobRunner
+from app.service import STRICTER_INSTRUCTIONS, ContractAgentService
+from app.utils.config import settings
+
+REVIEWER_INSTRUCTIONS = "Check the fuel surcharge against clause 4."
+
+
+@pytest.fixture
+def calls() -> List[str]:
+    return []
+
+
+@pytest.fixture
+def failing() -> Set[str]:
+    return set()
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch, calls: List[str], failing: Set[str]) -> ContractAgentService:
+    monkeypatch.setattr(settings, "review_translation_language", "German")
+    service = ContractAgentService()
+
+    def ingest_document(run_id: str, path: Path, *, label: str):
+        calls.append(f"parse_{label}")
+        text = f"source_file: {path.name}\n"
+        return text, service.storage.save_text(run_id, f"{label}_raw", text, suffix=".yaml")
+
+    def generator(name: str):
+        def generate(run_id: str, **_kwargs):
+            calls.append(name)
+            if name in failing:
+                raise RuntimeError(f"{name} failed")
+            path = service.storage.save_markdown(run_id, name, f"# {name}\n")
+            return {"content": f"# {name}\n", "path": str(path)}
+
+        return generate
+
+    monkeypatch.setattr(service, "ingest_document", ingest_document)
+    monkeypatch.setattr(service, "generate_compliance_report", generator("compliance"))
+    monkeypatch.setattr(service, "generate_contract_review", generator("contract_review"))
+    monkeypatch.setattr(service, "generate_translation", generator("translation"))
+    return service
+
+
+def _upload(service: ContractAgentService) -> str:
+    run_id = service.storage.create_run_id()
+    service.storage.save_raw_file(run_id, "contract.pdf", b"contract", role="contract")
+    service.storage.save_raw_file(run_id, "invoice.xlsx", b"invoice", role="invoice")
+    return run_id
+
+
+def _review(service: ContractAgentService, run_id: str) -> None:
+    uploads = service.storage.artefact_root / run_id
+    service.review_documents(run_id, contract_path=uploads / "contract.pdf", invoice_path=uploads / "invoice.xlsx")
+
+
+def test_resume_restores_valid_stages_and_reruns_the_failed_one(
+    service: ContractAgentService, calls: List[str], failing: Set[str]
+) -> None:
+    run_id = _upload(service)
+    failing.add("contract_review")
+    with pytest.raises(RuntimeError, match="contract_review failed"):
+        _review(service, run_id)
+    stages = service.storage.load_checkpoints(run_id)["stages"]
+    assert stages["contract_review"]["status"] == "failed"
+
+    failing.clear()
+    calls.clear()
+    results = service.resume(run_id)
+
+    assert calls == ["contract_review"]
+    restored = ("parse_contract", "parse_invoice", "compliance", "translation")
+    assert [name for name in restored if results["latency_seconds"][name]] == []
+    assert results["contract_review"]["content"] == "# contract_review\n"
+    assert service.load_run(run_id)["report"]["content"]
+
+
+def test_resume_reruns_llm_stages_after_a_prompt_setting_changes(
+    service: ContractAgentService, calls: List[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    run_id = _upload(service)
+    _review(service, run_id)
+    calls.clear()
+    service.resume(run_id)
+    assert calls == []
+
+    monkeypatch.setattr(settings, "llm_prompt_token_budget", settings.llm_prompt_token_budget // 2)
+    service.resume(run_id)
+    assert sorted(calls) == ["compliance", "contract_review", "translation"]
+
+
+def test_stricter_rerun_keeps_the_reviewer_instructions_and_runs_once(
+    service: ContractAgentService, tmp_path: Path
+) -> None:
+    run_id = service.storage.create_run_id()
+    service.storage.save_run_params(
+        run_id,
+        {
+            "contract_name": "contract.pdf",
+            "invoice_name": "invoice.xlsx",
+            "extra_instructions": REVIEWER_INSTRUCTIONS,
+            "base_extra_instructions": REVIEWER_INSTRUCTIONS,
+            "invoice_format": "",
+        },
+    )
+    jobs = JobRunner(tmp_path / "jobs.sqlite3", workers=1)
+    try:
+        service.submit_stricter_rerun(run_id, jobs=jobs)
+        with pytest.raises(ValueError, match="already re-run"):
+            service.submit_stricter_rerun(run_id, jobs=jobs)
+    finally:
+        jobs.shutdown(wait=True)
+
+    params = service.storage.load_checkpoints(run_id)["params"]
+    assert params["extra_instructions"] == (REVIEWER_INSTRUCTIONS + STRICTER_INSTRUCTIONS).strip()
+    assert params["base_extra_instructions"] == REVIEWER_INSTRUCTIONS
+    assert params["stricter_rerun"]
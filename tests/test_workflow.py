@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from app.llm.workflow import NodeTimeoutError
+from app.service import ContractAgentService
+from app.utils.config import settings
+
+PARSE_SECONDS = {"contract": 0.1, "invoice": 1.0}
+SUFFIXES = {"contract": ".pdf", "invoice": ".xlsx"}
+
+
+@pytest.fixture
+def started() -> Dict[str, float]:
+    return {}
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch, started: Dict[str, float]) -> ContractAgentService:
+    monkeypatch.setattr(settings, "review_translation_language", "German")
+    service = ContractAgentService()
+
+    def ingest_document(run_id: str, path: Path, *, label: str):
+        time.sleep(PARSE_SECONDS[label])
+        started[f"parsed_{label}"] = time.perf_counter()
+        text = f"source_file: {path.name}\n"
+        return text, service.storage.save_text(run_id, f"{label}_raw", text, suffix=".yaml")
+
+    def generator(name: str):
+        def generate(run_id: str, **_kwargs):
+            started[name] = time.perf_counter()
+            path = service.storage.save_markdown(run_id, name, f"# {name}\n")
+            return {"content": f"# {name}\n", "path": str(path)}
+
+        return generate
+
+    monkeypatch.setattr(service, "ingest_document", ingest_document)
+    monkeypatch.setattr(service, "generate_compliance_report", generator("compliance"))
+    monkeypatch.setattr(service, "generate_contract_review", generator("contract_review"))
+    monkeypatch.setattr(service, "generate_translation", generator("translation"))
+    return service
+
+
+def test_contract_branches_do_not_wait_for_the_invoice_parse(
+    service: ContractAgentService, started: Dict[str, float], tmp_path: Path
+) -> None:
+    run_id = service.storage.create_run_id()
+    paths = {}
+    for label in PARSE_SECONDS:
+        paths[label] = tmp_path / f"{label}{SUFFIXES[label]}"
+        paths[label].write_text(label, encoding="utf-8")
+
+    results = service._run_graph(
+        {"run_id": run_id, "contract_path": str(paths["contract"]), "invoice_path": str(paths["invoice"])},
+        parse=True,
+        extra_instructions=None,
+        bypass_cache=False,
+        invoice_format=None,
+        on_step_complete=None,
+        on_stream=None,
+    )
+
+    for name in ("contract_review", "translation"):
+        assert started["parsed_contract"] <= started[name] < started["parsed_invoice"]
+    assert started["compliance"] >= started["parsed_invoice"]
+    assert {"compliance", "contract_review", "translation", "report"} <= set(results)
+    assert results["documents"]["invoice_yaml"] == "source_file: invoice.xlsx\n"
+
+
+def test_timed_out_step_stops_without_writing(
+    service: ContractAgentService, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(settings, "workflow_node_timeouts", {"contract_review": 0.2})
+    finished = threading.Event()
+
+    def slow_review(run_id: str, **_kwargs):
+        try:
+            time.sleep(0.5)
+            service.storage.save_markdown(run_id, "contract_review", "# late\n")
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(service, "generate_contract_review", slow_review)
+    run_id = service.storage.create_run_id()
+    with pytest.raises(NodeTimeoutError):
+        service._run_graph(
+            {"run_id": run_id, "contract_yaml": "elements: []\n", "invoice_yaml": "sheets: {}\n"},
+            parse=False,
+            extra_instructions=None,
+            bypass_cache=False,
+            invoice_format=None,
+            on_step_complete=None,
+            on_stream=None,
+        )
+
+    assert finished.wait(5)
+    assert service.storage.read_text(run_id, "contract_review", suffix=".md") is None
+    assert "contract_review" not in service.storage.load_checkpoints(run_id)["stages"]